@@ -0,0 +1,166 @@
+"""
+black_list.py
+
+This module contains the BlackListMatcher class, which compiles the black list
+patterns of an assignment once and matches them against paths relative to the
+assignment root.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import List
+
+# Black list patterns of the forms (^|/)name$ and (^|/)name($|/) match a path
+# exactly when its base name (or one of its components) is the literal name
+_NAME_PATTERN = re.compile(r"\(\^\|/\)(?P<name>.+)\$")
+_COMPONENT_PATTERN = re.compile(r"\(\^\|/\)(?P<name>.+)\(\$\|/\)")
+
+# Characters with a special meaning in regular expressions (unless escaped)
+_REGEX_METACHARACTERS = frozenset(".^$*+?{}[]|()\\")
+
+# Patterns that cannot be combined with others into a single regex: group
+# references and names (which would clash) and global inline flags
+_STANDALONE_PATTERN = re.compile(r"\\[1-9]|\(\?P[<=]|\(\?[aiLmsux]+\)")
+
+
+def _literal(pattern: str):
+    """
+    Returns the literal string matched by a pattern without metacharacters
+    (other than escaped punctuation), e.g. "Thumbs.db" for "Thumbs\\.db".
+
+    Args:
+        pattern (str): The pattern.
+
+    Returns:
+        Optional[str]: The literal string, or None if the pattern is not literal.
+    """
+    chars = []
+    escaped = False
+    for char in pattern:
+        if escaped:
+            if char.isalnum():
+                return None
+            chars.append(char)
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif char in _REGEX_METACHARACTERS:
+            return None
+        else:
+            chars.append(char)
+
+    if escaped or not chars or "/" in chars:
+        return None
+    return "".join(chars)
+
+
+class BlackListMatcher:
+    """
+    Matches paths against black list patterns (Python regexes, searched with
+    re.search semantics). Patterns matching a base name or a path component are
+    checked with set lookups, the others with combined regexes.
+
+    Black lists used to be matched against full paths, where every entry of the
+    assignment follows a "/" (e.g. "/tests/" excluded the top-level tests
+    folder). Patterns containing a "/" are therefore also searched in the
+    relative path with a leading "/".
+    """
+
+    def __init__(self, patterns: List[str]):
+        """
+        Creates a new BlackListMatcher.
+
+        Args:
+            patterns (List[str]): The black list patterns.
+
+        Raises:
+            ValueError: If a pattern is not a valid regex.
+        """
+        self.patterns = list(patterns)
+
+        # Base names and path components excluded by literal patterns
+        self.names = set()
+        self.components = set()
+
+        # Regexes of the other patterns (with and without a "/")
+        combined = []
+        rooted = []
+        self.standalone = []
+
+        for pattern in self.patterns:
+            try:
+                compiled = re.compile(pattern)
+            except re.error as error:
+                raise ValueError(
+                    f"Invalid black list pattern: '{pattern}'. {error}."
+                ) from error
+
+            name_match = _NAME_PATTERN.fullmatch(pattern)
+            component_match = _COMPONENT_PATTERN.fullmatch(pattern)
+            if component_match and _literal(component_match["name"]):
+                self.components.add(_literal(component_match["name"]))
+            elif name_match and _literal(name_match["name"]):
+                self.names.add(_literal(name_match["name"]))
+            elif _STANDALONE_PATTERN.search(pattern):
+                self.standalone.append(compiled)
+            elif "/" in pattern:
+                rooted.append(pattern)
+            else:
+                combined.append(pattern)
+
+        # Search all the remaining patterns at once
+        self.regex = self._combine(combined)
+        self.rooted_regex = self._combine(rooted)
+
+    def _combine(self, patterns: List[str]):
+        """
+        Returns a regex matching any of the patterns, or None if there are none.
+        Patterns that cannot be combined are added to the standalone regexes.
+
+        Args:
+            patterns (List[str]): The patterns.
+
+        Returns:
+            Optional[re.Pattern]: The combined regex.
+        """
+        if not patterns:
+            return None
+        try:
+            return re.compile("|".join(f"(?:{p})" for p in patterns))
+        except re.error:
+            self.standalone.extend(re.compile(p) for p in patterns)
+            return None
+
+    def matches(self, relative_path: str) -> bool:
+        """
+        Returns whether a path matches any of the patterns.
+
+        Args:
+            relative_path (str): The path, relative to the assignment root and
+                with "/" separators.
+
+        Returns:
+            bool: True if the path is black listed, False otherwise.
+        """
+        if self.names and relative_path.rpartition("/")[2] in self.names:
+            return True
+
+        if self.components and not self.components.isdisjoint(relative_path.split("/")):
+            return True
+
+        if self.regex is not None and self.regex.search(relative_path):
+            return True
+
+        rooted_path = "/" + relative_path
+        if self.rooted_regex is not None and (
+            self.rooted_regex.search(relative_path)
+            or self.rooted_regex.search(rooted_path)
+        ):
+            return True
+
+        return any(
+            regex.search(relative_path)
+            or ("/" in regex.pattern and regex.search(rooted_path))
+            for regex in self.standalone
+        )
@@ -0,0 +1,271 @@
+"""
+build_manifest.py
+
+This module contains the BuildManifest class, which records the sources a
+student version was generated from, so the next conversion only converts the
+files that changed since (and removes the outputs of deleted files).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+from pact.convert.utils import json_backend
+from pact.convert.utils.trigger_table import TriggerTable
+
+MANIFEST_FILE_NAME = ".pact_manifest.json"
+"""
+MANIFEST_FILE_NAME: The manifest file, at the root of the generation location
+(outside the zipped student version).
+"""
+
+MANIFEST_VERSION = 1
+"""
+MANIFEST_VERSION: The version of the manifest format (and of the conversion
+rules). Manifests of other versions are ignored, so everything is converted.
+"""
+
+RACY_WINDOW_NS = 2 * 10**9
+"""
+RACY_WINDOW_NS: Sources modified this close (in nanoseconds) to the start of a
+conversion may change again without their modification time changing, so the
+next conversion compares their hash even if their size and time match.
+"""
+
+HASH_CHUNK_SIZE = 1 << 20
+"""
+HASH_CHUNK_SIZE: Sources are hashed in chunks of this many bytes.
+"""
+
+
+def configuration_fingerprint(
+    trigger_table: TriggerTable, black_list: List[str], options: List[str]
+) -> str:
+    """
+    Returns the fingerprint of the configuration of a conversion. Outputs are
+    only reused by conversions with the same fingerprint.
+
+    Args:
+        trigger_table (TriggerTable): The trigger table of the conversion.
+        black_list (List[str]): The black list patterns.
+        options (List[str]): The lines of the options.pact file.
+
+    Returns:
+        str: The hex digest of the configuration.
+    """
+    digest = hashlib.sha256(trigger_table.fingerprint.encode("ascii"))
+    for section in (black_list, options):
+        digest.update(b"\1")
+        for line in section:
+            digest.update(line.encode("utf-8", "surrogatepass") + b"\0")
+    return digest.hexdigest()
+
+
+def file_hash(file_path: str) -> str:
+    """
+    Returns the SHA-256 hex digest of the contents of a file.
+
+    Args:
+        file_path (str): The path to the file.
+
+    Returns:
+        str: The hex digest.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BuildManifest:
+    """
+    The sources of a generated student version. Each file entry records the
+    size, modification time and hash of a source, and the size and
+    modification time of its output (None if the file has no output).
+    """
+
+    def __init__(
+        self,
+        manifest_path: str,
+        fingerprint: str,
+        files: Dict[str, dict] = None,
+        folders: List[str] = None,
+    ):
+        """
+        Creates a new BuildManifest.
+
+        Args:
+            manifest_path (str): The path to the manifest file.
+            fingerprint (str): The fingerprint of the configuration.
+            files (Dict[str, dict], optional): The entries by source path
+                (relative to the assignment). Defaults to None (no files).
+            folders (List[str], optional): The generated folders (relative to
+                the generation location). Defaults to None (no folders).
+        """
+        self.manifest_path = manifest_path
+        self.fingerprint = fingerprint
+        self.files = files if files is not None else {}
+        self.folders = folders if folders is not None else []
+
+        # Start of the conversion, to detect sources modified during it
+        self.start_ns = time.time_ns()
+
+    @classmethod
+    def load(cls, manifest_path: str, fingerprint: str) -> Optional[BuildManifest]:
+        """
+        Loads the manifest of a previous conversion.
+
+        Args:
+            manifest_path (str): The path to the manifest file.
+            fingerprint (str): The fingerprint of the current configuration.
+
+        Returns:
+            Optional[BuildManifest]: The manifest, or None if it is missing,
+                unreadable, or was written for another configuration or version.
+        """
+        try:
+            with open(manifest_path, "rb") as file:
+                data = json_backend.loads(file.read())
+        except (OSError, ValueError):
+            return None
+
+        if (
+            not isinstance(data, dict)
+            or data.get("version") != MANIFEST_VERSION
+            or data.get("fingerprint") != fingerprint
+            or not isinstance(data.get("files"), dict)
+            or not isinstance(data.get("folders"), list)
+        ):
+            return None
+
+        return cls(manifest_path, fingerprint, data["files"], data["folders"])
+
+    def is_current(self, source_key: str, source_path: str, output_path: str) -> bool:
+        """
+        Returns whether the output of a source is up to date: the source has the
+        same contents (same size and time, or same hash) and the output was not
+        changed or removed since it was generated.
+
+        Args:
+            source_key (str): The path to the source, relative to the assignment.
+            source_path (str): The path to the source.
+            output_path (str): The path to the output of the source.
+
+        Returns:
+            bool: True if the source does not need to be converted again.
+        """
+        entry = self.files.get(source_key)
+        if not isinstance(entry, dict):
+            return False
+
+        # The output must be as it was written (or still missing)
+        try:
+            output_stat = os.stat(output_path)
+        except FileNotFoundError:
+            if entry.get("output_size") is not None:
+                return False
+        else:
+            written = (entry.get("output_size"), entry.get("output_mtime_ns"))
+            if (output_stat.st_size, output_stat.st_mtime_ns) != written:
+                return False
+
+        try:
+            source_stat = os.stat(source_path)
+        except OSError:
+            return False
+
+        if (
+            source_stat.st_size == entry.get("size")
+            and source_stat.st_mtime_ns == entry.get("mtime_ns")
+            and not entry.get("racy")
+        ):
+            return True
+
+        # The source was touched (or may have been): compare its contents
+        if source_stat.st_size != entry.get("size"):
+            return False
+        if file_hash(source_path) != entry.get("sha256"):
+            return False
+
+        entry["mtime_ns"] = source_stat.st_mtime_ns
+        entry["racy"] = self._is_racy(source_stat.st_mtime_ns)
+        return True
+
+    def record(self, source_key: str, source_path: str, output_path: str) -> None:
+        """
+        Records the source and output of a converted file.
+
+        Args:
+            source_key (str): The path to the source, relative to the assignment.
+            source_path (str): The path to the source.
+            output_path (str): The path to the output of the source.
+        """
+        source_stat = os.stat(source_path)
+        try:
+            output_stat = os.stat(output_path)
+        except FileNotFoundError:
+            output_stat = None
+
+        self.files[source_key] = {
+            "size": source_stat.st_size,
+            "mtime_ns": source_stat.st_mtime_ns,
+            "sha256": file_hash(source_path),
+            "racy": self._is_racy(source_stat.st_mtime_ns),
+            "output": os.path.relpath(output_path, os.path.dirname(self.manifest_path)),
+            "output_size": output_stat.st_size if output_stat else None,
+            "output_mtime_ns": output_stat.st_mtime_ns if output_stat else None,
+        }
+
+    def output_path(self, source_key: str) -> Optional[str]:
+        """
+        Returns the path to the recorded output of a source.
+
+        Args:
+            source_key (str): The path to the source, relative to the assignment.
+
+        Returns:
+            Optional[str]: The path to the output, or None if it is unknown.
+        """
+        entry = self.files.get(source_key)
+        if not isinstance(entry, dict) or not isinstance(entry.get("output"), str):
+            return None
+        return os.path.join(os.path.dirname(self.manifest_path), entry["output"])
+
+    def save(self) -> None:
+        """
+        Writes the manifest file.
+        """
+        data = {
+            "version": MANIFEST_VERSION,
+            "fingerprint": self.fingerprint,
+            "files": self.files,
+            "folders": self.folders,
+        }
+
+        # Write to a temporary file first, so the manifest is never half written
+        folder = os.path.dirname(self.manifest_path)
+        fd, tmp_path = tempfile.mkstemp(dir=folder, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(json_backend.dumps(data))
+            os.replace(tmp_path, self.manifest_path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def _is_racy(self, mtime_ns: int) -> bool:
+        """
+        Returns whether a source modified at mtime_ns may change again unnoticed.
+
+        Args:
+            mtime_ns (int): The modification time of the source.
+
+        Returns:
+            bool: True if the hash of the source must be compared next time.
+        """
+        return mtime_ns >= self.start_ns - RACY_WINDOW_NS
@@ -0,0 +1,202 @@
+"""
+cell_cache.py
+
+This module contains the CellCache class, an on-disk cache of converted notebook
+cells. Each notebook has one cache file mapping the hash of each cell source to
+its converted source, valid for a single trigger configuration.
+"""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import os
+import tempfile
+from typing import Dict, List, Optional
+
+from pact.convert.utils import json_backend
+
+CELL_CACHE_OPTION = "cell_cache"
+"""
+CELL_CACHE_OPTION: The options.pact line enabling the cell cache, optionally
+followed by the cache folder, e.g. "cell_cache" or "cell_cache /tmp/pact".
+"""
+
+CELL_CACHE_VERSION = 1
+"""
+CELL_CACHE_VERSION: The version of the cache format (and of the conversion
+rules). Cache files of other versions are ignored.
+"""
+
+UNCHANGED = True
+"""
+UNCHANGED: The entry of cells whose source is kept as it is (most cells), so the
+source is not stored twice.
+"""
+
+CACHE_DIR_ENV = "PACT_CACHE_DIR"
+"""
+CACHE_DIR_ENV: The environment variable overriding the default cache folder.
+"""
+
+
+def default_cache_dir() -> str:
+    """
+    Returns the folder of PACT's caches: $PACT_CACHE_DIR if set, otherwise
+    $XDG_CACHE_HOME/pact (~/.cache/pact by default).
+
+    Returns:
+        str: The path to the cache folder.
+    """
+    cache_dir = os.environ.get(CACHE_DIR_ENV)
+    if cache_dir:
+        return cache_dir
+
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(cache_home, "pact")
+
+
+def cell_key(source_lines: List[str]) -> str:
+    """
+    Returns the cache key of a cell source. The key depends on the lines, not
+    only on their joined text, since cells without triggers keep their lines.
+
+    Args:
+        source_lines (List[str]): The lines of the cell source.
+
+    Returns:
+        str: The base64 encoded digest of the lines.
+    """
+    digest = hashlib.sha256("".join(source_lines).encode("utf-8", "surrogatepass"))
+
+    # The text and the length of every line identify the lines
+    digest.update(b"\0" + ",".join(map(str, map(len, source_lines))).encode())
+
+    # Base64 keys are shorter than hex keys, and have no long runs of digits
+    # (which would make json_backend fall back to the json module)
+    return base64.urlsafe_b64encode(digest.digest()).decode("ascii")
+
+
+class CellCache:
+    """
+    On-disk cache of converted notebook cells.
+
+    The entries of a notebook are loaded with a single read before its cells are
+    converted, and saved with a single write afterwards. Only the entries of the
+    cells of the latest conversion are saved, so the cache of a notebook never
+    grows beyond its current cells. An entry is the converted source of a cell,
+    UNCHANGED if the conversion kept the source as it is, or None if the cell
+    is excluded.
+    """
+
+    def __init__(self, cache_dir: str):
+        """
+        Creates a new CellCache.
+
+        Args:
+            cache_dir (str): The folder of the cache files.
+        """
+        self.cache_dir = cache_dir
+
+    @classmethod
+    def from_options(cls, options: List[str]) -> Optional[CellCache]:
+        """
+        Creates a cache from the options of an assignment, if they contain the
+        cell_cache option.
+
+        Args:
+            options (List[str]): The lines of the options.pact file.
+
+        Returns:
+            Optional[CellCache]: The cache, or None if cells are not cached.
+        """
+        cache = None
+
+        for option in options:
+            parts = option.split(maxsplit=1)
+            if not parts or parts[0] != CELL_CACHE_OPTION:
+                continue
+
+            if len(parts) == 2:
+                cache_dir = os.path.expanduser(parts[1].strip())
+            else:
+                cache_dir = os.path.join(default_cache_dir(), "cells")
+            cache = cls(cache_dir)
+
+        return cache
+
+    def load(self, notebook_path: str, fingerprint: str) -> Dict[str, list]:
+        """
+        Loads the entries of a notebook. Missing, unreadable or outdated cache
+        files (other fingerprint or version) give no entries.
+
+        Args:
+            notebook_path (str): The path to the notebook.
+            fingerprint (str): The fingerprint of the trigger configuration.
+
+        Returns:
+            Dict[str, list]: The entries by cell key.
+        """
+        try:
+            with open(self._cache_path(notebook_path), "rb") as file:
+                data = json_backend.loads(file.read())
+        except (OSError, ValueError):
+            return {}
+
+        if (
+            not isinstance(data, dict)
+            or data.get("version") != CELL_CACHE_VERSION
+            or data.get("fingerprint") != fingerprint
+            or not isinstance(data.get("cells"), dict)
+        ):
+            return {}
+
+        return data["cells"]
+
+    def save(
+        self, notebook_path: str, fingerprint: str, entries: Dict[str, list]
+    ) -> None:
+        """
+        Saves the entries of a notebook, replacing its previous entries. Errors
+        are ignored: the cache is only an optimization.
+
+        Args:
+            notebook_path (str): The path to the notebook.
+            fingerprint (str): The fingerprint of the trigger configuration.
+            entries (Dict[str, list]): The entries by cell key.
+        """
+        data = {
+            "version": CELL_CACHE_VERSION,
+            "fingerprint": fingerprint,
+            "cells": entries,
+        }
+
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as file:
+                    file.write(json_backend.dumps(data))
+                os.replace(tmp_path, self._cache_path(notebook_path))
+            except BaseException:
+                os.remove(tmp_path)
+                raise
+        except (OSError, ValueError):
+            pass
+
+    def _cache_path(self, notebook_path: str) -> str:
+        """
+        Returns the path to the cache file of a notebook.
+
+        Args:
+            notebook_path (str): The path to the notebook.
+
+        Returns:
+            str: The path to the cache file.
+        """
+        name = hashlib.sha256(
+            os.path.abspath(notebook_path).encode("utf-8", "surrogatepass")
+        ).hexdigest()
+        return os.path.join(self.cache_dir, f"{name}.json")
@@ -4,6 +4,8 @@ Infrastructure related to codeblocks.
 
 from __future__ import annotations
 
+from pact.convert.utils.trigger_matcher import CODEBLOCK_TRIGGER
+
 
 class InvalidCodeBlockError(Exception):
     """
@@ -22,6 +24,11 @@ class InvalidCodeBlockError(Exception):
         self.error_code = error_code
         super().__init__(f"{self.message}, Error code: {self.error_code}")
 
+    def __reduce__(self):
+        # Rebuild from the constructor arguments (e.g. when the error is sent
+        # back from a worker process), keeping any attributes set later
+        return (type(self), (self.message, self.error_code), self.__dict__)
+
 
 class CodeBlockManager:
     """
@@ -118,12 +125,15 @@ class CodeBlockManager:
         self.active_block_type = None
         self.block_indentation_str = ""
 
-    def _check_for_trigger(self, current_line: str):
+    def _check_for_trigger(self, current_line: str, hits: list = None):
         """
         Checks if the current line contains a codeblock trigger
 
         Args:
             current_line (str): The current line of the file.
+            hits (List[TriggerHit], optional): The trigger hits already found in
+                the line by a TriggerMatcher. If not provided, the line is
+                scanned for the triggers of every registered codeblock type.
 
         Raises:
             InvalidCodeBlockError: If the codeblocks are not properly defined.
@@ -134,40 +144,43 @@ class CodeBlockManager:
                 was found.
         """
 
-        # Check if the current line contains a codeblock trigger
-        found_trigger = None
-
-        # For each codeblock type
-        for codeblock_type in self.codeblock_types:
-
-            # Check for both the start and end triggers
-            for trigger, label in [
-                (codeblock_type.start_trigger_str, "start"),
-                (codeblock_type.end_trigger_str, "end"),
-            ]:
-                if trigger in current_line:
-
-                    # If a trigger was already found, raise an error
-                    # -> A line cannot contain multiple codeblock triggers
-                    if found_trigger is not None:
-                        raise InvalidCodeBlockError(
-                            f"Line contains multiple codeblock triggers: {current_line}"
-                        )
-
-                    # Set the return value
-                    found_trigger = (codeblock_type, label)
+        # Collect every codeblock trigger in the line
+        if hits is not None:
+            found_triggers = [
+                (hit.trigger_type, hit.label)
+                for hit in hits
+                if hit.kind == CODEBLOCK_TRIGGER
+            ]
+        else:
+            found_triggers = [
+                (codeblock_type, label)
+                for codeblock_type in self.codeblock_types
+                for trigger, label in [
+                    (codeblock_type.start_trigger_str, "start"),
+                    (codeblock_type.end_trigger_str, "end"),
+                ]
+                if trigger in current_line
+            ]
+
+        # A line cannot contain multiple codeblock triggers
+        if len(found_triggers) > 1:
+            raise InvalidCodeBlockError(
+                f"Line contains multiple codeblock triggers: {current_line}"
+            )
 
-        return found_trigger
+        return found_triggers[0] if found_triggers else None
 
-    def update_state(self, current_line: str):
+    def update_state(self, current_line: str, hits: list = None):
         """
         Updates the state of the codeblock manager based on the current line.
 
         Args:
             current_line (str): The current line of the file.
+            hits (List[TriggerHit], optional): The trigger hits already found in
+                the line by a TriggerMatcher.
         """
         # Check if the current line contains a codeblock trigger
-        codeblock_trigger = self._check_for_trigger(current_line)
+        codeblock_trigger = self._check_for_trigger(current_line, hits)
 
         # If no trigger was found, return
         if codeblock_trigger is None:
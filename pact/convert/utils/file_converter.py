@@ -5,13 +5,33 @@ file_converter.py
 from __future__ import annotations
 
 import logging
+import locale
 import os
 import json
-from typing import List
-import shutil
-from copy import deepcopy
-from pact.convert.utils.codeblock_infra import CodeBlockManager, CodeBlockType
-from pact.convert.utils.mask_infra import MaskManager, MaskType
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List, Optional, Tuple
+from pact.convert.utils.cell_cache import UNCHANGED, CellCache, cell_key
+from pact.convert.utils.codeblock_infra import CodeBlockType, InvalidCodeBlockError
+from pact.convert.utils.file_copy import copy_file
+from pact.convert.utils.file_handlers import (
+    COPY_HANDLER,
+    NOTEBOOK_HANDLER,
+    SKIP_HANDLER,
+    TEXT_HANDLER,
+    FileHandlerRegistry,
+)
+from pact.convert.utils.mask_infra import InvalidMaskError, MaskType
+from pact.convert.utils.notebook_assets import AssetStore
+from pact.convert.utils.notebook_reader import read_notebook
+from pact.convert.utils.notebook_scrub import ScrubPolicy
+from pact.convert.utils.output_cache import OutputCache
+from pact.convert.utils.trigger_matcher import (
+    CELL_EXCLUDE_TRIGGER,
+    TriggerLine,
+    TriggerMatcher,
+    count_regions,
+)
+from pact.convert.utils.trigger_table import ConversionContext, TriggerTable
 from pact.convert.codeblocks import CODEBLOCK_TYPES
 from pact.convert.masks import MASKTYPES
 
@@ -23,6 +43,48 @@ IPYNB_CELL_EXCLUDE: If this string is found in a cell of an ipynb file, the enti
 cell of the ipynb will be excluded in the student version of the file.
 """
 
+BYTE_ENGINE_ENCODING = "latin-1"
+"""
+BYTE_ENGINE_ENCODING: The byte engine reads text files with this encoding. Every
+byte maps to exactly one character (and back), so files are converted on their
+raw bytes whatever their actual encoding is.
+"""
+
+STREAM_CHUNK_SIZE = 1 << 22
+"""
+STREAM_CHUNK_SIZE: Text files are read and converted in chunks of about this many
+characters (extended to the end of the last line), so memory use does not grow
+with the size of the file.
+"""
+
+PARALLEL_CELLS_OPTION = "parallel_cells"
+"""
+PARALLEL_CELLS_OPTION: The options.pact line converting the cells of large
+notebooks in a pool of worker processes (one per CPU), optionally followed by the
+minimum number of cells to convert, e.g. "parallel_cells 500".
+"""
+
+PARALLEL_CELL_THRESHOLD = 1000
+"""
+PARALLEL_CELL_THRESHOLD: The default minimum number of cells to convert for a
+notebook to be converted in a worker pool (starting the pool costs more than
+converting a few hundred cells).
+"""
+
+CELL_BATCHES_PER_WORKER = 4
+"""
+CELL_BATCHES_PER_WORKER: The number of batches of cells sent to each worker of
+the cell pool.
+"""
+
+
+# Actions of the plan of a file (see FileConverter.plan_file)
+PLAN_CONVERT = "convert"
+PLAN_COPY = "copy"
+PLAN_SKIP = "skip"
+PLAN_UNREADABLE = "unreadable"
+PLAN_ERROR = "error"
+
 
 class FileConverter:
     """
@@ -33,6 +95,8 @@ class FileConverter:
         self,
         codeblock_types: List[CodeBlockType] = CODEBLOCK_TYPES,
         mask_types: List[MaskType] = MASKTYPES,
+        byte_engine: bool = False,
+        trigger_table: TriggerTable = None,
     ):
         """
         Creates a new FileConverter.
@@ -43,23 +107,80 @@ class FileConverter:
                 defined in the codeblocks module.
             mask_types (List[MaskType], optional): A list of mask types to use in
                 the converter. Defaults to MASKTYPES.
+            byte_engine (bool, optional): If True, text files are converted on
+                their raw bytes instead of being decoded as UTF-8 (only used if
+                all trigger, start_char and replacement strings are ASCII).
+                Defaults to False.
+            trigger_table (TriggerTable, optional): A prebuilt trigger table to
+                share with other converters. If provided, codeblock_types and
+                mask_types are ignored. Defaults to None.
         """
 
-        # Create codeblock manager
-        self.codeblock_manager = CodeBlockManager()
+        # Precompute everything derived from the types once. The table is
+        # immutable: per-file state lives in a ConversionContext instead.
+        if trigger_table is None:
+            trigger_table = TriggerTable(
+                codeblock_types=codeblock_types,
+                mask_types=mask_types,
+                cell_exclude_str=IPYNB_CELL_EXCLUDE,
+            )
+        self.trigger_table = trigger_table
+
+        self.byte_engine = byte_engine
 
-        # Add codeblock types to the manager
-        for codeblock_type in codeblock_types:
-            self.codeblock_manager.add_codeblock_type(codeblock_type)
+        # What is removed from notebooks besides outputs (nothing by default)
+        self.scrub_policy = ScrubPolicy()
 
-        # Create mask manager
-        self.mask_manager = MaskManager()
+        # Where large notebook attachments are moved to (None keeps them inline)
+        self.asset_store: AssetStore = None
 
-        # Add mask types to the manager
-        for mask_type in mask_types:
-            self.mask_manager.add_mask_type(mask_type)
+        # On-disk cache of converted notebook cells (None disables it)
+        self.cell_cache: CellCache = None
 
-    def convert_file(self, source_file_path: str, destination_folder_path: str) -> str:
+        # On-disk cache of converted files (None disables it)
+        self.output_cache: OutputCache = None
+
+        # Cells of notebooks with at least parallel_cell_threshold cells to
+        # convert are converted by cell_workers processes (1 disables the pool)
+        self.cell_workers = 1
+        self.parallel_cell_threshold = PARALLEL_CELL_THRESHOLD
+
+        # Map files to handler names, and handler names to handlers
+        self.handler_registry = FileHandlerRegistry()
+        self.handlers = {
+            TEXT_HANDLER: self._handle_text_file,
+            NOTEBOOK_HANDLER: self._handle_notebook_file,
+            COPY_HANDLER: copy_file,
+            SKIP_HANDLER: self._skip_file,
+        }
+
+    @property
+    def trigger_matcher(self) -> TriggerMatcher:
+        """
+        Returns the TriggerMatcher of the converter's trigger table.
+
+        Returns:
+            TriggerMatcher: The compiled matcher of every trigger string.
+        """
+        return self.trigger_table.matcher
+
+    @property
+    def ascii_only(self) -> bool:
+        """
+        Returns whether every trigger and replacement string is ASCII.
+
+        Returns:
+            bool: True if the byte engine can be used.
+        """
+        return self.trigger_table.ascii_only
+
+    def convert_file(
+        self,
+        source_file_path: str,
+        destination_folder_path: str,
+        create_folder: bool = True,
+        handler_name: str = None,
+    ) -> str:
         """
         Converts a solution version of an assignment file into a student version
         of the file.
@@ -68,105 +189,414 @@ class FileConverter:
             source_file_path (str): The path to the file to convert.
             destination_folder_path (str): The path to the folder where the
                 converted file should be saved.
+            create_folder (bool, optional): Whether to create the destination
+                folder if it does not exist. Callers that already created it
+                can skip the extra system call. Defaults to True.
+            handler_name (str, optional): The handler of the file, if it was
+                already resolved. Defaults to None (resolved here).
 
         Returns:
             str: The converted file as a string.
         """
 
         # Create the destination folder if it does not exist
-        os.makedirs(destination_folder_path, exist_ok=True)
+        if create_folder:
+            os.makedirs(destination_folder_path, exist_ok=True)
 
-        # Collect the file extension
-        _, ext = os.path.splitext(source_file_path)
+        # Determine the path of the converted file
+        file_name = os.path.basename(source_file_path)
+        destination_file_path = os.path.join(destination_folder_path, file_name)
 
-        # If this is an ipynb file, we need to handle it differently
-        contents = None
-        if ext == ".ipynb":
-            contents = self._convert_ipynb_file(source_file_path)
-        # Otherwise, we can convert the file as normal
-        elif ext in [".png", ".jpg", ".jpeg", ".gif", ".tiff"]:
-            # Copy the image file
-            shutil.copyfile(
-                source_file_path,
-                os.path.join(
-                    destination_folder_path, os.path.basename(source_file_path)
-                ),
+        # Find the handler of the file (from its extension or first bytes)
+        if handler_name is None:
+            handler_name = self.handler_registry.resolve(source_file_path)
+        handler = self.handlers.get(handler_name)
+        if handler is None:
+            raise ValueError(
+                f"Unknown file handler '{handler_name}' for file: {source_file_path}"
             )
+
+        # Reuse the cached output of an identical file if there is one
+        fingerprint = self._output_fingerprint(handler_name, handler)
+        if fingerprint is None:
+            handler(source_file_path, destination_file_path)
             return
-        else:
 
-            # Read in the file as a string
-            og_lines = None
-            try:
-                with open(source_file_path, "r") as file:
-                    og_lines = file.readlines()
-            except UnicodeDecodeError:
-                logger.warning("Could not read file: %s. Skipping.", source_file_path)
+        # Text files without triggers are plain copies, which gain nothing
+        # from the cache (and files with triggers need not be checked again)
+        if handler_name == TEXT_HANDLER:
+            if not self.trigger_matcher.file_has_triggers(source_file_path):
+                copy_file(source_file_path, destination_file_path)
                 return
+            handler = self._convert_text_file
 
-            # Process the text in the file
-            final_lines = self._convert_source_text(og_lines)
+        key = self.output_cache.key(source_file_path, fingerprint)
+        if self.output_cache.fetch(key, destination_file_path):
+            return
 
-            # Convert the lines back into a string
-            contents = "".join(final_lines)
+        handler(source_file_path, destination_file_path)
+        if os.path.exists(destination_file_path):
+            self.output_cache.store(key, destination_file_path)
 
-        # Save the converted file to the destination folder
-        file_name = os.path.basename(source_file_path)
-        destination_file_path = os.path.join(destination_folder_path, file_name)
+    def plan_file(self, source_file_path: str, handler_name: str = None) -> dict:
+        """
+        Returns what converting a file would do, without writing anything: the
+        action (PLAN_CONVERT, PLAN_COPY, PLAN_SKIP, PLAN_UNREADABLE if the file
+        cannot be decoded or read, PLAN_ERROR if its conversion fails), the
+        bytes read and written (None if unknown, e.g. for custom handlers) and
+        the number of trigger regions. Text files and notebooks with triggers
+        are converted in memory, so the size of their output is exact (but
+        attachments are never externalized).
+
+        Args:
+            source_file_path (str): The path to the file.
+            handler_name (str, optional): The handler of the file, if it was
+                already resolved. Defaults to None (resolved here).
+
+        Returns:
+            dict: The plan of the file ("action", "handler", "bytes_read",
+                "bytes_written", "regions", and "error" for failures).
+        """
+        if handler_name is None:
+            handler_name = self.handler_registry.resolve(source_file_path)
+        handler = self.handlers.get(handler_name)
+
+        plan = {
+            "action": PLAN_CONVERT,
+            "handler": handler_name,
+            "bytes_read": None,
+            "bytes_written": None,
+            "regions": 0,
+        }
+
+        try:
+            size = os.path.getsize(source_file_path)
+            plan["bytes_read"] = size
+
+            if handler is None:
+                raise ValueError(
+                    f"Unknown file handler '{handler_name}' for file: "
+                    f"{source_file_path}"
+                )
+
+            if handler == self._skip_file:
+                plan.update(action=PLAN_SKIP, bytes_read=0, bytes_written=0)
+
+            elif handler == copy_file or (
+                handler == self._handle_text_file
+                and not self.trigger_matcher.file_has_triggers(source_file_path)
+            ):
+                plan.update(action=PLAN_COPY, bytes_written=size)
+
+            elif handler == self._handle_text_file:
+                plan["bytes_written"], plan["regions"] = self._plan_text_file(
+                    source_file_path
+                )
+
+            elif handler == self._handle_notebook_file:
+                plan["bytes_written"], plan["regions"] = self._plan_notebook_file(
+                    source_file_path
+                )
+
+        except (UnicodeDecodeError, OSError) as error:
+            plan.update(action=PLAN_UNREADABLE, bytes_written=0, error=str(error))
 
+        except (InvalidCodeBlockError, InvalidMaskError, ValueError) as error:
+            plan.update(action=PLAN_ERROR, bytes_written=0, error=str(error))
+
+        return plan
+
+    def _plan_text_file(self, source_file_path: str) -> Tuple[int, int]:
+        """
+        Converts a text file in memory (as _convert_text_file would).
+
+        Args:
+            source_file_path (str): The path to the file.
+
+        Raises:
+            UnicodeDecodeError: If the file cannot be decoded (or contains NUL
+                characters).
+
+        Returns:
+            Tuple[int, int]: The size of the converted file in bytes, and the
+                number of trigger regions of the file.
+        """
+        context = ConversionContext(self.trigger_table)
+        written, regions = 0, 0
+
+        if self._use_byte_engine():
+            with open(source_file_path, "rb") as source:
+                for chunk in iter_line_chunks(source, STREAM_CHUNK_SIZE):
+                    text = _check_no_nul(chunk.decode(BYTE_ENGINE_ENCODING))
+                    trigger_lines = self.trigger_matcher.scan(text)
+                    regions += count_regions(trigger_lines)
+                    written += sum(
+                        map(
+                            len,
+                            self._convert_text(
+                                text, trigger_lines, context, end_of_file=False
+                            ),
+                        )
+                    )
+        else:
+            with open(source_file_path, "r") as source:
+                for text in iter_line_chunks(source, STREAM_CHUNK_SIZE):
+                    trigger_lines = self.trigger_matcher.scan(_check_no_nul(text))
+                    regions += count_regions(trigger_lines)
+                    written += sum(
+                        len(piece.encode(source.encoding))
+                        for piece in self._convert_text(
+                            text, trigger_lines, context, end_of_file=False
+                        )
+                    )
+
+        context.codeblock_manager.end_of_file_check()
+        return written, regions
+
+    def _plan_notebook_file(self, source_file_path: str) -> Tuple[int, int]:
+        """
+        Converts a notebook in memory (without the cell cache, which would be
+        updated, and without moving attachments to the asset store).
+
+        Args:
+            source_file_path (str): The path to the notebook.
+
+        Returns:
+            Tuple[int, int]: The size of the converted notebook in bytes, and
+                the number of trigger regions of its cells.
+        """
+        cell_cache, self.cell_cache = self.cell_cache, None
+        try:
+            contents = self._convert_ipynb_file(source_file_path)
+        finally:
+            self.cell_cache = cell_cache
+
+        regions = 0
+        for cell in read_notebook(source_file_path, drop_code_outputs=True)["cells"]:
+            source = cell.get("source", "")
+            if not isinstance(source, str):
+                source = "".join(source)
+            regions += count_regions(self.trigger_matcher.scan(source))
+
+        return len(contents.encode("utf-8")), regions
+
+    def register_handler(
+        self, handler_name: str, handler: Callable[[str, str], None]
+    ) -> None:
+        """
+        Registers a file handler (or replaces a built-in one). Files are mapped
+        to handlers by the converter's handler_registry.
+
+        Args:
+            handler_name (str): The name of the handler.
+            handler (Callable[[str, str], None]): A function converting the file
+                at a source path into the file at a destination path.
+        """
+        self.handlers[handler_name] = handler
+
+    def _output_fingerprint(
+        self, handler_name: str, handler: Callable[[str, str], None]
+    ) -> Optional[str]:
+        """
+        Returns everything besides its contents that the output of a file
+        depends on, to key the output cache. Only the built-in text and
+        notebook handlers are cached (copies gain nothing from the cache), and
+        notebooks only if their attachments stay inline (externalized
+        attachments are written outside of the output). The text engine
+        decodes files with the locale's encoding, so it is part of the
+        fingerprint of text files.
+
+        Args:
+            handler_name (str): The handler of the file.
+            handler (Callable[[str, str], None]): The function of the handler.
+
+        Returns:
+            Optional[str]: The fingerprint, or None if the output is not cached.
+        """
+        if self.output_cache is None:
+            return None
+
+        if handler_name == TEXT_HANDLER and handler == self._handle_text_file:
+            if self.byte_engine and self.ascii_only:
+                engine, encoding = "bytes", BYTE_ENGINE_ENCODING
+            else:
+                engine, encoding = "text", locale.getpreferredencoding(False)
+            settings = f"{engine}\0{encoding}\0{os.linesep}"
+        elif (
+            handler_name == NOTEBOOK_HANDLER
+            and handler == self._handle_notebook_file
+            and self.asset_store is None
+        ):
+            policy = self.scrub_policy
+            settings = repr(
+                (policy.widgets, policy.cell_metadata_keys, policy.attachments)
+            )
+        else:
+            return None
+
+        return f"{self.trigger_table.fingerprint}\0{handler_name}\0{settings}"
+
+    def _handle_text_file(
+        self, source_file_path: str, destination_file_path: str
+    ) -> None:
+        """
+        Handles a text file: files containing triggers are converted, other
+        files are copied as they are (without decoding them).
+
+        Args:
+            source_file_path (str): The path to the file to convert.
+            destination_file_path (str): The path to write the converted file to.
+        """
+        if not self.trigger_matcher.file_has_triggers(source_file_path):
+            copy_file(source_file_path, destination_file_path)
+            return
+
+        # Stream the file through the conversion engine
+        self._convert_text_file(source_file_path, destination_file_path)
+
+    def _handle_notebook_file(
+        self, source_file_path: str, destination_file_path: str
+    ) -> None:
+        """
+        Handles an ipynb file: cells are converted and outputs are cleared.
+
+        Args:
+            source_file_path (str): The path to the file to convert.
+            destination_file_path (str): The path to write the converted file to.
+        """
+        contents = self._convert_ipynb_file(
+            source_file_path, os.path.dirname(destination_file_path)
+        )
+
+        # Save the converted file to the destination folder
         with open(destination_file_path, "w") as file:
             file.write(contents)
 
-    def _convert_ipynb_file(self, file_path: str) -> str:
+    def _skip_file(self, source_file_path: str, destination_file_path: str) -> None:
+        """
+        Handles a file that is left out of the student version.
+
+        Args:
+            source_file_path (str): The path to the skipped file.
+            destination_file_path (str): The path the file would be written to.
+        """
+        logger.debug("Skipping file: %s", source_file_path)
+
+    def _use_byte_engine(self) -> bool:
+        """
+        Returns whether text files should be converted with the byte engine.
+
+        Returns:
+            bool: True if the byte engine is enabled and can be used.
+        """
+        if self.byte_engine and not self.ascii_only:
+            logger.warning(
+                "Byte engine requires ASCII trigger and replacement strings. "
+                "Falling back to the text engine."
+            )
+            self.byte_engine = False
+
+        return self.byte_engine
+
+    def _convert_text_file(
+        self, source_file_path: str, destination_file_path: str
+    ) -> None:
+        """
+        Converts a text file chunk by chunk, writing the converted pieces of each
+        chunk before reading the next one. Chunks always end with a complete
+        line, and the conversion state is carried from one chunk to the next.
+
+        With the byte engine, the raw bytes are mapped one to one onto
+        characters (BYTE_ENGINE_ENCODING), so no UTF-8 decoding or newline
+        translation takes place and files in any encoding are converted.
+
+        If the file cannot be decoded (or the conversion fails), the partial
+        destination file is removed. Text containing NUL characters (UTF-16
+        without a byte order mark, or binary data) cannot be decoded either:
+        its triggers could be hidden between the NUL bytes.
+
+        Args:
+            source_file_path (str): The path to the file to convert.
+            destination_file_path (str): The path to write the converted file to.
+        """
+        context = ConversionContext(self.trigger_table)
+
+        try:
+            if self._use_byte_engine():
+                with open(source_file_path, "rb") as source, open(
+                    destination_file_path, "wb"
+                ) as destination:
+                    for chunk in iter_line_chunks(source, STREAM_CHUNK_SIZE):
+                        for piece in self._convert_text(
+                            _check_no_nul(chunk.decode(BYTE_ENGINE_ENCODING)),
+                            context=context,
+                            end_of_file=False,
+                        ):
+                            destination.write(piece.encode(BYTE_ENGINE_ENCODING))
+            else:
+                with open(source_file_path, "r") as source, open(
+                    destination_file_path, "w"
+                ) as destination:
+                    for chunk in iter_line_chunks(source, STREAM_CHUNK_SIZE):
+                        destination.writelines(
+                            self._convert_text(
+                                _check_no_nul(chunk), context=context, end_of_file=False
+                            )
+                        )
+
+            # Check for open code block at end of file
+            context.codeblock_manager.end_of_file_check()
+
+        except UnicodeDecodeError:
+            _remove_file(destination_file_path)
+            logger.warning("Could not read file: %s. Skipping.", source_file_path)
+
+        except BaseException:
+            _remove_file(destination_file_path)
+            raise
+
+    def _convert_ipynb_file(
+        self, file_path: str, destination_folder_path: str = None
+    ) -> str:
         """
         Converts a solution version of an ipynb file into a student version of
         the file. Returns the contents of the student version as a string.
 
         Args:
             file_path (str): The path to the ipynb file to convert.
+            destination_folder_path (str, optional): The folder the student
+                version is written to. Large attachments are only moved to the
+                asset store if it is known. Defaults to None.
 
         Returns:
             str: The converted file as a string.
         """
 
-        # Read in the file as a JSON
-        with open(file_path, "r") as file:
-            og_json = json.load(file)
+        # Read in the file as a JSON (the outputs of code cells are dropped as
+        # soon as each cell is parsed)
+        og_json = read_notebook(file_path, drop_code_outputs=True)
+
+        cells = og_json["cells"]
 
         # Normalize cell sources: nbformat allows cell.source to be either a
         # list of lines or a single string. Coerce to list-of-lines so that
         # _convert_source_text iterates over lines, not characters.
-        for cell in og_json["cells"]:
+        for cell in cells:
             if isinstance(cell["source"], str):
                 cell["source"] = cell["source"].splitlines(keepends=True)
 
-        # Determine which cells (if any) should be excluded
-        cells_to_remove = [False] * len(og_json["cells"])
+        # Find the student source of every cell (None for excluded cells)
+        student_sources = self._student_cell_sources(file_path, cells)
 
-        # Loop through each cell in the notebook
-        for cell_i, cell in enumerate(og_json["cells"]):
-            # If the cell contains text
-            if len(cell["source"]) > 0:
-                # For each line of text in the cell
-                for line_of_text in cell["source"]:
-                    # Remove if the line contains the exclusion indicator
-                    if IPYNB_CELL_EXCLUDE in line_of_text:
-                        cells_to_remove[cell_i] = True
-                        break  # No need to check the rest of the lines
+        # Build the list of student cells in a single pass. Cells are updated
+        # in place: excluded cells and cleared outputs are never copied.
+        student_cells = []
+        for cell, student_source in zip(cells, student_sources):
 
-        # Create a new JSON object to store the student version of the notebook
-        new_json = deepcopy(og_json)
-
-        # Remove cells that should be excluded from the new JSON
-        for remove_flag, cell in zip(cells_to_remove, og_json["cells"]):
-            if remove_flag:
-                new_json["cells"].remove(cell)
-
-        # For each cell
-        for cell in new_json["cells"]:
-
-            # Process the text in each cell as we would for a normal file
-            cell["source"] = self._convert_source_text(cell["source"])
+            # Excluded cells have no student source
+            if student_source is None:
+                continue
+            cell["source"] = student_source
 
             # Only code cells have outputs and execution_count
             if cell.get("cell_type") == "code":
@@ -176,40 +606,346 @@ class FileConverter:
                 # Reset the cell's execution counts
                 cell["execution_count"] = None
 
-        # Convert the new JSON back into a string and return
-        return json.dumps(new_json)
+            # Remove the metadata and attachments selected by the scrub policy
+            if self.scrub_policy.enabled:
+                self.scrub_policy.scrub_cell(cell)
+
+            # Move large attachments to asset files
+            if self.asset_store is not None and destination_folder_path is not None:
+                self.asset_store.externalize_cell(cell, destination_folder_path)
 
-    def _convert_source_text(self, source_text_lines: List[str]) -> List[str]:
+            student_cells.append(cell)
+
+        og_json["cells"] = student_cells
+        self.scrub_policy.scrub_notebook(og_json)
+
+        # Convert the JSON back into a string and return
+        return json.dumps(og_json)
+
+    def _student_cell_sources(
+        self, file_path: str, cells: List[dict]
+    ) -> List[Optional[List[str]]]:
+        """
+        Returns the student source of every cell of a notebook. The cached
+        conversions of unchanged cells are reused, and the other cells are
+        converted.
+
+        Args:
+            file_path (str): The path to the notebook.
+            cells (List[dict]): The cells, with their sources as lists of lines.
+
+        Returns:
+            List[Optional[List[str]]]: The converted sources, in cell order (None
+                for excluded cells).
+        """
+        sources = [cell["source"] for cell in cells]
+        if self.cell_cache is None:
+            return self._convert_cell_sources(list(enumerate(sources)))
+
+        # Convert the cells whose conversion is not cached
+        fingerprint = self.trigger_table.fingerprint
+        cached_cells = self.cell_cache.load(file_path, fingerprint)
+        keys = [cell_key(source) for source in sources]
+        misses = [
+            (index, source)
+            for index, (key, source) in enumerate(zip(keys, sources))
+            if key not in cached_cells
+        ]
+        converted = dict(
+            zip([index for index, _ in misses], self._convert_cell_sources(misses))
+        )
+
+        student_sources = []
+        used_cells = {}
+        for index, (key, source) in enumerate(zip(keys, sources)):
+            if index in converted:
+                student_source = converted[index]
+                entry = UNCHANGED if student_source == source else student_source
+            else:
+                entry = cached_cells[key]
+                if entry is UNCHANGED:
+                    student_source = source
+                else:
+                    student_source = None if entry is None else list(entry)
+
+            used_cells[key] = entry
+            student_sources.append(student_source)
+
+        # Save the conversions of the current cells if any changed
+        if used_cells != cached_cells:
+            self.cell_cache.save(file_path, fingerprint, used_cells)
+
+        return student_sources
+
+    def _convert_cell_sources(
+        self, indexed_sources: List[Tuple[int, List[str]]]
+    ) -> List[Optional[List[str]]]:
+        """
+        Converts cell sources, in a pool of worker processes if there are at
+        least parallel_cell_threshold of them and cell_workers is above 1.
+        Errors are the same either way, and name the first failing cell.
+
+        Args:
+            indexed_sources (List[Tuple[int, List[str]]]): The index of each
+                cell in the notebook and its source.
+
+        Returns:
+            List[Optional[List[str]]]: The converted sources, in the same order
+                (None for excluded cells).
+        """
+        if (
+            self.cell_workers <= 1
+            or len(indexed_sources) < self.parallel_cell_threshold
+        ):
+            return [
+                self._convert_indexed_cell_source(index, source)
+                for index, source in indexed_sources
+            ]
+
+        # Cells without triggers are kept as they are: only send the others to
+        # the pool (sending cells costs about as much as converting them)
+        student_sources = [list(source) for _, source in indexed_sources]
+        positions = [
+            position
+            for position, (_, source) in enumerate(indexed_sources)
+            if self.trigger_matcher.has_triggers("".join(source))
+        ]
+        converted = _convert_cells_in_pool(
+            self.trigger_table,
+            [indexed_sources[position] for position in positions],
+            self.cell_workers,
+        )
+        for position, student_source in zip(positions, converted):
+            student_sources[position] = student_source
+
+        return student_sources
+
+    def _convert_indexed_cell_source(
+        self, cell_index: int, source_lines: List[str]
+    ) -> Optional[List[str]]:
+        """
+        Converts the source of a notebook cell, adding the index of the cell to
+        the message of conversion errors (InvalidCodeBlockError,
+        InvalidMaskError and ValueError). The index is also set as the error's
+        cell_index attribute.
+
+        Args:
+            cell_index (int): The index of the cell in the notebook.
+            source_lines (List[str]): The lines of the cell source.
+
+        Raises:
+            InvalidCodeBlockError: If the codeblocks of the cell are invalid.
+            InvalidMaskError: If the masks of the cell are invalid.
+            ValueError: If the cell cannot be converted.
+
+        Returns:
+            Optional[List[str]]: The converted lines, or None if the cell is
+                excluded from the student version.
+        """
+        try:
+            return self._convert_cell_source(source_lines)
+        except (InvalidCodeBlockError, InvalidMaskError, ValueError) as error:
+            cell_error = _cell_error(error, cell_index)
+            if cell_error is None:
+                raise
+            raise cell_error from error
+
+    def _convert_cell_source(self, source_lines: List[str]) -> Optional[List[str]]:
+        """
+        Converts the source of a notebook cell with its own context.
+
+        Args:
+            source_lines (List[str]): The lines of the cell source.
+
+        Returns:
+            Optional[List[str]]: The converted lines, or None if the cell is
+                excluded from the student version.
+        """
+
+        # Scan the text of the cell for triggers once
+        trigger_lines = self.trigger_matcher.scan("".join(source_lines))
+
+        # Exclude the cell if any of its lines contains the exclusion indicator
+        if any(
+            hit.kind == CELL_EXCLUDE_TRIGGER
+            for trigger_line in trigger_lines
+            for hit in trigger_line.hits
+        ):
+            return None
+
+        # Process the text in the cell as we would for a normal file
+        return self._convert_source_text(source_lines, trigger_lines)
+
+    def _convert_source_text(
+        self,
+        source_text_lines: List[str],
+        trigger_lines: List[TriggerLine] = None,
+        context: ConversionContext = None,
+    ) -> List[str]:
         """
         Converts source text from a solution version of an assignment file into
-        a student version of the file. Returns the converted text as a string.
+        a student version of the file. Returns the converted text as a list of
+        lines (replacement text is kept as a single entry).
 
         Args:
             source_text_lines (List[str]): The lines of text to convert.
+            trigger_lines (List[TriggerLine], optional): The lines of the joined
+                text that contain triggers, if the text was already scanned.
+            context (ConversionContext, optional): The state of the conversion.
+                Defaults to None, in which case a new context is used.
 
         Returns:
             List[str]: The converted lines of text as a list of strings.
         """
+        if context is None:
+            context = ConversionContext(self.trigger_table)
+
+        # Join the lines so the text can be scanned and sliced as a whole
+        text = "".join(source_text_lines)
+        if trigger_lines is None:
+            trigger_lines = self.trigger_matcher.scan(text)
 
-        # Create new list to store the converted text
+        # Nothing to convert: keep the lines as they are
+        if not trigger_lines and not context.mask_manager.is_mask_active():
+            context.codeblock_manager.end_of_file_check()
+            return list(source_text_lines)
+
+        # Split unchanged regions back into lines
         new_lines = []
+        for piece, unchanged in self._iter_converted_pieces(
+            text, trigger_lines, context
+        ):
+            if unchanged:
+                new_lines.extend(split_lines(piece))
+            else:
+                new_lines.append(piece)
+
+        # Check for open code block at end of file
+        context.codeblock_manager.end_of_file_check()
+
+        return new_lines
+
+    def _convert_text(
+        self,
+        text: str,
+        trigger_lines: List[TriggerLine] = None,
+        context: ConversionContext = None,
+        end_of_file: bool = True,
+    ) -> List[str]:
+        """
+        Converts the text of a solution version of an assignment file into the
+        text of the student version. Unchanged regions are returned as slices of
+        the original text rather than line by line.
+
+        Args:
+            text (str): The text to convert.
+            trigger_lines (List[TriggerLine], optional): The lines of the text
+                that contain triggers, if the text was already scanned.
+            context (ConversionContext, optional): The state of the conversion.
+                Defaults to None, in which case a new context is used.
+            end_of_file (bool, optional): Whether the text ends the file. If
+                False, codeblocks may still be open after the text (e.g. when
+                converting a file chunk by chunk). Defaults to True.
 
-        # Loop through each line in the source text
-        inside_code_block = False
-        inside_mask = False
-        for line in source_text_lines:
+        Returns:
+            List[str]: Pieces of text that join into the converted text.
+        """
+        if trigger_lines is None:
+            trigger_lines = self.trigger_matcher.scan(text)
+        if context is None:
+            context = ConversionContext(self.trigger_table)
+
+        pieces = [
+            piece
+            for piece, _ in self._iter_converted_pieces(text, trigger_lines, context)
+        ]
+
+        # Check for open code block at end of file
+        if end_of_file:
+            context.codeblock_manager.end_of_file_check()
+
+        return pieces
+
+    def _iter_converted_pieces(
+        self,
+        text: str,
+        trigger_lines: List[TriggerLine],
+        context: ConversionContext,
+    ):
+        """
+        Runs the codeblock and mask state machines over a text buffer. Only lines
+        containing triggers (and lines following a mask trigger, until the mask
+        ends) are processed individually. Every other line either belongs to an
+        unchanged region, yielded as one slice of the text, or to an active
+        codeblock and is dropped.
+
+        Args:
+            text (str): The text to convert.
+            trigger_lines (List[TriggerLine]): The lines of the text that contain
+                triggers, in order.
+            context (ConversionContext): The state of the conversion.
+
+        Yields:
+            Tuple[str, bool]: A piece of the converted text and whether it is an
+                unchanged region of the original text.
+        """
+
+        codeblock_manager = context.codeblock_manager
+        mask_manager = context.mask_manager
+
+        # Status of the state machines after the previously processed line (the
+        # context may continue the conversion of a previous chunk of text)
+        inside_code_block = codeblock_manager.is_codeblock_active()
+        inside_mask = mask_manager.is_mask_active()
+
+        # Offset of the first line that has not been processed or yielded
+        pos = 0
+        text_len = len(text)
+        trigger_line_i = 0
+
+        while pos < text_len:
+
+            # Find the next line containing a trigger (if any)
+            next_trigger_line = None
+            if trigger_line_i < len(trigger_lines):
+                next_trigger_line = trigger_lines[trigger_line_i]
+
+            # While a mask is active, every line must be checked for whitespace
+            if mask_manager.is_mask_active():
+                line_end = text.find("\n", pos)
+                line_end = text_len if line_end == -1 else line_end + 1
+                hits = []
+                if next_trigger_line is not None and next_trigger_line.start == pos:
+                    hits = next_trigger_line.hits
+                    trigger_line_i += 1
+
+            # Otherwise lines without triggers do not change any state: yield
+            # them as one slice (or drop them if a codeblock is active)
+            else:
+                if next_trigger_line is None:
+                    break
+
+                if pos < next_trigger_line.start and not inside_code_block:
+                    yield text[pos : next_trigger_line.start], True
+
+                pos, line_end = next_trigger_line.start, next_trigger_line.end
+                hits = next_trigger_line.hits
+                trigger_line_i += 1
+
+            line = text[pos:line_end]
+            pos = line_end
 
             # Update the status of the code block manager based on the current line
-            self.codeblock_manager.update_state(line)
+            codeblock_manager.update_state(line, hits)
 
             # Collect the current status of the code block manager
-            codeblock_active = self.codeblock_manager.is_codeblock_active()
+            codeblock_active = codeblock_manager.is_codeblock_active()
 
             # Update the status of the mask manager based on the current line
-            self.mask_manager.update_state(line)
+            mask_manager.update_state(line, hits)
 
             # Collect the current status of the mask manager
-            mask_active = self.mask_manager.is_mask_active()
+            mask_active = mask_manager.is_mask_active()
 
             # If both a mask and code block are active, raise an error
             if mask_active and codeblock_active:
@@ -217,17 +953,17 @@ class FileConverter:
 
             # If we are starting a code block, add the replacement text
             if not inside_code_block and codeblock_active:
-                new_lines.append(self.codeblock_manager.get_replacement_str())
+                yield context.get_replacement_str(), False
 
             # If we are starting a mask, add the replacement text
             elif not inside_mask and mask_active:
-                new_lines.append(self.mask_manager.get_masked_str(line))
+                yield mask_manager.get_masked_str(line), False
 
-            # If we are not in a code block, AND not in a mask: add the line to the new text
+            # If we are not in a code block, AND not in a mask: keep the line
             elif (not inside_code_block and not codeblock_active) and (
                 not inside_mask and not mask_active
             ):
-                new_lines.append(line)
+                yield line, True
 
             # Update the status of the inside code block flag
             inside_code_block = codeblock_active
@@ -235,8 +971,257 @@ class FileConverter:
             # Update the status of the inside mask flag
             inside_mask = mask_active
 
-        # Check for open code block at end of file
-        self.codeblock_manager.end_of_file_check()
+        # Keep the rest of the text if it is not inside a code block
+        if pos < text_len and not inside_code_block:
+            yield text[pos:], True
 
-        # Return the new lines
-        return new_lines
+
+def parallel_cells_from_options(options: List[str]) -> Tuple[int, int]:
+    """
+    Returns the number of worker processes and the cell threshold of the cell
+    pool from the options of an assignment (lines like "parallel_cells 500").
+
+    Args:
+        options (List[str]): The lines of the options.pact file.
+
+    Raises:
+        ValueError: If the parallel_cells option is malformed.
+
+    Returns:
+        Tuple[int, int]: The number of workers (1 without the option) and the
+            minimum number of cells converted in the pool.
+    """
+    workers, threshold = 1, PARALLEL_CELL_THRESHOLD
+
+    for option in options:
+        parts = option.split()
+        if not parts or parts[0] != PARALLEL_CELLS_OPTION:
+            continue
+
+        if len(parts) > 2 or (len(parts) == 2 and not parts[1].isdigit()):
+            raise ValueError(
+                f"Invalid {PARALLEL_CELLS_OPTION} option: '{option}'. "
+                f"Expected '{PARALLEL_CELLS_OPTION} [threshold]'."
+            )
+
+        workers = os.cpu_count() or 1
+        threshold = int(parts[1]) if len(parts) == 2 else PARALLEL_CELL_THRESHOLD
+
+    return workers, threshold
+
+
+def split_lines(text: str) -> List[str]:
+    """
+    Splits text into lines on newline characters, keeping the newlines. Unlike
+    str.splitlines, only "\\n" ends a line (matching how files are read).
+
+    Args:
+        text (str): The text to split.
+
+    Returns:
+        List[str]: The lines of the text.
+    """
+    lines = [line + "\n" for line in text.split("\n")]
+
+    # The last entry is only a line if the text does not end with a newline
+    if lines[-1] == "\n":
+        lines.pop()
+    else:
+        lines[-1] = lines[-1][:-1]
+
+    return lines
+
+
+def iter_line_chunks(file, chunk_size: int):
+    """
+    Reads a file in chunks that end with a complete line (or the end of the
+    file). Lines longer than the chunk size are kept whole.
+
+    Args:
+        file (IO): A file opened in text or binary mode.
+        chunk_size (int): The number of characters (or bytes) to read at once.
+
+    Yields:
+        str | bytes: The chunks of the file, in order.
+    """
+    carry = file.read(0)
+    newline = "\n" if isinstance(carry, str) else b"\n"
+
+    while True:
+        data = file.read(chunk_size)
+        if not data:
+            break
+
+        # Keep the incomplete last line for the next chunk
+        data = carry + data
+        split = data.rfind(newline) + 1
+        if split == 0:
+            carry = data
+            continue
+
+        yield data[:split]
+        carry = data[split:]
+
+    if carry:
+        yield carry
+
+
+def located_error(error: Exception, location: str) -> Optional[Exception]:
+    """
+    Returns a copy of a conversion error whose message starts with where the
+    error happened (e.g. "Cell 3: ..."). Attributes set on the error (like
+    cell_index) are kept.
+
+    Args:
+        error (Exception): The error raised by the conversion.
+        location (str): Where the error happened.
+
+    Returns:
+        Optional[Exception]: The new error, or None if the error is not a
+            conversion error (subclasses of ValueError other than the invalid
+            codeblock and mask errors are left as they are).
+    """
+    if isinstance(error, (InvalidCodeBlockError, InvalidMaskError)):
+        new_error = type(error)(f"{location}: {error.message}", error.error_code)
+    elif type(error) is ValueError:
+        new_error = ValueError(f"{location}: {error}")
+    else:
+        return None
+
+    new_error.__dict__.update(
+        (key, value)
+        for key, value in error.__dict__.items()
+        if key not in new_error.__dict__
+    )
+    return new_error
+
+
+def _cell_error(error: Exception, cell_index: int) -> Optional[Exception]:
+    """
+    Returns a copy of a conversion error whose message starts with the index of
+    the failing cell (also set as its cell_index attribute).
+
+    Args:
+        error (Exception): The error raised while converting the cell.
+        cell_index (int): The index of the cell in the notebook.
+
+    Returns:
+        Optional[Exception]: The new error, or None if the error is not a
+            conversion error.
+    """
+    cell_error = located_error(error, f"Cell {cell_index}")
+    if cell_error is not None:
+        cell_error.cell_index = cell_index
+    return cell_error
+
+
+_cell_worker_converter: FileConverter = None
+"""
+_cell_worker_converter: The converter of a worker process of the cell pool.
+"""
+
+
+def _init_cell_worker(trigger_table: TriggerTable) -> None:
+    """
+    Creates the converter of a worker process of the cell pool.
+
+    Args:
+        trigger_table (TriggerTable): The trigger table of the conversion.
+    """
+    global _cell_worker_converter
+    _cell_worker_converter = FileConverter(trigger_table=trigger_table)
+
+
+def _convert_cell_batch(
+    indexed_sources: List[Tuple[int, List[str]]],
+) -> List[Optional[List[str]]]:
+    """
+    Converts a batch of cell sources in a worker process of the cell pool.
+
+    Args:
+        indexed_sources (List[Tuple[int, List[str]]]): The index of each cell in
+            the notebook and its source.
+
+    Returns:
+        List[Optional[List[str]]]: The converted sources, in the same order.
+    """
+    return [
+        _cell_worker_converter._convert_indexed_cell_source(index, source)
+        for index, source in indexed_sources
+    ]
+
+
+def _convert_cells_in_pool(
+    trigger_table: TriggerTable,
+    indexed_sources: List[Tuple[int, List[str]]],
+    workers: int,
+) -> List[Optional[List[str]]]:
+    """
+    Converts cell sources in a pool of worker processes. Cells are sent in
+    batches (a few per worker, to balance the load while keeping the number of
+    messages low) and the results are collected in order, so the first failing
+    cell is reported, as in a serial conversion.
+
+    Args:
+        trigger_table (TriggerTable): The trigger table of the conversion.
+        indexed_sources (List[Tuple[int, List[str]]]): The index of each cell in
+            the notebook and its source.
+        workers (int): The number of worker processes.
+
+    Returns:
+        List[Optional[List[str]]]: The converted sources, in the same order.
+    """
+    if not indexed_sources:
+        return []
+
+    batch_size = -(-len(indexed_sources) // (workers * CELL_BATCHES_PER_WORKER))
+    batches = [
+        indexed_sources[start : start + batch_size]
+        for start in range(0, len(indexed_sources), batch_size)
+    ]
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_cell_worker,
+        initargs=(trigger_table,),
+    ) as executor:
+        return [
+            student_source
+            for batch_result in executor.map(_convert_cell_batch, batches)
+            for student_source in batch_result
+        ]
+
+
+def _check_no_nul(text: str) -> str:
+    """
+    Returns decoded text, unless it contains NUL characters: these are UTF-16
+    text read as single bytes (whose triggers are not found) or binary data.
+
+    Args:
+        text (str): The decoded text.
+
+    Raises:
+        UnicodeDecodeError: If the text contains a NUL character.
+
+    Returns:
+        str: The text.
+    """
+    index = text.find("\x00")
+    if index != -1:
+        raise UnicodeDecodeError(
+            "utf-8", text[index].encode(), 0, 1, f"NUL character at offset {index}"
+        )
+    return text
+
+
+def _remove_file(file_path: str) -> None:
+    """
+    Removes a file if it exists.
+
+    Args:
+        file_path (str): The path to the file to remove.
+    """
+    try:
+        os.remove(file_path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,171 @@
+"""
+file_copy.py
+
+This module contains helpers to copy files that do not need to be converted
+without reading them into Python memory.
+"""
+
+from __future__ import annotations
+
+import mmap
+import os
+import re
+import shutil
+import sys
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - fcntl is POSIX only
+    fcntl = None
+
+FICLONE = 0x40049409
+"""
+FICLONE: The Linux ioctl sharing the extents of a file with another (a
+copy-on-write clone, or reflink) on filesystems that support it (Btrfs, XFS).
+"""
+
+# How clone_file created a file
+CLONE_REFLINK = "reflink"
+CLONE_LINK = "link"
+CLONE_COPY = "copy"
+
+
+def copy_file(source_file_path: str, destination_file_path: str) -> None:
+    """
+    Copies a file, letting the kernel move the data when possible
+    (os.copy_file_range, then os.sendfile). Falls back to shutil.copyfile if
+    neither is available for these files, or if they copy fewer bytes than
+    the size of the source.
+
+    Args:
+        source_file_path (str): The path to the file to copy.
+        destination_file_path (str): The path to copy the file to.
+    """
+    try:
+        with open(source_file_path, "rb") as source, open(
+            destination_file_path, "wb"
+        ) as destination:
+            _kernel_copy(source.fileno(), destination.fileno())
+    except OSError:
+        # Restart from scratch with a regular copy (truncates partial output)
+        shutil.copyfile(source_file_path, destination_file_path)
+
+
+def clone_file(
+    source_file_path: str, destination_file_path: str, reflink: bool = True
+) -> str:
+    """
+    Creates a file with the contents of another, as cheaply as possible: a
+    reflink if the filesystem supports it, otherwise a hard link (the files
+    then share their inode), otherwise a copy.
+
+    Args:
+        source_file_path (str): The path to the file to clone.
+        destination_file_path (str): The path to the new file (which must not
+            exist).
+        reflink (bool, optional): Whether to try a reflink first. Callers that
+            know the filesystem does not support them can skip the attempt
+            (which creates and removes the file). Defaults to True.
+
+    Raises:
+        OSError: If the file cannot be created.
+
+    Returns:
+        str: CLONE_REFLINK, CLONE_LINK or CLONE_COPY.
+    """
+    if reflink and fcntl is not None and sys.platform.startswith("linux"):
+        with open(source_file_path, "rb") as source, open(
+            destination_file_path, "xb"
+        ) as destination:
+            try:
+                fcntl.ioctl(destination.fileno(), FICLONE, source.fileno())
+                return CLONE_REFLINK
+            except OSError:
+                pass
+        os.remove(destination_file_path)
+
+    try:
+        os.link(source_file_path, destination_file_path)
+        return CLONE_LINK
+    except FileExistsError:
+        raise
+    except OSError:
+        pass
+
+    copy_file(source_file_path, destination_file_path)
+    return CLONE_COPY
+
+
+def _kernel_copy(source_fd: int, destination_fd: int) -> None:
+    """
+    Copies all data between two file descriptors inside the kernel.
+
+    Args:
+        source_fd (int): The file descriptor to read from.
+        destination_fd (int): The file descriptor to write to.
+
+    Raises:
+        OSError: If no kernel-side copy is available for these files, or if
+            fewer bytes than the size of the source could be copied (e.g. a
+            file that shrank, or a proc-like file reporting a wrong size).
+    """
+    size = os.fstat(source_fd).st_size
+
+    # Files reporting no size may still have contents (e.g. proc-like files):
+    # leave them, and empty files, to the regular copy
+    if size == 0:
+        raise OSError("Source file reports no size.")
+
+    # Prefer copy_file_range (can share extents on some filesystems)
+    if hasattr(os, "copy_file_range"):
+        try:
+            copied = 0
+            while copied < size:
+                sent = os.copy_file_range(source_fd, destination_fd, size - copied)
+                if sent == 0:
+                    raise OSError(
+                        f"copy_file_range stopped at {copied} of {size} bytes."
+                    )
+                copied += sent
+            return
+        except OSError:
+            # e.g. unsupported across filesystems: retry with sendfile
+            os.lseek(source_fd, 0, os.SEEK_SET)
+            os.lseek(destination_fd, 0, os.SEEK_SET)
+            os.ftruncate(destination_fd, 0)
+
+    if not hasattr(os, "sendfile"):
+        raise OSError("No kernel-side copy available.")
+
+    copied = 0
+    while copied < size:
+        sent = os.sendfile(destination_fd, source_fd, copied, size - copied)
+        if sent == 0:
+            raise OSError(f"sendfile stopped at {copied} of {size} bytes.")
+        copied += sent
+
+
+def file_contains_pattern(file_path: str, pattern: re.Pattern) -> bool:
+    """
+    Returns whether the raw bytes of a file match a compiled bytes pattern. The
+    file is memory mapped, so it is never read into Python memory.
+
+    Args:
+        file_path (str): The path to the file to search.
+        pattern (re.Pattern): A compiled regex over bytes.
+
+    Returns:
+        bool: True if the pattern is found in the file, False otherwise.
+    """
+    with open(file_path, "rb") as file:
+        # Empty files cannot be memory mapped (and contain nothing)
+        if os.fstat(file.fileno()).st_size == 0:
+            return False
+
+        try:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                return pattern.search(buffer) is not None
+        except (OSError, ValueError):
+            # Some filesystems do not support mmap: read the file instead
+            file.seek(0)
+            return pattern.search(file.read()) is not None
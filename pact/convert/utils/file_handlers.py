@@ -0,0 +1,168 @@
+"""
+file_handlers.py
+
+This module contains the FileHandlerRegistry class, which decides how each file is
+handled during conversion (converted as text, converted as a notebook, copied or
+skipped) from its extension and, if needed, its first bytes.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import Dict, Iterable, List, Tuple
+
+from pact.convert.utils.file_types import (
+    BINARY_EXTENSIONS,
+    SNIFF_SIZE,
+    is_binary_prefix,
+    read_prefix,
+)
+
+# Names of the built-in file handlers
+TEXT_HANDLER = "text"
+NOTEBOOK_HANDLER = "notebook"
+COPY_HANDLER = "copy"
+SKIP_HANDLER = "skip"
+
+BUILTIN_HANDLERS = (TEXT_HANDLER, NOTEBOOK_HANDLER, COPY_HANDLER, SKIP_HANDLER)
+"""
+BUILTIN_HANDLERS: The names of the handlers every FileConverter has.
+"""
+
+HANDLER_OPTION = "handler"
+"""
+HANDLER_OPTION: Lines of options.pact starting with this word map an extension to
+a handler, e.g. "handler .csv copy".
+"""
+
+
+class FileHandlerRegistry:
+    """
+    Maps files to the name of the handler that converts them.
+
+    Extensions are looked up first (a single dict lookup). Files with an
+    unregistered extension are sniffed: registered magic bytes are checked
+    against the start of the file, binary files (see
+    file_types.is_binary_prefix) are copied, and every other file is handled
+    as text.
+    """
+
+    def __init__(self):
+        """
+        Creates a new FileHandlerRegistry with the built-in mappings.
+        """
+
+        # Map lowercase extensions (with their dot) to handler names
+        self._by_extension: Dict[str, str] = {".ipynb": NOTEBOOK_HANDLER}
+        for ext in BINARY_EXTENSIONS:
+            self._by_extension[ext] = COPY_HANDLER
+
+        # Registered magic byte prefixes and their handler names (checked in
+        # order, before the built-in binary file detection)
+        self._by_magic: List[Tuple[bytes, str]] = []
+
+    @classmethod
+    def from_options(
+        cls, options: List[str], handler_names: Iterable[str] = BUILTIN_HANDLERS
+    ) -> FileHandlerRegistry:
+        """
+        Creates a registry with the built-in mappings, updated with the handler
+        options of an assignment (lines like "handler .csv copy").
+
+        Args:
+            options (List[str]): The lines of the options.pact file.
+            handler_names (Iterable[str], optional): The names of the handlers
+                options may map extensions to. Defaults to BUILTIN_HANDLERS.
+
+        Raises:
+            ValueError: If a handler option is malformed or names an unknown
+                handler.
+
+        Returns:
+            FileHandlerRegistry: The registry.
+        """
+        registry = cls()
+        handler_names = list(handler_names)
+
+        for option in options:
+            parts = option.split()
+            if not parts or parts[0] != HANDLER_OPTION:
+                continue
+
+            if len(parts) != 3:
+                raise ValueError(
+                    f"Invalid handler option: '{option}'. "
+                    f"Expected '{HANDLER_OPTION} <extension> <handler>'."
+                )
+
+            if parts[2] not in handler_names:
+                raise ValueError(
+                    f"Invalid handler option: '{option}'. "
+                    f"Expected one of the handlers: {', '.join(handler_names)}."
+                )
+
+            registry.register_extension(parts[1], parts[2])
+
+        return registry
+
+    def register_extension(self, ext: str, handler_name: str) -> None:
+        """
+        Maps a file extension to a handler (replacing any previous mapping).
+
+        Args:
+            ext (str): The file extension (case insensitive, the leading dot is
+                optional).
+            handler_name (str): The name of the handler.
+        """
+        ext = ext.lower()
+        if not ext.startswith("."):
+            ext = f".{ext}"
+
+        self._by_extension[ext] = handler_name
+
+    def register_magic(self, magic: bytes, handler_name: str) -> None:
+        """
+        Maps files starting with some bytes to a handler. Magic bytes are only
+        checked for files whose extension is not registered, and take priority
+        over previously registered magic bytes.
+
+        Args:
+            magic (bytes): The first bytes of the files.
+            handler_name (str): The name of the handler.
+
+        Raises:
+            ValueError: If the magic bytes are empty or longer than SNIFF_SIZE.
+        """
+        if not magic or len(magic) > SNIFF_SIZE:
+            raise ValueError(
+                f"Magic bytes must be between 1 and {SNIFF_SIZE} bytes long."
+            )
+
+        self._by_magic.insert(0, (magic, handler_name))
+
+    def resolve(self, file_path: str) -> str:
+        """
+        Returns the name of the handler of a file.
+
+        Args:
+            file_path (str): The path to the file.
+
+        Returns:
+            str: The name of the handler.
+        """
+        _, ext = os.path.splitext(file_path)
+        handler_name = self._by_extension.get(ext.lower())
+        if handler_name is not None:
+            return handler_name
+
+        # Sniff the start of the file
+        prefix = read_prefix(file_path)
+
+        for magic, handler_name in self._by_magic:
+            if prefix.startswith(magic):
+                return handler_name
+
+        if is_binary_prefix(prefix):
+            return COPY_HANDLER
+
+        return TEXT_HANDLER
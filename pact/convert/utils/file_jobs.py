@@ -0,0 +1,258 @@
+"""
+file_jobs.py
+
+This module contains the convert_files function, which converts the files of a
+work list one at a time or in parallel: copies in a pool of threads (they wait
+on I/O), text and notebook conversions in a pool of processes (they need CPU).
+"""
+
+from __future__ import annotations
+
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import ExitStack
+from typing import Iterable, List, Optional, Tuple
+
+from pact.convert.utils.file_converter import FileConverter, located_error
+from pact.convert.utils.file_handlers import COPY_HANDLER, SKIP_HANDLER
+from pact.convert.utils.tree_walker import WorkItem
+
+THREAD_HANDLERS = (COPY_HANDLER, SKIP_HANDLER)
+"""
+THREAD_HANDLERS: The handlers run in the thread pool. Files of other handlers
+(text and notebooks) are converted in the process pool.
+"""
+
+FILE_BATCHES_PER_WORKER = 4
+"""
+FILE_BATCHES_PER_WORKER: The number of batches of files sent to each worker of
+the process pool.
+"""
+
+
+def jobs_from_argument(value: str) -> int:
+    """
+    Parses the --jobs argument of the conversion scripts: a number of jobs, or
+    0 for one job per CPU.
+
+    Args:
+        value (str): The value of the argument.
+
+    Raises:
+        ValueError: If the value is not a non-negative integer.
+
+    Returns:
+        int: The number of jobs.
+    """
+    if not value.isdigit():
+        raise ValueError(f"Invalid number of jobs: '{value}'. Expected N >= 0.")
+
+    return int(value) or os.cpu_count() or 1
+
+
+def convert_file_item(
+    file_converter: FileConverter, item: WorkItem, handler_name: str = None
+) -> None:
+    """
+    Converts a file of a work list into its (existing) destination folder.
+    Conversion errors are raised with the path of the file at the start of
+    their message and as their source_path attribute.
+
+    Args:
+        file_converter (FileConverter): The converter.
+        item (WorkItem): The file to convert.
+        handler_name (str, optional): The handler of the file, if it was already
+            resolved. Defaults to None.
+    """
+    try:
+        file_converter.convert_file(
+            source_file_path=item.source_path,
+            destination_folder_path=item.destination_folder,
+            create_folder=False,
+            handler_name=handler_name,
+        )
+    except Exception as error:
+        file_error = _file_error(error, item.source_path)
+        if file_error is None:
+            raise
+        raise file_error from error
+
+
+def convert_files(
+    file_converter: FileConverter, items: List[WorkItem], jobs: int = 1
+) -> None:
+    """
+    Converts the files of a work list. With more than one job, files are
+    converted in a thread pool and a process pool of `jobs` workers each, and
+    the error of the first failing file (in work list order) is raised once
+    every file was converted, so the result never depends on scheduling.
+
+    Args:
+        file_converter (FileConverter): The converter (shared by the threads,
+            copied into each worker process).
+        items (List[WorkItem]): The files to convert.
+        jobs (int, optional): The number of parallel jobs. Defaults to 1.
+    """
+    if jobs <= 1 or len(items) < 2:
+        for item in items:
+            convert_file_item(file_converter, item)
+        return
+
+    # Choose the pool of each file from its handler
+    thread_items = []
+    process_items = []
+    for index, item in enumerate(items):
+        handler_name = file_converter.handler_registry.resolve(item.source_path)
+        if handler_name in THREAD_HANDLERS:
+            thread_items.append((index, item, handler_name))
+        else:
+            process_items.append((index, item, handler_name))
+
+    errors = {}
+    with ExitStack() as stack:
+        # Submit the files of the process pool before starting the threads:
+        # its workers are forked on the first submission, and forking while
+        # other threads run could leave the locks they hold (e.g. logging or
+        # import locks) locked forever in the workers
+        process_results = []
+        if process_items:
+            process_executor = stack.enter_context(
+                ProcessPoolExecutor(
+                    max_workers=jobs,
+                    initializer=_init_file_worker,
+                    initargs=(file_converter,),
+                )
+            )
+            process_results = _submit_file_batches(
+                process_executor, process_items, jobs
+            )
+
+        thread_executor = stack.enter_context(ThreadPoolExecutor(max_workers=jobs))
+        thread_results = thread_executor.map(
+            lambda indexed_item: _try_convert(file_converter, indexed_item),
+            thread_items,
+        )
+
+        for batch, batch_errors in process_results:
+            errors.update(
+                (index, error)
+                for (index, _, _), error in zip(batch, batch_errors)
+                if error is not None
+            )
+        errors.update(
+            (index, error)
+            for (index, _, _), error in zip(thread_items, thread_results)
+            if error is not None
+        )
+
+    if errors:
+        raise errors[min(errors)]
+
+
+def _try_convert(
+    file_converter: FileConverter, indexed_item: Tuple[int, WorkItem, str]
+) -> Optional[Exception]:
+    """
+    Converts a file of a work list, returning its error instead of raising it.
+
+    Args:
+        file_converter (FileConverter): The converter.
+        indexed_item (Tuple[int, WorkItem, str]): The index of the file in the
+            work list, the file and its handler.
+
+    Returns:
+        Optional[Exception]: The error of the conversion, or None.
+    """
+    _, item, handler_name = indexed_item
+    try:
+        convert_file_item(file_converter, item, handler_name)
+    except Exception as error:
+        return error
+    return None
+
+
+def _file_error(error: Exception, source_path: str) -> Optional[Exception]:
+    """
+    Returns a copy of a conversion error whose message starts with the path of
+    the failing file (also set as its source_path attribute).
+
+    Args:
+        error (Exception): The error raised while converting the file.
+        source_path (str): The path to the file.
+
+    Returns:
+        Optional[Exception]: The new error, or None if the error is not a
+            conversion error.
+    """
+    file_error = located_error(error, source_path)
+    if file_error is not None:
+        file_error.source_path = source_path
+    return file_error
+
+
+_file_worker_converter: FileConverter = None
+"""
+_file_worker_converter: The converter of a worker process of the file pool.
+"""
+
+
+def _init_file_worker(file_converter: FileConverter) -> None:
+    """
+    Sets the converter of a worker process of the file pool.
+
+    Args:
+        file_converter (FileConverter): The converter of the conversion.
+    """
+    global _file_worker_converter
+    _file_worker_converter = file_converter
+
+    # The files are already converted in parallel: no cell pools in workers
+    _file_worker_converter.cell_workers = 1
+
+
+def _convert_file_batch(
+    indexed_items: List[Tuple[int, WorkItem, str]],
+) -> List[Optional[Exception]]:
+    """
+    Converts a batch of files in a worker process of the file pool.
+
+    Args:
+        indexed_items (List[Tuple[int, WorkItem, str]]): The index of each file
+            in the work list, the file and its handler.
+
+    Returns:
+        List[Optional[Exception]]: The error of each conversion, or None.
+    """
+    return [
+        _try_convert(_file_worker_converter, indexed_item)
+        for indexed_item in indexed_items
+    ]
+
+
+def _submit_file_batches(
+    executor: ProcessPoolExecutor,
+    indexed_items: List[Tuple[int, WorkItem, str]],
+    jobs: int,
+) -> Iterable[Tuple[List[Tuple[int, WorkItem, str]], List[Optional[Exception]]]]:
+    """
+    Submits files to a pool of worker processes, in batches. Every batch is
+    submitted before this returns (so the workers are already started).
+
+    Args:
+        executor (ProcessPoolExecutor): The pool of the file workers.
+        indexed_items (List[Tuple[int, WorkItem, str]]): The index of each file
+            in the work list, the file and its handler.
+        jobs (int): The number of worker processes.
+
+    Returns:
+        Iterable[Tuple[List[Tuple[int, WorkItem, str]], List[Optional[Exception]]]]:
+            Each batch and the error of each of its conversions (or None), in
+            order, as the batches complete.
+    """
+    batch_size = -(-len(indexed_items) // (jobs * FILE_BATCHES_PER_WORKER))
+    batches = [
+        indexed_items[start : start + batch_size]
+        for start in range(0, len(indexed_items), batch_size)
+    ]
+
+    return zip(batches, executor.map(_convert_file_batch, batches))
@@ -0,0 +1,197 @@
+"""
+file_types.py
+
+This module classifies files as binary or text before they are read, using a
+table of binary file extensions and a sniff of the first bytes of the file.
+"""
+
+from __future__ import annotations
+
+import codecs
+import os
+
+BINARY_EXTENSIONS = frozenset(
+    [
+        # Images
+        ".png",
+        ".jpg",
+        ".jpeg",
+        ".gif",
+        ".tiff",
+        ".bmp",
+        ".ico",
+        ".webp",
+        # Model checkpoints and serialized data
+        ".pt",
+        ".pth",
+        ".ckpt",
+        ".pkl",
+        ".pickle",
+        ".joblib",
+        ".npy",
+        ".npz",
+        ".h5",
+        ".hdf5",
+        ".onnx",
+        ".safetensors",
+        ".parquet",
+        ".feather",
+        ".arrow",
+        ".sqlite",
+        ".db",
+        # Archives and documents
+        ".zip",
+        ".gz",
+        ".tgz",
+        ".bz2",
+        ".xz",
+        ".7z",
+        ".tar",
+        ".whl",
+        ".jar",
+        ".pdf",
+        # Compiled code
+        ".so",
+        ".dll",
+        ".dylib",
+        ".pyc",
+        ".o",
+        ".a",
+        ".exe",
+        ".class",
+        # Audio and video
+        ".mp3",
+        ".mp4",
+        ".wav",
+        ".ogg",
+        ".mov",
+        ".avi",
+    ]
+)
+"""
+BINARY_EXTENSIONS: Files with these extensions (case insensitive) are always
+treated as binary files.
+"""
+
+MAGIC_NUMBERS = (
+    b"\x89PNG",  # PNG
+    b"\xff\xd8\xff",  # JPEG
+    b"GIF8",  # GIF
+    b"PK\x03\x04",  # zip (and .pt, .npz, .whl, .docx, ...)
+    b"\x1f\x8b",  # gzip
+    b"BZh",  # bzip2
+    b"\xfd7zXZ\x00",  # xz
+    b"%PDF-",  # PDF
+    b"\x7fELF",  # ELF executables and shared libraries
+    b"\xcf\xfa\xed\xfe",  # Mach-O
+    b"PAR1",  # Parquet
+    b"\x93NUMPY",  # NumPy .npy
+    b"\x89HDF",  # HDF5
+    b"SQLite format 3\x00",  # SQLite
+    b"\x80",  # Pickle (protocol 2+), never the first byte of UTF-8 text
+)
+"""
+MAGIC_NUMBERS: Files starting with one of these byte strings are binary files.
+"""
+
+WIDE_BYTE_ORDER_MARKS = (codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)
+"""
+WIDE_BYTE_ORDER_MARKS: The byte order marks of UTF-16 files (UTF-32 files start
+with the same bytes or with NUL bytes). Such files are text, although they
+contain NUL bytes, and their triggers are not found in their raw bytes.
+"""
+
+_PRINTABLE_ASCII = bytes(range(0x20, 0x7F)) + b"\t\n\r\f\v"
+"""
+_PRINTABLE_ASCII: The bytes of printable ASCII text (see is_wide_text).
+"""
+
+SNIFF_SIZE = 8192
+"""
+SNIFF_SIZE: The number of bytes read from the start of a file to classify it.
+"""
+
+
+def is_binary_file(file_path: str) -> bool:
+    """
+    Returns whether a file is a binary file, without reading more than
+    SNIFF_SIZE bytes of it. A file is binary if its extension is in
+    BINARY_EXTENSIONS, if it starts with one of the MAGIC_NUMBERS or if its
+    first bytes contain a NUL byte (unless they are UTF-16 text, see
+    is_wide_text).
+
+    Args:
+        file_path (str): The path to the file to classify.
+
+    Returns:
+        bool: True if the file is a binary file, False otherwise.
+    """
+    _, ext = os.path.splitext(file_path)
+    if ext.lower() in BINARY_EXTENSIONS:
+        return True
+
+    return is_binary_prefix(read_prefix(file_path))
+
+
+def read_prefix(file_path: str) -> bytes:
+    """
+    Returns the first bytes of a file (at most SNIFF_SIZE), used to classify it.
+
+    Args:
+        file_path (str): The path to the file.
+
+    Returns:
+        bytes: The first bytes of the file.
+    """
+    with open(file_path, "rb") as file:
+        return file.read(SNIFF_SIZE)
+
+
+def is_binary_prefix(prefix: bytes) -> bool:
+    """
+    Returns whether the first bytes of a file are those of a binary file: they
+    start with one of the MAGIC_NUMBERS, or contain a NUL byte (unless they
+    are UTF-16 text, see is_wide_text).
+
+    Args:
+        prefix (bytes): The first bytes of the file (see read_prefix).
+
+    Returns:
+        bool: True if the file is a binary file, False otherwise.
+    """
+    return prefix.startswith(MAGIC_NUMBERS) or (
+        b"\x00" in prefix and not is_wide_text(prefix)
+    )
+
+
+def is_wide_text(prefix: bytes) -> bool:
+    """
+    Returns whether the first bytes of a file are UTF-16 text: they start with
+    one of the WIDE_BYTE_ORDER_MARKS, or printable ASCII characters alternate
+    with NUL bytes. Such files contain NUL bytes, but must be decoded (never
+    copied as binary files), since their triggers are not found in their raw
+    bytes.
+
+    Args:
+        prefix (bytes): The first bytes of the file.
+
+    Returns:
+        bool: True if the bytes look like UTF-16 text.
+    """
+    if prefix.startswith(WIDE_BYTE_ORDER_MARKS):
+        return True
+
+    pairs = prefix[: len(prefix) // 2 * 2]
+    if not pairs:
+        return False
+
+    # Little endian (NUL high bytes) or big endian (NUL high bytes first)
+    for low_bytes, high_bytes in (
+        (pairs[0::2], pairs[1::2]),
+        (pairs[1::2], pairs[0::2]),
+    ):
+        if not high_bytes.strip(b"\x00") and not low_bytes.translate(
+            None, _PRINTABLE_ASCII
+        ):
+            return True
+    return False
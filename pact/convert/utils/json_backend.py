@@ -0,0 +1,75 @@
+"""
+json_backend.py
+
+This module selects the library used to parse JSON documents (and to write
+PACT's own JSON files): orjson if it is installed, the standard json module
+otherwise. Both give the same result.
+"""
+
+from __future__ import annotations
+
+import json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+JSON_BACKEND = "json" if orjson is None else "orjson"
+"""
+JSON_BACKEND: The name of the library used by loads and dumps.
+"""
+
+# orjson reads integers that do not fit in 64 bits as floats, and such integers
+# have at least 19 digits: documents with 19 digits in a row are left to json
+_DIGITS_TABLE = bytes(
+    ord("0") if ord("0") <= i <= ord("9") else ord(" ") for i in range(256)
+)
+_LONG_DIGIT_RUN = b"0" * 19
+
+
+def loads(data: bytes):
+    """
+    Parses a UTF-8 encoded JSON document. Documents orjson does not accept
+    (NaN, integers over 64 bits, lone surrogates, ...) are parsed by the json
+    module, so the result never depends on the backend.
+
+    Args:
+        data (bytes): The UTF-8 encoded document.
+
+    Raises:
+        UnicodeDecodeError: If the document is not valid UTF-8.
+        json.JSONDecodeError: If the document is not valid JSON.
+
+    Returns:
+        object: The parsed document.
+    """
+    if orjson is not None and _LONG_DIGIT_RUN not in data.translate(_DIGITS_TABLE):
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass
+
+    return json.loads(data.decode("utf-8"))
+
+
+def dumps(obj) -> bytes:
+    """
+    Serializes an object to compact UTF-8 encoded JSON, which loads reads back
+    as the same object. The output is not formatted like json.dumps (and
+    depends on the backend), so it is only used for PACT's own files, never for
+    student versions.
+
+    Args:
+        obj (object): The object to serialize.
+
+    Returns:
+        bytes: The UTF-8 encoded document.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj)
+        except orjson.JSONEncodeError:
+            pass
+
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
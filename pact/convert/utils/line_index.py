@@ -0,0 +1,116 @@
+"""
+line_index.py
+
+This module contains the LineIndex class, which maps offsets in a text buffer to
+the boundaries of the lines containing them. If NumPy is installed, the newline
+positions of large buffers are indexed once (from their UTF-8 encoding, so any
+text can be indexed) so that many offsets can be mapped with a single
+vectorized search.
+
+Indentation is not indexed: it is only needed for the lines that open a
+codeblock, which get_line_indentation reads from the line itself.
+"""
+
+from __future__ import annotations
+
+from typing import List, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is optional
+    np = None
+
+NUMPY_MIN_BUFFER_SIZE = 1 << 20
+"""
+NUMPY_MIN_BUFFER_SIZE: Buffers smaller than this (in characters) are not indexed
+with NumPy, as building the index costs more than it saves.
+"""
+
+
+class LineIndex:
+    """
+    Maps offsets in a text buffer to the boundaries of their lines. Lines end
+    with "\\n" (the newline is part of the line).
+    """
+
+    def __init__(self, text: str, use_numpy: bool = None):
+        """
+        Creates a new LineIndex.
+
+        Args:
+            text (str): The text to index.
+            use_numpy (bool, optional): Whether to index the newlines with NumPy.
+                Defaults to None, in which case NumPy is used if it is installed
+                and the text has at least NUMPY_MIN_BUFFER_SIZE characters.
+        """
+        self.text = text
+
+        # Sorted offsets of every newline in the text (only with NumPy)
+        self.newlines = None
+
+        if use_numpy is None:
+            use_numpy = np is not None and len(text) >= NUMPY_MIN_BUFFER_SIZE
+        if use_numpy and np is not None:
+            self.newlines = _newline_offsets(text)
+
+    @property
+    def is_vectorized(self) -> bool:
+        """
+        Returns whether offsets are mapped with NumPy.
+
+        Returns:
+            bool: True if the newlines are indexed with NumPy.
+        """
+        return self.newlines is not None
+
+    def line_bounds(self, offsets: List[int]) -> Tuple[List[int], List[int]]:
+        """
+        Returns the start and end offsets of the lines containing each offset.
+
+        Args:
+            offsets (List[int]): Offsets into the text (in ascending order).
+
+        Returns:
+            Tuple[List[int], List[int]]: The start and end (just past the
+                newline) offsets of each offset's line.
+        """
+        if not self.is_vectorized:
+            starts = [self.text.rfind("\n", 0, offset) + 1 for offset in offsets]
+            ends = [self.text.find("\n", offset) for offset in offsets]
+            ends = [len(self.text) if end == -1 else end + 1 for end in ends]
+            return starts, ends
+
+        # The line number of an offset is the number of newlines before it
+        offsets = np.asarray(offsets, dtype=np.int64)
+        line_numbers = np.searchsorted(self.newlines, offsets)
+
+        # Lines start after the previous newline and end after their own
+        padded_newlines = np.concatenate(([-1], self.newlines, [len(self.text) - 1]))
+        starts = padded_newlines[line_numbers] + 1
+        ends = padded_newlines[line_numbers + 1] + 1
+
+        return starts.tolist(), ends.tolist()
+
+
+def _newline_offsets(text: str):
+    """
+    Returns the sorted character offsets of the newlines of a text. The newlines
+    are found in the UTF-8 encoding of the text, and their byte offsets are
+    mapped back to character offsets by subtracting the number of continuation
+    bytes before them (none in ASCII text).
+
+    Args:
+        text (str): The text to index.
+
+    Returns:
+        np.ndarray: The offsets of the newlines.
+    """
+    raw = text.encode("utf-8", "surrogatepass")
+    buffer = np.frombuffer(raw, dtype=np.uint8)
+    newlines = np.flatnonzero(buffer == ord("\n"))
+    if len(raw) == len(text):
+        return newlines
+
+    # Every character after the first byte of a sequence is 0b10xxxxxx
+    continuation_bytes = np.flatnonzero((buffer & 0xC0) == 0x80)
+    return newlines - np.searchsorted(continuation_bytes, newlines)
@@ -7,6 +7,8 @@ of code in a file.
 
 from __future__ import annotations
 
+from pact.convert.utils.trigger_matcher import MASK_TRIGGER
+
 
 class InvalidMaskError(Exception):
     """
@@ -25,6 +27,11 @@ class InvalidMaskError(Exception):
         self.error_code = error_code
         super().__init__(f"{self.message}, Error code: {self.error_code}")
 
+    def __reduce__(self):
+        # Rebuild from the constructor arguments (e.g. when the error is sent
+        # back from a worker process), keeping any attributes set later
+        return (type(self), (self.message, self.error_code), self.__dict__)
+
 
 class MaskManager:
     """
@@ -108,40 +115,49 @@ class MaskManager:
         """
         self.active_mask_type = None
 
-    def _check_for_trigger(self, current_line: str):
+    def _check_for_trigger(self, current_line: str, hits: list = None):
         """
         Checks if the current line contains the trigger string for any of the mask types.
         If a trigger string is found, the corresponding mask type is activated.
 
         Args:
             current_line (str): The current line to check for trigger strings.
+            hits (List[TriggerHit], optional): The trigger hits already found in
+                the line by a TriggerMatcher. If not provided, the line is
+                scanned for the trigger of every registered mask type.
 
         Returns:
-            bool: True if a trigger string is found, False otherwise.
+            MaskType: The mask type found in the line, None otherwise.
         """
-        # Check if the current line contains the trigger string
-        found_mask_type = None
-
-        # For each codeblock type
-        for mask_type in self.mask_types:
-            if mask_type.trigger_str in current_line:
-                if found_mask_type is not None:
-                    raise InvalidMaskError(
-                        f"Multiple mask triggers found in line: {current_line}"
-                    )
-
-                # Set the return value
-                found_mask_type = mask_type
+        # Collect every mask type triggered by the current line
+        if hits is not None:
+            found_mask_types = [
+                hit.trigger_type for hit in hits if hit.kind == MASK_TRIGGER
+            ]
+        else:
+            found_mask_types = [
+                mask_type
+                for mask_type in self.mask_types
+                if mask_type.trigger_str in current_line
+            ]
+
+        # A line cannot contain multiple mask triggers
+        if len(found_mask_types) > 1:
+            raise InvalidMaskError(
+                f"Multiple mask triggers found in line: {current_line}"
+            )
 
         # Return the found mask type
-        return found_mask_type
+        return found_mask_types[0] if found_mask_types else None
 
-    def update_state(self, current_line: str):
+    def update_state(self, current_line: str, hits: list = None):
         """
         Updates the start of the codeblock manager based on the current line.
 
         Args:
             current_line (str): The current line of the file.
+            hits (List[TriggerHit], optional): The trigger hits already found in
+                the line by a TriggerMatcher.
         """
 
         # If this line is only whitespace, we deactivate the mask
@@ -150,7 +166,7 @@ class MaskManager:
 
         else:
             # Check if the current line contains the mask trigger
-            mask_trigger = self._check_for_trigger(current_line)
+            mask_trigger = self._check_for_trigger(current_line, hits)
 
             # If this line contains a mask trigger, we activate the mask
             if mask_trigger is not None:
@@ -0,0 +1,232 @@
+"""
+notebook_assets.py
+
+This module contains the AssetStore class, which writes large image attachments
+of notebook cells to an assets folder (one file per distinct image, named after
+its content hash) and points the cells' references to these files instead.
+"""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import hashlib
+import os
+import re
+import tempfile
+from typing import Iterable, List, Optional
+from urllib.parse import quote
+
+EXTERNALIZE_OPTION = "externalize_attachments"
+"""
+EXTERNALIZE_OPTION: The options.pact line enabling the externalization of
+attachments, optionally followed by the minimum size in bytes, e.g.
+"externalize_attachments 4096".
+"""
+
+ASSETS_FOLDER_NAME = "assets"
+"""
+ASSETS_FOLDER_NAME: The folder of the student version the attachments are
+written to.
+"""
+
+ATTACHMENT_MIN_SIZE = 1 << 14
+"""
+ATTACHMENT_MIN_SIZE: Attachments smaller than this many bytes (decoded) stay
+inline by default.
+"""
+
+ASSET_EXTENSIONS = {
+    "image/png": ".png",
+    "image/jpeg": ".jpg",
+    "image/gif": ".gif",
+    "image/webp": ".webp",
+    "image/bmp": ".bmp",
+}
+"""
+ASSET_EXTENSIONS: The base64 encoded MIME types that can be externalized, and the
+extension of their asset files.
+"""
+
+# Asset files are named after the SHA-256 of their contents
+_ASSET_NAME_PATTERN = re.compile(r"[0-9a-f]{64}\.[a-z]+")
+
+
+class AssetStore:
+    """
+    Writes large attachments of notebook cells to asset files, deduplicated by
+    content hash, and rewrites the references of the cells to point to them.
+    """
+
+    def __init__(self, assets_dir: str, min_size: int = ATTACHMENT_MIN_SIZE):
+        """
+        Creates a new AssetStore.
+
+        Args:
+            assets_dir (str): The folder to write the asset files to.
+            min_size (int, optional): The minimum decoded size of externalized
+                attachments. Defaults to ATTACHMENT_MIN_SIZE.
+        """
+        self.assets_dir = assets_dir
+        self.min_size = min_size
+
+    @classmethod
+    def from_options(cls, options: List[str], assets_dir: str) -> Optional[AssetStore]:
+        """
+        Creates a store from the options of an assignment, if they contain the
+        externalize_attachments option.
+
+        Args:
+            options (List[str]): The lines of the options.pact file.
+            assets_dir (str): The folder to write the asset files to.
+
+        Raises:
+            ValueError: If the externalize_attachments option is malformed.
+
+        Returns:
+            Optional[AssetStore]: The store, or None if attachments stay inline.
+        """
+        store = None
+
+        for option in options:
+            parts = option.split()
+            if not parts or parts[0] != EXTERNALIZE_OPTION:
+                continue
+
+            if len(parts) > 2 or (len(parts) == 2 and not parts[1].isdigit()):
+                raise ValueError(
+                    f"Invalid {EXTERNALIZE_OPTION} option: '{option}'. "
+                    f"Expected '{EXTERNALIZE_OPTION} [min_size]'."
+                )
+
+            min_size = int(parts[1]) if len(parts) == 2 else ATTACHMENT_MIN_SIZE
+            store = cls(assets_dir, min_size)
+
+        return store
+
+    def externalize_cell(self, cell: dict, notebook_dir: str) -> None:
+        """
+        Moves the large attachments referenced by a cell to asset files, in
+        place. Their references are rewritten to paths relative to the notebook.
+
+        Args:
+            cell (dict): The cell, with its source as a list of lines.
+            notebook_dir (str): The folder the notebook is written to.
+        """
+        attachments = cell.get("attachments")
+        if not isinstance(attachments, dict):
+            return
+
+        for name, bundle in list(attachments.items()):
+            data, ext = _decode_bundle(bundle)
+            if data is None or len(data) < self.min_size:
+                continue
+
+            # Only move attachments whose references can be rewritten
+            references = (f"attachment:{name}", f"attachment:{quote(name)}")
+            if not any(ref in line for line in cell["source"] for ref in references):
+                continue
+
+            asset_path = self.store(data, ext)
+            relative_path = os.path.relpath(asset_path, notebook_dir)
+            link = quote(relative_path.replace(os.sep, "/"))
+
+            cell["source"] = [
+                line.replace(references[0], link).replace(references[1], link)
+                for line in cell["source"]
+            ]
+            del attachments[name]
+
+        if not attachments:
+            del cell["attachments"]
+
+    def store(self, data: bytes, ext: str) -> str:
+        """
+        Writes data to the asset file named after its hash, unless the file
+        already exists.
+
+        Args:
+            data (bytes): The contents of the asset.
+            ext (str): The extension of the asset file.
+
+        Returns:
+            str: The path to the asset file.
+        """
+        asset_path = os.path.join(
+            self.assets_dir, hashlib.sha256(data).hexdigest() + ext
+        )
+        if os.path.exists(asset_path):
+            return asset_path
+
+        # Write to a temporary file first, so the asset is never seen half written
+        os.makedirs(self.assets_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.assets_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(data)
+            os.replace(tmp_path, asset_path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+        return asset_path
+
+    def remove_unreferenced(self, notebook_paths: Iterable[str]) -> None:
+        """
+        Removes the asset files none of the given notebooks refers to (e.g.
+        after a notebook was changed or deleted by an incremental conversion).
+
+        Args:
+            notebook_paths (Iterable[str]): The paths to every converted
+                notebook using the store.
+        """
+        referenced = set()
+        for notebook_path in notebook_paths:
+            try:
+                with open(notebook_path, "r", encoding="utf-8") as file:
+                    referenced.update(_ASSET_NAME_PATTERN.findall(file.read()))
+            except (OSError, UnicodeDecodeError):
+                continue
+
+        try:
+            entries = list(os.scandir(self.assets_dir))
+        except FileNotFoundError:
+            return
+
+        for entry in entries:
+            if (
+                _ASSET_NAME_PATTERN.fullmatch(entry.name)
+                and entry.name not in referenced
+            ):
+                os.remove(entry.path)
+
+
+def _decode_bundle(bundle) -> tuple:
+    """
+    Decodes an attachment with a single base64 encoded image.
+
+    Args:
+        bundle (dict): The MIME bundle of the attachment.
+
+    Returns:
+        tuple: The decoded image and the extension of its asset file, or
+            (None, None) if the attachment cannot be externalized.
+    """
+    if not isinstance(bundle, dict) or len(bundle) != 1:
+        return None, None
+
+    ((mime_type, encoded),) = bundle.items()
+    ext = ASSET_EXTENSIONS.get(mime_type)
+    if ext is None:
+        return None, None
+
+    # nbformat allows multiline strings to be stored as lists of lines
+    if isinstance(encoded, list):
+        encoded = "".join(encoded)
+    if not isinstance(encoded, str):
+        return None, None
+
+    try:
+        return base64.b64decode(encoded), ext
+    except (binascii.Error, ValueError):
+        return None, None
@@ -0,0 +1,282 @@
+"""
+notebook_reader.py
+
+This module contains read_notebook, which reads large ipynb files one cell at a
+time from a memory map, so neither the whole file nor the outputs of every cell
+are ever held in memory at once.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import mmap
+import os
+import re
+
+from pact.convert.utils import json_backend
+
+logger = logging.getLogger(__name__)
+
+STREAMING_MIN_SIZE = 1 << 22
+"""
+STREAMING_MIN_SIZE: Notebooks of at least this many bytes are parsed one cell at a
+time. Smaller notebooks are parsed at once with the JSON backend, which is faster.
+"""
+
+INITIAL_WINDOW_SIZE = 1 << 14
+"""
+INITIAL_WINDOW_SIZE: The smallest number of bytes decoded to parse a value of the
+notebook. The first window of a value is twice the size of the previous value
+(cells tend to have similar sizes), and it grows (WINDOW_GROWTH times) until the
+value fits.
+"""
+
+WINDOW_GROWTH = 4
+"""
+WINDOW_GROWTH: The factor by which the window grows when a value does not fit.
+"""
+
+_WHITESPACE = re.compile(rb"[ \t\n\r]*")
+
+
+def read_notebook(file_path: str, drop_code_outputs: bool = False) -> dict:
+    """
+    Reads an ipynb file. The result is the same as json.load, except that the
+    outputs of code cells can be dropped as soon as each cell is parsed.
+
+    Notebooks smaller than STREAMING_MIN_SIZE are parsed at once with the JSON
+    backend (orjson if it is installed). In larger notebooks, the top-level
+    object and the cells are parsed one value at a time (each value is decoded
+    from a window of the memory-mapped file and parsed with the standard JSON
+    decoder). Files that cannot be parsed this way (invalid JSON, unexpected
+    structure, no mmap support) are parsed at once, which also reports the
+    exact error.
+
+    Args:
+        file_path (str): The path to the ipynb file.
+        drop_code_outputs (bool, optional): If True, the outputs of code cells
+            are replaced with an empty list. Defaults to False.
+
+    Returns:
+        dict: The notebook.
+    """
+    with open(file_path, "rb") as file:
+        # Cells are parsed one at a time with the standard JSON decoder
+        streaming = os.fstat(file.fileno()).st_size >= STREAMING_MIN_SIZE
+        logger.debug(
+            "Parsing %s %s with the %s backend",
+            file_path,
+            "one cell at a time" if streaming else "at once",
+            "json" if streaming else json_backend.JSON_BACKEND,
+        )
+
+        if streaming:
+            try:
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                    return _NotebookParser(buffer, drop_code_outputs).parse()
+            except (ValueError, OSError):
+                logger.debug(
+                    "Parsing %s at once with the %s backend instead",
+                    file_path,
+                    json_backend.JSON_BACKEND,
+                )
+                file.seek(0)
+
+        notebook = json_backend.loads(file.read())
+
+    if drop_code_outputs and isinstance(notebook, dict):
+        for cell in notebook.get("cells", []):
+            _drop_outputs(cell)
+
+    return notebook
+
+
+def _drop_outputs(cell) -> None:
+    """
+    Replaces the outputs of a code cell with an empty list.
+
+    Args:
+        cell (dict): The cell.
+    """
+    if isinstance(cell, dict) and cell.get("cell_type") == "code" and "outputs" in cell:
+        cell["outputs"] = []
+
+
+class _NotebookParser:
+    """
+    Parses the top-level object of a notebook and its cells array one value at a
+    time from a buffer of UTF-8 encoded JSON.
+    """
+
+    def __init__(self, buffer, drop_code_outputs: bool):
+        """
+        Creates a new _NotebookParser.
+
+        Args:
+            buffer (bytes | mmap.mmap): The UTF-8 encoded notebook.
+            drop_code_outputs (bool): Whether to drop the outputs of code cells.
+        """
+        self.buffer = buffer
+        self.drop_code_outputs = drop_code_outputs
+        self.decoder = json.JSONDecoder()
+        self.pos = 0
+
+        # The size of the first window decoded for the next value
+        self.window_size = INITIAL_WINDOW_SIZE
+
+    def parse(self) -> dict:
+        """
+        Parses the notebook.
+
+        Raises:
+            ValueError: If the buffer is not a JSON object, or is invalid.
+
+        Returns:
+            dict: The notebook.
+        """
+        notebook = {}
+
+        self._expect(b"{")
+        if self._peek() == b"}":
+            self.pos += 1
+        else:
+            while True:
+                key = self._parse_value()
+                if not isinstance(key, str):
+                    raise ValueError("Expected a string key.")
+                self._expect(b":")
+
+                # Cells are parsed one by one, other values at once
+                if key == "cells" and self._peek() == b"[":
+                    notebook[key] = self._parse_cells()
+                else:
+                    notebook[key] = self._parse_value()
+
+                if self._next_token(b",}") == b"}":
+                    break
+
+        # Only whitespace may follow the notebook
+        self._skip_whitespace()
+        if self.pos != len(self.buffer):
+            raise ValueError("Extra data after the notebook.")
+
+        return notebook
+
+    def _parse_cells(self) -> list:
+        """
+        Parses the cells array, dropping outputs as each cell is parsed.
+
+        Returns:
+            list: The cells.
+        """
+        cells = []
+
+        self._expect(b"[")
+        if self._peek() == b"]":
+            self.pos += 1
+            return cells
+
+        while True:
+            cell = self._parse_value()
+            if self.drop_code_outputs:
+                _drop_outputs(cell)
+            cells.append(cell)
+
+            if self._next_token(b",]") == b"]":
+                return cells
+
+    def _parse_value(self):
+        """
+        Parses the JSON value at the current position. The value is decoded from
+        a window of the buffer, which grows until the value fits.
+
+        Raises:
+            ValueError: If the value is invalid.
+
+        Returns:
+            object: The parsed value.
+        """
+        self._skip_whitespace()
+        buffer_size = len(self.buffer)
+        window_size = self.window_size
+
+        while True:
+            end = min(self.pos + window_size, buffer_size)
+
+            # Never split a multi-byte character
+            while end < buffer_size and self.buffer[end] & 0xC0 == 0x80:
+                end -= 1
+
+            text = self.buffer[self.pos : end].decode("utf-8")
+            at_end = end == buffer_size
+
+            try:
+                value, char_end = self.decoder.raw_decode(text)
+            except json.JSONDecodeError:
+                if at_end:
+                    raise
+                window_size *= WINDOW_GROWTH
+                continue
+
+            # A value reaching the end of the window may continue (e.g. a number)
+            if char_end == len(text) and not at_end:
+                window_size *= WINDOW_GROWTH
+                continue
+
+            if text.isascii():
+                value_size = char_end
+            else:
+                value_size = len(text[:char_end].encode("utf-8"))
+
+            self.pos += value_size
+            self.window_size = max(INITIAL_WINDOW_SIZE, 2 * value_size)
+            return value
+
+    def _skip_whitespace(self) -> None:
+        """
+        Moves the position past any whitespace.
+        """
+        self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+
+    def _peek(self) -> bytes:
+        """
+        Returns the next non-whitespace character without consuming it.
+
+        Returns:
+            bytes: The character (empty at the end of the buffer).
+        """
+        self._skip_whitespace()
+        return self.buffer[self.pos : self.pos + 1]
+
+    def _next_token(self, expected: bytes) -> bytes:
+        """
+        Consumes the next non-whitespace character, which must be one of the
+        expected characters.
+
+        Args:
+            expected (bytes): The allowed characters.
+
+        Raises:
+            ValueError: If another character is found.
+
+        Returns:
+            bytes: The character.
+        """
+        token = self._peek()
+        if not token or token not in expected:
+            raise ValueError(f"Expected one of {expected!r} at offset {self.pos}.")
+        self.pos += 1
+        return token
+
+    def _expect(self, token: bytes) -> None:
+        """
+        Consumes the next non-whitespace character, which must be the token.
+
+        Args:
+            token (bytes): The expected character.
+
+        Raises:
+            ValueError: If another character is found.
+        """
+        self._next_token(token)
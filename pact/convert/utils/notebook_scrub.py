@@ -0,0 +1,173 @@
+"""
+notebook_scrub.py
+
+This module contains the ScrubPolicy class, which removes heavy or volatile
+metadata (widget state, cell metadata, unreferenced attachments) from the student
+versions of notebooks.
+"""
+
+from __future__ import annotations
+
+from typing import Iterable, List
+from urllib.parse import quote
+
+SCRUB_OPTION = "scrub"
+"""
+SCRUB_OPTION: Lines of options.pact starting with this word select what is
+scrubbed from notebooks, e.g. "scrub widgets" or "scrub all".
+"""
+
+# Items that can be scrubbed
+SCRUB_WIDGETS = "widgets"
+SCRUB_CELL_METADATA = "cell_metadata"
+SCRUB_ATTACHMENTS = "attachments"
+SCRUB_ALL = "all"
+
+VOLATILE_CELL_METADATA = ("execution", "ExecuteTime", "collapsed", "scrolled")
+"""
+VOLATILE_CELL_METADATA: The cell metadata keys removed by "scrub cell_metadata"
+(execution timing and the collapsed/scrolled state of outputs, which are cleared
+anyway). Other keys can be given instead, e.g. "scrub cell_metadata execution".
+"""
+
+
+class ScrubPolicy:
+    """
+    Selects what is removed from the student versions of notebooks. Nothing is
+    removed by default.
+    """
+
+    def __init__(
+        self,
+        widgets: bool = False,
+        cell_metadata_keys: Iterable[str] = (),
+        attachments: bool = False,
+    ):
+        """
+        Creates a new ScrubPolicy.
+
+        Args:
+            widgets (bool, optional): Whether to remove the widget state saved in
+                the notebook metadata. Defaults to False.
+            cell_metadata_keys (Iterable[str], optional): The keys removed from
+                the metadata of each cell. Defaults to ().
+            attachments (bool, optional): Whether to remove the attachments a
+                cell's source no longer references. Defaults to False.
+        """
+        self.widgets = widgets
+        self.cell_metadata_keys = tuple(cell_metadata_keys)
+        self.attachments = attachments
+
+    @classmethod
+    def from_options(cls, options: List[str]) -> ScrubPolicy:
+        """
+        Creates a policy from the scrub options of an assignment (lines like
+        "scrub widgets", "scrub cell_metadata [key ...]", "scrub attachments" or
+        "scrub all").
+
+        Args:
+            options (List[str]): The lines of the options.pact file.
+
+        Raises:
+            ValueError: If a scrub option is malformed.
+
+        Returns:
+            ScrubPolicy: The policy.
+        """
+        widgets = False
+        cell_metadata_keys = []
+        attachments = False
+
+        for option in options:
+            parts = option.split()
+            if not parts or parts[0] != SCRUB_OPTION:
+                continue
+
+            if len(parts) < 2:
+                raise ValueError(
+                    f"Invalid scrub option: '{option}'. "
+                    f"Expected '{SCRUB_OPTION} <item>'."
+                )
+
+            item, keys = parts[1], parts[2:]
+            if keys and item != SCRUB_CELL_METADATA:
+                raise ValueError(
+                    f"Invalid scrub option: '{option}'. "
+                    f"Only '{SCRUB_CELL_METADATA}' takes keys."
+                )
+
+            if item == SCRUB_WIDGETS:
+                widgets = True
+            elif item == SCRUB_CELL_METADATA:
+                cell_metadata_keys.extend(keys or VOLATILE_CELL_METADATA)
+            elif item == SCRUB_ATTACHMENTS:
+                attachments = True
+            elif item == SCRUB_ALL:
+                widgets = True
+                cell_metadata_keys.extend(VOLATILE_CELL_METADATA)
+                attachments = True
+            else:
+                raise ValueError(
+                    f"Invalid scrub option: '{option}'. Unknown item '{item}'."
+                )
+
+        # Remove duplicate keys, keeping their order
+        return cls(widgets, dict.fromkeys(cell_metadata_keys), attachments)
+
+    @property
+    def enabled(self) -> bool:
+        """
+        Whether the policy removes anything.
+        """
+        return self.widgets or bool(self.cell_metadata_keys) or self.attachments
+
+    def scrub_notebook(self, notebook: dict) -> None:
+        """
+        Removes the selected notebook-level metadata, in place. The widget state
+        (the "application/vnd.jupyter.widget-state+json" bundle saved by
+        ipywidgets) lives in the "widgets" key of the notebook metadata.
+
+        Args:
+            notebook (dict): The notebook.
+        """
+        metadata = notebook.get("metadata")
+        if self.widgets and isinstance(metadata, dict):
+            metadata.pop("widgets", None)
+
+    def scrub_cell(self, cell: dict) -> None:
+        """
+        Removes the selected metadata and attachments of a converted cell, in
+        place.
+
+        Args:
+            cell (dict): The cell, with its source as a list of lines.
+        """
+        metadata = cell.get("metadata")
+        if isinstance(metadata, dict):
+            for key in self.cell_metadata_keys:
+                metadata.pop(key, None)
+
+        attachments = cell.get("attachments")
+        if self.attachments and isinstance(attachments, dict):
+            source = "".join(cell["source"])
+            for name in list(attachments):
+                if not _is_referenced(name, source):
+                    del attachments[name]
+
+            if not attachments:
+                del cell["attachments"]
+
+
+def _is_referenced(name: str, source: str) -> bool:
+    """
+    Returns whether a cell source references an attachment, e.g. with
+    ![image](attachment:image.png) (the name may be URL-encoded).
+
+    Args:
+        name (str): The name of the attachment.
+        source (str): The source of the cell.
+
+    Returns:
+        bool: True if the attachment is referenced, False otherwise.
+    """
+    return f"attachment:{name}" in source or f"attachment:{quote(name)}" in source
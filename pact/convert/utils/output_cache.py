@@ -0,0 +1,315 @@
+"""
+output_cache.py
+
+This module contains the OutputCache class, an on-disk cache of converted files
+shared by every assignment (and every clone of the repository). Entries are
+keyed by the contents of the source file and the configuration of the
+conversion, so identical files (e.g. a package vendored by several assignments)
+are converted once.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import threading
+from typing import List, Optional
+
+from pact.convert.utils import json_backend
+from pact.convert.utils.build_manifest import file_hash
+from pact.convert.utils.cell_cache import default_cache_dir
+from pact.convert.utils.file_copy import CLONE_REFLINK, clone_file
+
+logger = logging.getLogger(__name__)
+
+OUTPUT_CACHE_OPTION = "output_cache"
+"""
+OUTPUT_CACHE_OPTION: The options.pact line enabling the output cache, optionally
+followed by the cache folder, e.g. "output_cache" or "output_cache /tmp/pact".
+"""
+
+OUTPUT_CACHE_SIZE_OPTION = "output_cache_size"
+"""
+OUTPUT_CACHE_SIZE_OPTION: The options.pact line setting the maximum size of the
+output cache in bytes, e.g. "output_cache_size 268435456".
+"""
+
+OUTPUT_CACHE_VERSION = 1
+"""
+OUTPUT_CACHE_VERSION: The version of the cache format (and of the conversion
+rules). It is part of every key, so entries of other versions are never used.
+"""
+
+OUTPUT_CACHE_MAX_BYTES = 1 << 30
+"""
+OUTPUT_CACHE_MAX_BYTES: The default maximum size of the output cache (1 GiB).
+The least recently used entries are removed beyond it.
+"""
+
+
+class OutputCache:
+    """
+    On-disk cache of converted files.
+
+    Each entry is the output file (cache_dir/<key[:2]>/<key>) and a small
+    metadata file (<key>.json) recording the size and modification time of the
+    output when it was stored, so entries changed since (e.g. an output hard
+    linked to the entry and edited in place) are never used. The modification
+    time of the metadata file is the last use of the entry, for the least
+    recently used eviction. The cache holds no absolute paths, so its folder can
+    be saved and restored between CI runs, or shared between machines.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = OUTPUT_CACHE_MAX_BYTES):
+        """
+        Creates a new OutputCache.
+
+        Args:
+            cache_dir (str): The folder of the cache entries.
+            max_bytes (int, optional): The maximum total size of the cached
+                outputs. Defaults to OUTPUT_CACHE_MAX_BYTES.
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+        # Whether files of the cache can be reflinked (until a clone is not)
+        self.reflinks = True
+
+        # Subfolders of the cache known to exist
+        self._folders = set()
+
+    @classmethod
+    def from_options(cls, options: List[str]) -> Optional[OutputCache]:
+        """
+        Creates a cache from the options of an assignment, if they contain the
+        output_cache option (and optionally the output_cache_size option).
+
+        Args:
+            options (List[str]): The lines of the options.pact file.
+
+        Raises:
+            ValueError: If the output_cache_size option is malformed.
+
+        Returns:
+            Optional[OutputCache]: The cache, or None if outputs are not cached.
+        """
+        cache_dir = None
+        max_bytes = OUTPUT_CACHE_MAX_BYTES
+
+        for option in options:
+            parts = option.split(maxsplit=1)
+            if not parts:
+                continue
+
+            if parts[0] == OUTPUT_CACHE_OPTION:
+                if len(parts) == 2:
+                    cache_dir = os.path.expanduser(parts[1].strip())
+                else:
+                    cache_dir = os.path.join(default_cache_dir(), "outputs")
+
+            elif parts[0] == OUTPUT_CACHE_SIZE_OPTION:
+                if len(parts) != 2 or not parts[1].strip().isdigit():
+                    raise ValueError(
+                        f"Invalid {OUTPUT_CACHE_SIZE_OPTION} option: '{option}'. "
+                        f"Expected '{OUTPUT_CACHE_SIZE_OPTION} <bytes>'."
+                    )
+                max_bytes = int(parts[1])
+
+        if cache_dir is None:
+            return None
+        return cls(cache_dir, max_bytes)
+
+    def key(self, source_file_path: str, fingerprint: str) -> str:
+        """
+        Returns the cache key of a file.
+
+        Args:
+            source_file_path (str): The path to the file to convert.
+            fingerprint (str): Everything else the output depends on (the
+                trigger configuration, the handler and its options).
+
+        Returns:
+            str: The hex digest of the contents and the fingerprint.
+        """
+        digest = hashlib.sha256(f"{OUTPUT_CACHE_VERSION}\0{fingerprint}\0".encode())
+        digest.update(file_hash(source_file_path).encode("ascii"))
+        return digest.hexdigest()
+
+    def fetch(self, key: str, destination_file_path: str) -> bool:
+        """
+        Creates the output of a file from its cache entry (as a reflink, a hard
+        link or a copy of the entry). Errors are ignored: the cache is only an
+        optimization.
+
+        Args:
+            key (str): The cache key of the file.
+            destination_file_path (str): The path to write the output to.
+
+        Returns:
+            bool: True if the output was created, False if the entry is missing
+                or was changed (the file must then be converted).
+        """
+        output_path, metadata_path = self._entry_paths(key)
+        try:
+            with open(metadata_path, "rb") as file:
+                metadata = json_backend.loads(file.read())
+            output_stat = os.stat(output_path)
+        except (OSError, ValueError):
+            return False
+
+        # Never use an entry changed since it was stored
+        stored = (metadata.get("size"), metadata.get("mtime_ns"))
+        if (output_stat.st_size, output_stat.st_mtime_ns) != stored:
+            logger.debug("Removing changed output cache entry %s", key)
+            self._remove_entry(key)
+            return False
+
+        try:
+            if os.path.lexists(destination_file_path):
+                os.remove(destination_file_path)
+            method = self._clone(output_path, destination_file_path)
+
+            # Mark the entry as recently used
+            os.utime(metadata_path)
+        except OSError:
+            return False
+
+        logger.debug("Output cache hit (%s): %s", method, destination_file_path)
+        return True
+
+    def store(self, key: str, output_file_path: str) -> None:
+        """
+        Stores the output of a file (as a reflink, a hard link or a copy of the
+        output). Errors are ignored: the cache is only an optimization.
+
+        Args:
+            key (str): The cache key of the file.
+            output_file_path (str): The path to the output of the file.
+        """
+        output_path, metadata_path = self._entry_paths(key)
+        suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+
+        try:
+            folder = os.path.dirname(output_path)
+            if folder not in self._folders:
+                os.makedirs(folder, exist_ok=True)
+                self._folders.add(folder)
+
+            # Write to temporary files first, so entries are never half written
+            self._clone(output_file_path, output_path + suffix)
+            os.replace(output_path + suffix, output_path)
+            output_stat = os.stat(output_path)
+
+            metadata = {
+                "size": output_stat.st_size,
+                "mtime_ns": output_stat.st_mtime_ns,
+            }
+            with open(metadata_path + suffix, "wb") as file:
+                file.write(json_backend.dumps(metadata))
+            os.replace(metadata_path + suffix, metadata_path)
+        except (OSError, ValueError):
+            for path in (output_path + suffix, metadata_path + suffix):
+                _remove_file(path)
+
+    def evict(self) -> None:
+        """
+        Removes the least recently used entries until the cached outputs fit
+        in max_bytes, and the outputs left without metadata by interrupted
+        writes. Errors are ignored: the cache is only an optimization.
+        """
+        entries = []
+        total_size = 0
+
+        try:
+            with os.scandir(self.cache_dir) as folders:
+                folders = [folder.path for folder in folders if folder.is_dir()]
+        except OSError:
+            return
+
+        for folder in folders:
+            try:
+                with os.scandir(folder) as files:
+                    names = {file.name: file for file in files}
+            except OSError:
+                continue
+
+            for name, file in names.items():
+                if name.endswith(".json") or name.endswith(".tmp"):
+                    continue
+                metadata_file = names.get(f"{name}.json")
+                if metadata_file is None:
+                    _remove_file(file.path)
+                    continue
+
+                try:
+                    size = file.stat().st_size
+                    last_used = metadata_file.stat().st_mtime_ns
+                except OSError:
+                    continue
+                entries.append((last_used, size, name))
+                total_size += size
+
+        # Remove the entries used the longest time ago first
+        entries.sort()
+        for _, size, key in entries:
+            if total_size <= self.max_bytes:
+                break
+            self._remove_entry(key)
+            total_size -= size
+
+    def _clone(self, source_file_path: str, destination_file_path: str) -> str:
+        """
+        Clones a file into or out of the cache, without trying reflinks again
+        once a clone was not a reflink.
+
+        Args:
+            source_file_path (str): The path to the file to clone.
+            destination_file_path (str): The path to the new file.
+
+        Returns:
+            str: How the file was created (see clone_file).
+        """
+        method = clone_file(
+            source_file_path, destination_file_path, reflink=self.reflinks
+        )
+        if method != CLONE_REFLINK:
+            self.reflinks = False
+        return method
+
+    def _entry_paths(self, key: str) -> tuple:
+        """
+        Returns the paths to the output and metadata files of an entry.
+
+        Args:
+            key (str): The cache key.
+
+        Returns:
+            tuple: The path to the output and the path to the metadata.
+        """
+        output_path = os.path.join(self.cache_dir, key[:2], key)
+        return output_path, f"{output_path}.json"
+
+    def _remove_entry(self, key: str) -> None:
+        """
+        Removes an entry (its metadata first, so it is never used half removed).
+
+        Args:
+            key (str): The cache key.
+        """
+        output_path, metadata_path = self._entry_paths(key)
+        _remove_file(metadata_path)
+        _remove_file(output_path)
+
+
+def _remove_file(file_path: str) -> None:
+    """
+    Removes a file, ignoring errors.
+
+    Args:
+        file_path (str): The path to the file to remove.
+    """
+    try:
+        os.remove(file_path)
+    except OSError:
+        pass
@@ -8,11 +8,38 @@ from __future__ import annotations
 
 import logging
 import os
-import shutil
-from pact.convert.utils.file_converter import FileConverter
-from pact.zip.zip_assignment import zip_assignment_dir
-from pact.zip.zip_submission import create_submission_file
-import re
+from pact.convert.utils.black_list import BlackListMatcher
+from pact.convert.utils.build_manifest import (
+    MANIFEST_FILE_NAME,
+    BuildManifest,
+    configuration_fingerprint,
+)
+from pact.convert.utils.cell_cache import CellCache
+from pact.convert.utils.file_converter import (
+    PLAN_CONVERT,
+    PLAN_COPY,
+    FileConverter,
+    parallel_cells_from_options,
+)
+from pact.convert.utils.file_handlers import FileHandlerRegistry
+from pact.convert.utils.file_jobs import convert_files
+from pact.convert.utils.notebook_assets import ASSETS_FOLDER_NAME, AssetStore
+from pact.convert.utils.notebook_scrub import ScrubPolicy
+from pact.convert.utils.output_cache import OutputCache
+from pact.convert.utils.staged_output import (
+    create_staging_location,
+    is_work_folder,
+    remove_in_background,
+    remove_leftovers,
+    swap_into_place,
+)
+from pact.convert.utils.tree_walker import walk_tree
+from pact.zip.zip_assignment import predicted_zip_size, zip_assignment_dir
+from pact.zip.zip_submission import (
+    SUBMISSION_FILE_NAME,
+    create_submission_file,
+    submission_file_contents,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -24,10 +51,17 @@ BLACK_LIST_FILE_NAME = "black_list.pact"
 SUB_LIST_FILE_NAME = "sub_list.pact"
 OPTIONS_FILE_NAME = "options.pact"
 
+# Actions of the plan of a conversion, besides those of the plan of a file
+# (see PrimeConverter.plan and FileConverter.plan_file)
+PLAN_EXCLUDE = "exclude"
+PLAN_REUSE = "reuse"
+PLAN_REMOVE = "remove"
+
 # Patterns always excluded from STUDENT_VERSION/ output, even without a
 # per-assignment black_list.pact. Per-assignment black lists extend these.
 #
-# Patterns are Python regexes matched against the full path with re.search.
+# Patterns are Python regexes matched with re.search against the path relative
+# to the assignment root (with "/" separators).
 # Directory-style entries use (^|/)name($|/) so they only match the directory
 # itself or descendants — not unrelated files that happen to contain the name
 # as a substring (e.g. `venv` should not match `prevention.py`).
@@ -85,17 +119,30 @@ class PrimeConverter:
     Converts solution versions of assignments into student versions.
     """
 
-    def __init__(self):
+    def __init__(self, jobs: int = 1):
         """
         Creates a new PrimeConverter.
+
+        Args:
+            jobs (int, optional): The number of files converted in parallel.
+                Defaults to 1.
         """
 
         # Create a file converter
         self.file_converter = FileConverter()
 
+        # Number of files converted in parallel
+        self.jobs = jobs
+
         # Placeholder for the master generation location
         self.master_generation_location = None
 
+        # Placeholder for the folder black list patterns are relative to
+        self.source_root = None
+
+        # Compiled black list (rebuilt when the black list changes)
+        self._black_list_matcher = None
+
         # Black list starts with built-in defaults; per-assignment patterns
         # are appended in load_black_list().
         self.black_list = list(DEFAULT_BLACK_LIST)
@@ -111,6 +158,7 @@ class PrimeConverter:
         Resets the PrimeConverter.
         """
         self.master_generation_location = None
+        self.source_root = None
         self.black_list = list(DEFAULT_BLACK_LIST)
         self.sub_list = []
         self.options = []
@@ -155,10 +203,221 @@ class PrimeConverter:
         with open(os.path.join(source_folder, OPTIONS_FILE_NAME), "r") as file:
             self.options = file.read().splitlines()
 
-    def convert(self, source_file_or_folder: str):
+    def convert(self, source_file_or_folder: str, clean: bool = False):
         """
         Converts the solution version of the assignment file/folder into student versions.
 
+        The student version is generated in a staging folder, then swapped into
+        place, so it is never partially written (see staged_output.py). Only the
+        files that changed since the previous conversion are converted again,
+        if it had the same configuration (see build_manifest.py).
+
+        Args:
+            source_file_or_folder (str): The path to the solution version of the assignment file/folder.
+            clean (bool, optional): If True, every file is converted (instead
+                of reusing the outputs of the previous student version).
+                Defaults to False.
+        """
+
+        # Load the configuration of the assignment
+        self._configure(source_file_or_folder)
+
+        # Remove the staging folders and replaced student versions left behind
+        # by interrupted conversions
+        generation_location = self._generation_location(source_file_or_folder)
+        remove_leftovers(generation_location)
+
+        # Load the manifest of the previous conversion, unless its configuration
+        # was different (then everything is converted again)
+        fingerprint = configuration_fingerprint(
+            self.file_converter.trigger_table, self.black_list, self.options
+        )
+        manifest = None
+        if not clean:
+            manifest = BuildManifest.load(
+                os.path.join(generation_location, MANIFEST_FILE_NAME), fingerprint
+            )
+
+        # Set the master generation location (to be used by the conversion filter)
+        self.master_generation_location = generation_location
+
+        # Generate the student version in a staging folder, starting from the
+        # previous student version if its outputs can be reused
+        staging_location = create_staging_location(
+            generation_location, link_existing=manifest is not None
+        )
+        manifest_path = os.path.join(staging_location, MANIFEST_FILE_NAME)
+        if manifest is None:
+            manifest = BuildManifest(manifest_path, fingerprint)
+        else:
+            manifest.manifest_path = manifest_path
+
+        try:
+            self._generate(source_file_or_folder, staging_location, manifest)
+        except BaseException:
+            # Keep the previous student version
+            remove_in_background(staging_location)
+            raise
+
+        # Swap the complete student version into place, and remove the
+        # previous one in the background
+        previous_location = swap_into_place(staging_location, generation_location)
+        if previous_location is not None:
+            remove_in_background(previous_location)
+
+        # Keep the output cache within its size
+        if self.file_converter.output_cache is not None:
+            self.file_converter.output_cache.evict()
+
+    def plan(self, source_file_or_folder: str, clean: bool = False) -> dict:
+        """
+        Returns what converting the assignment file/folder would do, without
+        writing anything: the action of every file (PLAN_CONVERT, PLAN_COPY,
+        PLAN_SKIP, PLAN_UNREADABLE, PLAN_ERROR, or PLAN_REUSE for the outputs
+        of the previous student version that are up to date), the files and
+        folders left out by the black list (PLAN_EXCLUDE), the outputs that
+        would be removed (PLAN_REMOVE), and the totals (bytes read and
+        written, trigger regions, size of the student version and its zip).
+
+        The files are listed with the same walker, filter and manifest as
+        convert. Text files and notebooks are converted in memory, so their
+        sizes are exact, but notebook attachments are never externalized.
+
+        Args:
+            source_file_or_folder (str): The path to the solution version of the assignment file/folder.
+            clean (bool, optional): If True, plan converting every file (as
+                convert does with clean). Defaults to False.
+
+        Returns:
+            dict: The plan, ready to be serialized to JSON.
+        """
+
+        # Load the configuration of the assignment, without anything that
+        # writes files (caches and the asset store)
+        self._configure(source_file_or_folder)
+        self.file_converter.cell_cache = None
+        self.file_converter.output_cache = None
+        self.file_converter.asset_store = None
+
+        generation_location = self._generation_location(source_file_or_folder)
+        self.master_generation_location = generation_location
+
+        # Load the manifest of the previous conversion (as convert does)
+        manifest = None
+        if not clean:
+            fingerprint = configuration_fingerprint(
+                self.file_converter.trigger_table, self.black_list, self.options
+            )
+            manifest = BuildManifest.load(
+                os.path.join(generation_location, MANIFEST_FILE_NAME), fingerprint
+            )
+
+        # List the files to convert, recording the files and folders the
+        # conversion filter leaves out
+        excluded = []
+
+        def include(path: str, is_folder: bool) -> bool:
+            if self.conversion_filter(path, is_folder):
+                return True
+            if not self._is_generated_path(path):
+                excluded.append(
+                    {
+                        "path": self._relative_path(path),
+                        "action": PLAN_EXCLUDE,
+                        "folder": is_folder,
+                    }
+                )
+            return False
+
+        work = walk_tree(source_file_or_folder, generation_location, include)
+
+        # Plan each file (the outputs of the previous conversion that are up
+        # to date are reused)
+        files = []
+        members = []
+        keys = set()
+        student_root = generation_location
+        if os.path.isdir(source_file_or_folder):
+            student_root = os.path.join(
+                student_root, os.path.basename(source_file_or_folder)
+            )
+
+        for item in work.files:
+            key = self._relative_path(item.source_path)
+            output_path = os.path.join(
+                item.destination_folder, os.path.basename(item.source_path)
+            )
+            keys.add(key)
+
+            if manifest is not None and manifest.is_current(
+                key, item.source_path, output_path
+            ):
+                # The output is kept as it is (if there is one)
+                output_bytes = manifest.files[key].get("output_size")
+                has_output = output_bytes is not None
+                file_plan = {
+                    "action": PLAN_REUSE,
+                    "handler": None,
+                    "bytes_read": 0,
+                    "bytes_written": 0,
+                    "regions": None,
+                }
+            else:
+                file_plan = self.file_converter.plan_file(item.source_path)
+                has_output = file_plan["action"] in (PLAN_CONVERT, PLAN_COPY)
+                output_bytes = file_plan["bytes_written"] if has_output else None
+
+            files.append({"path": key, **file_plan, "output_bytes": output_bytes})
+
+            # Files without output (skipped, unreadable) are not in the zip
+            if has_output:
+                member = os.path.relpath(output_path, student_root)
+                members.append((member.replace(os.sep, "/"), output_bytes))
+
+        # Outputs of the sources that no longer exist are removed
+        if manifest is not None:
+            for key in sorted(set(manifest.files).difference(keys)):
+                files.append({"path": key, "action": PLAN_REMOVE})
+
+        # Predict the size of the zip file (with the submission file)
+        zip_bytes = None
+        if os.path.isdir(source_file_or_folder):
+            if "no_submission_file" not in self.options:
+                contents = submission_file_contents(self.sub_list)
+                members.append((SUBMISSION_FILE_NAME, len(contents.encode("utf-8"))))
+            if all(size is not None for _, size in members):
+                zip_bytes = predicted_zip_size(sorted(members))
+
+        # Add up the totals (unknown values, e.g. the sizes written by custom
+        # handlers, are left out)
+        actions = {}
+        for entry in files + excluded:
+            actions[entry["action"]] = actions.get(entry["action"], 0) + 1
+
+        def total(key: str) -> int:
+            return sum(entry.get(key) or 0 for entry in files)
+
+        return {
+            "source": source_file_or_folder,
+            "generation_location": generation_location,
+            "incremental": manifest is not None,
+            "files": files,
+            "excluded": excluded,
+            "totals": {
+                "actions": actions,
+                "bytes_read": total("bytes_read"),
+                "bytes_written": total("bytes_written"),
+                "regions": total("regions"),
+                "output_bytes": total("output_bytes"),
+                "zip_bytes": zip_bytes,
+            },
+        }
+
+    def _configure(self, source_file_or_folder: str):
+        """
+        Loads the configuration of an assignment (its black list, sub list and
+        options) and configures the file converter with it.
+
         Args:
             source_file_or_folder (str): The path to the solution version of the assignment file/folder.
         """
@@ -166,6 +425,12 @@ class PrimeConverter:
         # Reset the converter
         self.reset()
 
+        # Match the black list against paths relative to the assignment root
+        if os.path.isdir(source_file_or_folder):
+            self.source_root = source_file_or_folder
+        else:
+            self.source_root = os.path.dirname(source_file_or_folder)
+
         # If we have a folder, check if special files exist
         if os.path.isdir(source_file_or_folder):
             self.load_black_list(source_file_or_folder)
@@ -175,85 +440,192 @@ class PrimeConverter:
             logger.debug("Sub list: %s", self.sub_list)
             logger.debug("Options: %s", self.options)
 
-        # Set the master generation location (to be used by the conversion filter)
-        self.master_generation_location = self._prepare_generation_location(
-            source_file_or_folder
+        # Convert text files on their raw bytes if requested
+        self.file_converter.byte_engine = "byte_engine" in self.options
+
+        # Map extensions to file handlers (e.g. "handler .csv copy")
+        self.file_converter.handler_registry = FileHandlerRegistry.from_options(
+            self.options, self.file_converter.handlers
+        )
+
+        # Select what is scrubbed from notebooks (e.g. "scrub widgets")
+        self.file_converter.scrub_policy = ScrubPolicy.from_options(self.options)
+
+        # Reuse the conversions of unchanged notebook cells (e.g. "cell_cache")
+        self.file_converter.cell_cache = CellCache.from_options(self.options)
+
+        # Reuse the outputs of identical files converted before, by any
+        # assignment (e.g. "output_cache")
+        self.file_converter.output_cache = OutputCache.from_options(self.options)
+
+        # Convert the cells of large notebooks in a worker pool if requested
+        # (e.g. "parallel_cells 500")
+        (
+            self.file_converter.cell_workers,
+            self.file_converter.parallel_cell_threshold,
+        ) = parallel_cells_from_options(self.options)
+
+    def _generate(
+        self,
+        source_file_or_folder: str,
+        generation_location: str,
+        manifest: BuildManifest,
+    ):
+        """
+        Generates the student version of the assignment file/folder (with its
+        submission file and zip) in a generation location.
+
+        Args:
+            source_file_or_folder (str): The path to the solution version of the
+                assignment file/folder.
+            generation_location (str): The folder to generate the student
+                version in.
+            manifest (BuildManifest): The manifest of the student version.
+        """
+
+        # Move large notebook attachments to an assets folder of the student
+        # version if requested (e.g. "externalize_attachments 4096")
+        student_root = generation_location
+        if os.path.isdir(source_file_or_folder):
+            student_root = os.path.join(
+                student_root, os.path.basename(source_file_or_folder)
+            )
+        self.file_converter.asset_store = AssetStore.from_options(
+            self.options, os.path.join(student_root, ASSETS_FOLDER_NAME)
         )
 
         # Convert the source file/folder
-        self._convert(source_file_or_folder, self.master_generation_location)
+        changed = self._convert(source_file_or_folder, generation_location, manifest)
 
         # If the source file/folder is a folder, zip the folder
         if os.path.isdir(source_file_or_folder):
 
             # Create the student submission zip file
             if "no_submission_file" not in self.options:
-                create_submission_file(
-                    os.path.join(
-                        self.master_generation_location,
-                        os.path.basename(source_file_or_folder),
-                    ),
-                    sub_list=self.sub_list,
-                )
+                changed |= create_submission_file(student_root, sub_list=self.sub_list)
+
+            # Create the zipped assignment folder (unless nothing changed). The
+            # zip may be a link to the previous one: write a new file
+            zip_path = f"{student_root}.zip"
+            if changed or not os.path.exists(zip_path):
+                if os.path.exists(zip_path):
+                    os.remove(zip_path)
+                zip_assignment_dir(student_root)
+
+    def _convert(
+        self,
+        source_file_or_folder: str,
+        generation_location: str,
+        manifest: BuildManifest = None,
+    ) -> bool:
+        """
+        Converts all files/folders in the source file/folder into student versions.
 
-            # Create the zipped assignment folder
-            zip_assignment_dir(
-                os.path.join(
-                    self.master_generation_location,
-                    os.path.basename(source_file_or_folder),
-                )
-            )
+        With a manifest, only the files whose source or output changed since
+        the manifest was written are converted, the outputs of deleted sources
+        are removed, and the manifest is updated.
 
-    def _convert(self, source_file_or_folder: str, generation_location: str):
+        Returns:
+            bool: True if any output was written or removed.
         """
-        Recursively converts all files/folders in the source file/folder into student versions.
-        """
-
-        # Check if the file/folder should be converted
-        if not self.conversion_filter(source_file_or_folder):
-            return
 
-        # Check if the source file/folder is a file
-        if os.path.isfile(source_file_or_folder):
+        # List the folders to create and the files to convert in one pass
+        work = walk_tree(
+            source_file_or_folder, generation_location, self.conversion_filter
+        )
 
-            # Convert the file at this location
-            self.file_converter.convert_file(
-                source_file_path=source_file_or_folder,
-                destination_folder_path=generation_location,
+        if manifest is None:
+            manifest = BuildManifest(
+                os.path.join(generation_location, MANIFEST_FILE_NAME), ""
             )
 
-        # Check if the source file/folder is a folder
-        elif os.path.isdir(source_file_or_folder):
-
-            # For each file/dir in the folder
-            for member_name in os.listdir(source_file_or_folder):
-
-                # Get the source path of the directory member
-                member_name = os.path.join(source_file_or_folder, member_name)
-
-                # Create the new generation location for the member
-                member_generation_location = os.path.join(
-                    generation_location, os.path.basename(source_file_or_folder)
-                )
-
-                # Create the new generation location for the member
-                os.makedirs(member_generation_location, exist_ok=True)
-
-                # Convert the member
-                self._convert(member_name, member_generation_location)
-        else:
-            raise ValueError(
-                f"The source file/folder {source_file_or_folder} does not exist."
+        # Create each folder of the student version once
+        for folder in work.folders:
+            os.makedirs(folder, exist_ok=True)
+
+        # Find the files whose source or output changed
+        keys = [self._relative_path(item.source_path) for item in work.files]
+        outputs = [
+            os.path.join(item.destination_folder, os.path.basename(item.source_path))
+            for item in work.files
+        ]
+        stale = [
+            index
+            for index, item in enumerate(work.files)
+            if not manifest.is_current(keys[index], item.source_path, outputs[index])
+        ]
+
+        # Remove the outputs of the sources that no longer exist
+        removed = set(manifest.files).difference(keys)
+        for key in removed:
+            output_path = manifest.output_path(key)
+            try:
+                if output_path is not None:
+                    os.remove(output_path)
+            except FileNotFoundError:
+                pass
+            del manifest.files[key]
+
+        # Outputs may be links to the previous student version: remove them,
+        # so they are written as new files
+        for index in stale:
+            try:
+                os.remove(outputs[index])
+            except FileNotFoundError:
+                pass
+
+        # Convert the files (in parallel with more than one job)
+        logger.debug(
+            "Converting %d of %d files (%d removed)",
+            len(stale),
+            len(work.files),
+            len(removed),
+        )
+        convert_files(
+            self.file_converter, [work.files[index] for index in stale], self.jobs
+        )
+        for index in stale:
+            manifest.record(keys[index], work.files[index].source_path, outputs[index])
+
+        # Remove the folders that are no longer generated (if they are empty)
+        folders = [
+            os.path.relpath(folder, generation_location) for folder in work.folders
+        ]
+        for folder in sorted(set(manifest.folders).difference(folders), reverse=True):
+            try:
+                os.rmdir(os.path.join(generation_location, folder))
+            except OSError:
+                pass
+        manifest.folders = folders
+
+        # Remove the assets no notebook refers to anymore
+        changed = bool(stale or removed)
+        asset_store = self.file_converter.asset_store
+        if changed and asset_store is not None:
+            asset_store.remove_unreferenced(
+                manifest.output_path(key)
+                for key in manifest.files
+                if key.endswith(".ipynb")
             )
 
-    def conversion_filter(self, source_file_or_folder: str):
+        manifest.save()
+        return changed
+
+    def conversion_filter(self, source_file_or_folder: str, is_folder: bool = False):
         """
         Filters the files/folders to convert. Returns True if the file/folder
         should be converted, False otherwise.
+
+        Args:
+            source_file_or_folder (str): The path to the file/folder.
+            is_folder (bool, optional): Whether the path is a folder. Folders
+                whose contents would all be black listed (e.g. "hidden/") are
+                filtered themselves, so they are not walked. Defaults to False.
         """
 
-        # If the file/folder is in the generated location, don't convert it
-        if self.master_generation_location == source_file_or_folder:
+        # If the file/folder is in the generated location (or is a staging
+        # folder or replaced student version next to it), don't convert it
+        if self._is_generated_path(source_file_or_folder):
             return False
 
         # Ignore special files
@@ -265,13 +637,62 @@ class PrimeConverter:
             return False
 
         # Ignore files in the black list
-        for black_list_item in self.black_list:
-            if re.search(black_list_item, source_file_or_folder):
-                return False
+        matcher = self._compiled_black_list()
+        relative_path = self._relative_path(source_file_or_folder)
+        if matcher.matches(relative_path):
+            return False
+        if is_folder and matcher.matches(relative_path + "/"):
+            return False
 
         return True
 
-    def _prepare_generation_location(self, source_file_or_folder: str) -> str:
+    def _is_generated_path(self, source_file_or_folder: str) -> bool:
+        """
+        Returns whether a path is the generation location, or a staging folder
+        or replaced student version next to it.
+        """
+        if self.master_generation_location == source_file_or_folder:
+            return True
+
+        parent, name = os.path.split(source_file_or_folder)
+        return bool(
+            self.master_generation_location
+            and parent == os.path.dirname(self.master_generation_location)
+            and is_work_folder(name, os.path.basename(self.master_generation_location))
+        )
+
+    def _compiled_black_list(self) -> BlackListMatcher:
+        """
+        Returns the compiled black list, compiling it again if the black list
+        changed since it was last compiled.
+        """
+        if (
+            self._black_list_matcher is None
+            or self._black_list_matcher.patterns != self.black_list
+        ):
+            self._black_list_matcher = BlackListMatcher(self.black_list)
+        return self._black_list_matcher
+
+    def _relative_path(self, source_file_or_folder: str) -> str:
+        """
+        Returns the path black list patterns are matched against: the path
+        relative to the assignment root (the root itself is matched by its
+        name), or the path as given outside of a conversion.
+        """
+        path = source_file_or_folder
+        root = self.source_root
+        if root:
+            prefix = os.path.join(root, "")
+            if path.startswith(prefix):
+                path = path[len(prefix) :]
+            elif path == root:
+                path = os.path.basename(root)
+
+        if os.sep != "/":
+            path = path.replace(os.sep, "/")
+        return path
+
+    def _generation_location(self, source_file_or_folder: str) -> str:
         """
         Determines the appropriate location to generate student versions of the
         assignment files.
@@ -288,15 +709,5 @@ class PrimeConverter:
         else:
             raise ValueError("The source file/folder does not exist.")
 
-        # Create the student version folder
-        generation_location = os.path.join(generation_location, GENERATED_LOCATION_NAME)
-
-        # Remove the student version folder if it already exists (and it's contents)
-        if os.path.exists(generation_location):
-            shutil.rmtree(generation_location)
-
-        # Create the student version folder
-        os.makedirs(generation_location, exist_ok=False)
-
-        # Return the path to the generation location
-        return generation_location
+        # Return the path to the student version folder
+        return os.path.join(generation_location, GENERATED_LOCATION_NAME)
@@ -0,0 +1,216 @@
+"""
+staged_output.py
+
+This module contains the functions used to generate a student version in a
+staging folder next to it and swap it into place once it is complete, so
+readers of the student version never see a partial tree, and the previous
+student version is removed in the background.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import shutil
+import threading
+import uuid
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+STAGING_INFIX = ".staging-"
+"""
+STAGING_INFIX: Staging folders are named .<location name>.staging-<random>.
+"""
+
+TRASH_INFIX = ".old-"
+"""
+TRASH_INFIX: Replaced student versions are renamed .<location name>.old-<random>
+until they are removed.
+"""
+
+_removals: List[threading.Thread] = []
+"""
+_removals: The threads removing folders in the background.
+"""
+
+_removals_lock = threading.Lock()
+"""
+_removals_lock: Guards _removals.
+"""
+
+
+def is_work_folder(name: str, location_name: str) -> bool:
+    """
+    Returns whether a folder name is that of a staging folder or of a replaced
+    student version of a generation location.
+
+    Args:
+        name (str): The name of the folder.
+        location_name (str): The name of the generation location.
+
+    Returns:
+        bool: True if the folder is a staging folder or a replaced version.
+    """
+    return name.startswith(f".{location_name}{STAGING_INFIX}") or name.startswith(
+        f".{location_name}{TRASH_INFIX}"
+    )
+
+
+def create_staging_location(
+    generation_location: str, link_existing: bool = False
+) -> str:
+    """
+    Creates an empty staging folder next to a generation location. With
+    link_existing, the files of the current student version are hard linked
+    into it (or copied where links are not supported), keeping their sizes and
+    modification times, so an incremental conversion starts from them.
+
+    Files of the staging folder may then be hard links to the files of the
+    current student version: they must be replaced (removed and written again,
+    or written to a temporary file and renamed), never written in place.
+
+    Args:
+        generation_location (str): The path to the generation location.
+        link_existing (bool, optional): If True, the files of the current
+            student version are linked into the staging folder. Defaults to
+            False.
+
+    Returns:
+        str: The path to the staging folder.
+    """
+    # Create the folder with the default permissions (unlike tempfile.mkdtemp)
+    staging_location = _work_folder_path(generation_location, STAGING_INFIX)
+    os.makedirs(staging_location)
+
+    if link_existing and os.path.isdir(generation_location):
+        shutil.copytree(
+            generation_location,
+            staging_location,
+            copy_function=_link_or_copy,
+            dirs_exist_ok=True,
+        )
+
+    return staging_location
+
+
+def swap_into_place(staging_location: str, generation_location: str) -> Optional[str]:
+    """
+    Moves a complete staging folder to the generation location. The current
+    student version is first renamed out of the way (both renames are atomic
+    on the same filesystem), and is restored if the staging folder cannot be
+    moved.
+
+    Args:
+        staging_location (str): The path to the staging folder.
+        generation_location (str): The path to the generation location.
+
+    Returns:
+        Optional[str]: The path the previous student version was moved to (to
+            be removed), or None if there was none.
+    """
+    if not os.path.lexists(generation_location):
+        os.rename(staging_location, generation_location)
+        return None
+
+    trash_location = _work_folder_path(generation_location, TRASH_INFIX)
+    os.rename(generation_location, trash_location)
+    try:
+        os.rename(staging_location, generation_location)
+    except BaseException:
+        os.rename(trash_location, generation_location)
+        raise
+
+    return trash_location
+
+
+def remove_in_background(path: str) -> threading.Thread:
+    """
+    Removes a folder in a background thread. Errors are ignored: folders left
+    behind are removed by the next conversion (see remove_leftovers).
+
+    Args:
+        path (str): The path to the folder.
+
+    Returns:
+        threading.Thread: The thread removing the folder.
+    """
+    thread = threading.Thread(
+        target=shutil.rmtree,
+        args=(path,),
+        kwargs={"ignore_errors": True},
+        name=f"pact-remove-{os.path.basename(path)}",
+        daemon=True,
+    )
+    with _removals_lock:
+        _removals[:] = [removal for removal in _removals if removal.is_alive()]
+        _removals.append(thread)
+    thread.start()
+    return thread
+
+
+def remove_leftovers(generation_location: str) -> None:
+    """
+    Removes (in the background) the staging folders and replaced student
+    versions left next to a generation location by interrupted conversions.
+
+    Args:
+        generation_location (str): The path to the generation location.
+    """
+    parent, location_name = os.path.split(generation_location)
+    try:
+        with os.scandir(parent or ".") as entries:
+            leftovers = [
+                entry.path
+                for entry in entries
+                if is_work_folder(entry.name, location_name) and entry.is_dir()
+            ]
+    except FileNotFoundError:
+        return
+
+    for leftover in leftovers:
+        logger.debug("Removing leftover folder %s", leftover)
+        remove_in_background(leftover)
+
+
+def wait_for_removals() -> None:
+    """
+    Waits until the folders being removed in the background are removed.
+    """
+    with _removals_lock:
+        removals = list(_removals)
+        _removals.clear()
+
+    for removal in removals:
+        removal.join()
+
+
+def _work_folder_path(generation_location: str, infix: str) -> str:
+    """
+    Returns a new path for a staging folder or a replaced student version,
+    next to a generation location.
+
+    Args:
+        generation_location (str): The path to the generation location.
+        infix (str): STAGING_INFIX or TRASH_INFIX.
+
+    Returns:
+        str: The path to the (not yet created) folder.
+    """
+    parent, location_name = os.path.split(generation_location)
+    return os.path.join(parent, f".{location_name}{infix}{uuid.uuid4().hex[:12]}")
+
+
+def _link_or_copy(source_path: str, destination_path: str) -> None:
+    """
+    Hard links a file, or copies it (with its modification time) if the
+    filesystem does not support hard links.
+
+    Args:
+        source_path (str): The path to the file.
+        destination_path (str): The path to the link or copy.
+    """
+    try:
+        os.link(source_path, destination_path)
+    except OSError:
+        shutil.copy2(source_path, destination_path)
@@ -0,0 +1,112 @@
+"""
+tree_walker.py
+
+This module contains the walk_tree function, which lists the files of an
+assignment to convert (and the folders of the student version to create) in a
+single iterative pass over the source tree with os.scandir.
+"""
+
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass, field
+from typing import Callable, List, NamedTuple
+
+
+class WorkItem(NamedTuple):
+    """
+    A file to convert.
+
+    Attributes:
+        source_path (str): The path to the file to convert.
+        destination_folder (str): The folder the converted file is written to.
+    """
+
+    source_path: str
+    destination_folder: str
+
+
+@dataclass
+class WorkList:
+    """
+    The work of a conversion: the folders to create (each parent before its
+    children) and the files to convert.
+    """
+
+    folders: List[str] = field(default_factory=list)
+    files: List[WorkItem] = field(default_factory=list)
+
+
+def walk_tree(
+    source_file_or_folder: str,
+    generation_location: str,
+    include: Callable[[str, bool], bool],
+) -> WorkList:
+    """
+    Lists the work of converting a file or folder into a generation location.
+    A folder is generated as generation_location/<folder name>, with the same
+    structure as the source folder. Entries are visited in name order, so the
+    work list does not depend on the order of the directory listings.
+
+    The type of each entry comes from its os.DirEntry (no extra stat call on
+    most platforms), and each destination folder is listed once, if the source
+    folder has any entries (as before, even if all of them are excluded).
+
+    Args:
+        source_file_or_folder (str): The path to the file or folder to convert.
+        generation_location (str): The folder to generate the student version in.
+        include (Callable[[str, bool], bool]): Returns whether a path should be
+            converted, given the path and whether it is a folder. Excluded
+            folders are not visited.
+
+    Raises:
+        ValueError: If the source file/folder (or an entry of it) is neither a
+            file nor a folder.
+
+    Returns:
+        WorkList: The folders to create and the files to convert.
+    """
+    work = WorkList()
+
+    # Check if the file/folder should be converted
+    is_folder = os.path.isdir(source_file_or_folder)
+    if not include(source_file_or_folder, is_folder):
+        return work
+
+    if not is_folder:
+        if not os.path.isfile(source_file_or_folder):
+            raise ValueError(
+                f"The source file/folder {source_file_or_folder} does not exist."
+            )
+        work.files.append(WorkItem(source_file_or_folder, generation_location))
+        return work
+
+    # Folders left to visit, with the location their folder is generated in
+    pending = [(source_file_or_folder, generation_location)]
+    while pending:
+        folder, location = pending.pop()
+        destination_folder = os.path.join(location, os.path.basename(folder))
+
+        with os.scandir(folder) as entries:
+            entries = sorted(entries, key=lambda entry: entry.name)
+        if entries:
+            work.folders.append(destination_folder)
+
+        subfolders = []
+        for entry in entries:
+            path = os.path.join(folder, entry.name)
+            is_folder = entry.is_dir()
+            if not include(path, is_folder):
+                continue
+
+            if is_folder:
+                subfolders.append((path, destination_folder))
+            elif entry.is_file():
+                work.files.append(WorkItem(path, destination_folder))
+            else:
+                raise ValueError(f"The source file/folder {path} does not exist.")
+
+        # Visit the subfolders depth first, in name order
+        pending.extend(reversed(subfolders))
+
+    return work
@@ -0,0 +1,410 @@
+"""
+trigger_matcher.py
+
+This module contains the TriggerMatcher class, which finds every codeblock, mask
+and notebook cell trigger string in a line of text with a single scan.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import TYPE_CHECKING, Dict, List, NamedTuple, Optional
+
+from pact.convert.utils.file_copy import file_contains_pattern
+from pact.convert.utils.file_types import WIDE_BYTE_ORDER_MARKS
+from pact.convert.utils.line_index import NUMPY_MIN_BUFFER_SIZE, LineIndex
+
+if TYPE_CHECKING:
+    from pact.convert.utils.codeblock_infra import CodeBlockType
+    from pact.convert.utils.mask_infra import MaskType
+
+# Kinds of triggers reported by the TriggerMatcher
+CODEBLOCK_TRIGGER = "codeblock"
+MASK_TRIGGER = "mask"
+CELL_EXCLUDE_TRIGGER = "cell_exclude"
+
+
+class TriggerHit(NamedTuple):
+    """
+    A single trigger found by the TriggerMatcher.
+
+    Attributes:
+        kind (str): One of CODEBLOCK_TRIGGER, MASK_TRIGGER or CELL_EXCLUDE_TRIGGER.
+        trigger_type (CodeBlockType | MaskType | None): The type the trigger
+            belongs to (None for the cell exclusion trigger).
+        label (str): "start" or "end" for codeblock triggers, the kind otherwise.
+    """
+
+    kind: str
+    trigger_type: object
+    label: str
+
+
+class TriggerLine(NamedTuple):
+    """
+    A line of a text buffer that contains at least one trigger.
+
+    Attributes:
+        start (int): The offset of the first character of the line.
+        end (int): The offset just past the line (including its newline).
+        hits (List[TriggerHit]): The trigger hits found in the line.
+    """
+
+    start: int
+    end: int
+    hits: List[TriggerHit]
+
+
+def count_regions(trigger_lines: List[TriggerLine]) -> int:
+    """
+    Returns the number of regions marked by the triggers of scanned lines:
+    codeblocks (counted by their start trigger), masks and excluded cells.
+
+    Args:
+        trigger_lines (List[TriggerLine]): The lines returned by
+            TriggerMatcher.scan.
+
+    Returns:
+        int: The number of regions.
+    """
+    return sum(
+        1
+        for trigger_line in trigger_lines
+        for hit in trigger_line.hits
+        if hit.kind != CODEBLOCK_TRIGGER or hit.label == "start"
+    )
+
+
+class TriggerMatcher:
+    """
+    Finds all trigger strings in a line with one compiled pattern.
+
+    All trigger strings are combined into a single regex alternation (longest
+    first), so a line is scanned once no matter how many trigger types are
+    registered. Triggers that only occur inside a longer trigger (e.g. a trigger
+    that is a substring of another) are reported as well, so the result is the
+    same as testing `trigger in line` for every trigger string.
+    """
+
+    def __init__(
+        self,
+        codeblock_types: List[CodeBlockType],
+        mask_types: List[MaskType],
+        cell_exclude_str: Optional[str] = None,
+    ):
+        """
+        Creates a new TriggerMatcher.
+
+        Args:
+            codeblock_types (List[CodeBlockType]): The codeblock types to match.
+            mask_types (List[MaskType]): The mask types to match.
+            cell_exclude_str (str, optional): The string marking notebook cells
+                that should be excluded. Defaults to None.
+        """
+
+        # Map each trigger string to the hits it represents (registration order)
+        self._hits_by_trigger: Dict[str, List[TriggerHit]] = {}
+
+        for codeblock_type in codeblock_types:
+            self._register(
+                codeblock_type.start_trigger_str,
+                TriggerHit(CODEBLOCK_TRIGGER, codeblock_type, "start"),
+            )
+            self._register(
+                codeblock_type.end_trigger_str,
+                TriggerHit(CODEBLOCK_TRIGGER, codeblock_type, "end"),
+            )
+
+        for mask_type in mask_types:
+            self._register(
+                mask_type.trigger_str, TriggerHit(MASK_TRIGGER, mask_type, MASK_TRIGGER)
+            )
+
+        if cell_exclude_str is not None:
+            self._register(
+                cell_exclude_str,
+                TriggerHit(CELL_EXCLUDE_TRIGGER, None, CELL_EXCLUDE_TRIGGER),
+            )
+
+        # Registration order of the trigger strings (used to order the hits)
+        self._trigger_order = {
+            trigger: i for i, trigger in enumerate(self._hits_by_trigger)
+        }
+
+        # Every trigger string found inside each trigger string (itself included)
+        self._contained_triggers = {
+            trigger: [other for other in self._hits_by_trigger if other in trigger]
+            for trigger in self._hits_by_trigger
+        }
+
+        # The ordered hits reported for a line whose only match is each trigger
+        self._hits_by_match = {
+            trigger: self._ordered_hits(self._contained_triggers[trigger])
+            for trigger in self._hits_by_trigger
+        }
+
+        # Whether non-overlapping matches are enough to find every trigger in a
+        # line, which allows scanning large buffers in bulk (see _scan_bulk)
+        self._bulk_scan_safe = self._matches_cover_all_triggers()
+
+        # Compile all triggers into a single alternation, longest first so the
+        # longest trigger starting at a position is the one reported
+        self.pattern = None
+        if self._hits_by_trigger:
+            self.pattern = re.compile(
+                "|".join(
+                    re.escape(trigger)
+                    for trigger in sorted(self._hits_by_trigger, key=len, reverse=True)
+                )
+            )
+
+        # The same alternation over UTF-8 bytes, used to check raw files for the
+        # presence of any trigger without decoding them
+        self.bytes_pattern = None
+        if self._hits_by_trigger:
+            self.bytes_pattern = re.compile(
+                b"|".join(
+                    re.escape(trigger.encode()) for trigger in self._hits_by_trigger
+                )
+            )
+
+        # The alternation, also matching the byte order marks of UTF-16 files
+        # and NUL bytes: the triggers of files in wide encodings are not found
+        # in their raw bytes, so these files must be decoded (see
+        # file_has_triggers)
+        self.raw_pattern = None
+        if self.bytes_pattern is not None:
+            self.raw_pattern = re.compile(
+                rb"\A(?:"
+                + b"|".join(re.escape(mark) for mark in WIDE_BYTE_ORDER_MARKS)
+                + rb")|\x00|"
+                + self.bytes_pattern.pattern
+            )
+
+    def _register(self, trigger_str: str, hit: TriggerHit) -> None:
+        """
+        Registers a trigger string with the matcher.
+
+        Args:
+            trigger_str (str): The trigger string.
+            hit (TriggerHit): The hit reported when the string is found.
+
+        Raises:
+            ValueError: If the trigger string is empty.
+        """
+        if not trigger_str:
+            raise ValueError(f"Trigger strings must not be empty: {hit}")
+
+        self._hits_by_trigger.setdefault(trigger_str, []).append(hit)
+
+    @property
+    def trigger_strs(self) -> List[str]:
+        """
+        Returns all registered trigger strings in registration order.
+
+        Returns:
+            List[str]: The registered trigger strings.
+        """
+        return list(self._hits_by_trigger)
+
+    def find(self, text: str) -> List[TriggerHit]:
+        """
+        Returns every trigger hit found in the text.
+
+        Args:
+            text (str): The text (usually a single line) to scan.
+
+        Returns:
+            List[TriggerHit]: The hits found, in registration order. Empty if
+                no trigger was found.
+        """
+
+        # Fast path: most lines contain no trigger at all
+        if self.pattern is None:
+            return []
+        match = self.pattern.search(text)
+        if match is None:
+            return []
+
+        # Collect every trigger string present in the text. Restarting one
+        # character after each match finds triggers overlapping a previous one.
+        found_triggers = set()
+        while match is not None:
+            found_triggers.update(self._contained_triggers[match.group()])
+            match = self.pattern.search(text, match.start() + 1)
+
+        return self._ordered_hits(found_triggers)
+
+    def _ordered_hits(self, triggers) -> List[TriggerHit]:
+        """
+        Returns the hits of a collection of trigger strings in registration order.
+
+        Args:
+            triggers (Iterable[str]): The trigger strings found.
+
+        Returns:
+            List[TriggerHit]: The hits of the trigger strings.
+        """
+        return [
+            hit
+            for trigger in sorted(set(triggers), key=self._trigger_order.__getitem__)
+            for hit in self._hits_by_trigger[trigger]
+        ]
+
+    def _matches_cover_all_triggers(self) -> bool:
+        """
+        Returns whether the non-overlapping matches of the pattern in a line
+        account for every trigger in it. This holds unless a trigger spans lines
+        or the end of one trigger can be the start of another (e.g. "AB_C" and
+        "B_CD"); triggers inside longer ones are covered by _contained_triggers.
+
+        Returns:
+            bool: True if no trigger can be hidden by an overlapping match.
+        """
+        triggers = list(self._hits_by_trigger)
+        if any("\n" in trigger for trigger in triggers):
+            return False
+
+        for trigger in triggers:
+            for other in triggers:
+                if other == trigger:
+                    continue
+                for length in range(1, min(len(trigger), len(other))):
+                    if trigger.endswith(other[:length]):
+                        return False
+        return True
+
+    def scan(self, text: str) -> List[TriggerLine]:
+        """
+        Returns every line of the text that contains a trigger. The whole text
+        is searched at once, so lines without triggers are never split out.
+
+        Args:
+            text (str): The text to scan.
+
+        Returns:
+            List[TriggerLine]: The lines containing triggers, in order.
+        """
+        trigger_lines = []
+        if self.pattern is None:
+            return trigger_lines
+
+        # Large buffers resolve all line boundaries at once if NumPy is installed
+        if self._bulk_scan_safe and len(text) >= NUMPY_MIN_BUFFER_SIZE:
+            line_index = LineIndex(text, use_numpy=True)
+            if line_index.is_vectorized:
+                return self._scan_bulk(text, line_index)
+
+        match = self.pattern.search(text)
+        while match is not None:
+
+            # Find the boundaries of the line containing the match
+            start = text.rfind("\n", 0, match.start()) + 1
+            end = text.find("\n", match.start())
+            end = len(text) if end == -1 else end + 1
+
+            # Collect every hit in the line (triggers spanning lines are ignored)
+            hits = self.find(text[start:end])
+            if hits:
+                trigger_lines.append(TriggerLine(start, end, hits))
+
+            # Continue searching after the line
+            match = self.pattern.search(text, end)
+
+        return trigger_lines
+
+    def _scan_bulk(self, text: str, line_index: LineIndex) -> List[TriggerLine]:
+        """
+        Scans the text with a single pass over all matches, then maps every
+        match to its line at once. Returns the same lines as the sequential
+        scan.
+
+        Args:
+            text (str): The text to scan.
+            line_index (LineIndex): The line index of the text.
+
+        Returns:
+            List[TriggerLine]: The lines containing triggers, in order.
+        """
+        matches = [
+            (match.start(), match.group()) for match in self.pattern.finditer(text)
+        ]
+        starts, ends = line_index.line_bounds([offset for offset, _ in matches])
+
+        # Group the consecutive matches of each line
+        trigger_lines = []
+        line_start = line_end = -1
+        line_triggers = []
+        for (_, trigger), start, end in zip(matches, starts, ends):
+            if start != line_start:
+                if line_triggers:
+                    trigger_lines.append(
+                        self._bulk_trigger_line(line_start, line_end, line_triggers)
+                    )
+                line_start, line_end, line_triggers = start, end, []
+            line_triggers.append(trigger)
+        if line_triggers:
+            trigger_lines.append(
+                self._bulk_trigger_line(line_start, line_end, line_triggers)
+            )
+
+        return trigger_lines
+
+    def _bulk_trigger_line(
+        self, start: int, end: int, triggers: List[str]
+    ) -> TriggerLine:
+        """
+        Creates the TriggerLine for the matches found in a line by _scan_bulk.
+
+        Args:
+            start (int): The offset of the first character of the line.
+            end (int): The offset just past the line.
+            triggers (List[str]): The matched trigger strings, in order.
+
+        Returns:
+            TriggerLine: The trigger line.
+        """
+        if len(triggers) == 1:
+            return TriggerLine(start, end, self._hits_by_match[triggers[0]])
+
+        return TriggerLine(
+            start,
+            end,
+            self._ordered_hits(
+                contained
+                for trigger in triggers
+                for contained in self._contained_triggers[trigger]
+            ),
+        )
+
+    def has_triggers(self, text: str) -> bool:
+        """
+        Returns whether the text contains any trigger string.
+
+        Args:
+            text (str): The text to check.
+
+        Returns:
+            bool: True if any trigger string is found, False otherwise.
+        """
+        return self.pattern is not None and self.pattern.search(text) is not None
+
+    def file_has_triggers(self, file_path: str) -> bool:
+        """
+        Returns whether the raw bytes of a file contain any trigger string, or
+        may hide one: files starting with a UTF-16 byte order mark or
+        containing NUL bytes (e.g. UTF-16 without a byte order mark) are
+        reported as having triggers, so they are decoded (and converted, or
+        skipped if they cannot be decoded) instead of copied as they are.
+
+        Args:
+            file_path (str): The path to the file to check.
+
+        Returns:
+            bool: True if any trigger string (or a wide encoding) is found,
+                False otherwise.
+        """
+        if self.raw_pattern is None:
+            return False
+
+        return file_contains_pattern(file_path, self.raw_pattern)
@@ -0,0 +1,265 @@
+"""
+trigger_table.py
+
+This module contains the TriggerTable class, an immutable table of everything
+that can be precomputed from the registered codeblock and mask types, and the
+ConversionContext class, which holds the state of a single conversion.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from types import MappingProxyType
+from typing import List, Optional, Tuple
+
+from pact.convert.utils.codeblock_infra import CodeBlockManager, CodeBlockType
+from pact.convert.utils.mask_infra import MaskManager, MaskType
+from pact.convert.utils.trigger_matcher import TriggerMatcher
+
+
+class TriggerTable:
+    """
+    Immutable table built once from the registered codeblock and mask types.
+
+    The table holds the compiled TriggerMatcher and the replacement templates of
+    every codeblock type. It never changes after it is created, so a single
+    table can be shared by any number of converters and threads. Tables pickle
+    to their constructor arguments, which keeps them cheap to send to worker
+    processes.
+    """
+
+    __slots__ = (
+        "codeblock_types",
+        "mask_types",
+        "cell_exclude_str",
+        "matcher",
+        "ascii_only",
+        "fingerprint",
+        "_replacement_templates",
+    )
+
+    def __init__(
+        self,
+        codeblock_types: List[CodeBlockType],
+        mask_types: List[MaskType],
+        cell_exclude_str: Optional[str] = None,
+    ):
+        """
+        Creates a new TriggerTable.
+
+        Args:
+            codeblock_types (List[CodeBlockType]): The codeblock types to use.
+            mask_types (List[MaskType]): The mask types to use.
+            cell_exclude_str (str, optional): The string marking notebook cells
+                that should be excluded. Defaults to None.
+        """
+        codeblock_types = tuple(codeblock_types)
+        mask_types = tuple(mask_types)
+
+        # The byte engine is only exact if every string it inserts or matches
+        # is ASCII (ASCII bytes are the same in every supported encoding)
+        ascii_only = all(
+            string.isascii()
+            for codeblock_type in codeblock_types
+            for string in (
+                codeblock_type.start_trigger_str,
+                codeblock_type.end_trigger_str,
+                codeblock_type.replacement_str,
+            )
+        ) and all(
+            string.isascii()
+            for mask_type in mask_types
+            for string in (
+                mask_type.trigger_str,
+                mask_type.start_char,
+                mask_type.mask_str,
+            )
+        )
+
+        object.__setattr__(self, "codeblock_types", codeblock_types)
+        object.__setattr__(self, "mask_types", mask_types)
+        object.__setattr__(self, "cell_exclude_str", cell_exclude_str)
+        object.__setattr__(
+            self,
+            "matcher",
+            TriggerMatcher(
+                codeblock_types=list(codeblock_types),
+                mask_types=list(mask_types),
+                cell_exclude_str=cell_exclude_str,
+            ),
+        )
+        object.__setattr__(self, "ascii_only", ascii_only)
+        object.__setattr__(
+            self,
+            "fingerprint",
+            _fingerprint(codeblock_types, mask_types, cell_exclude_str),
+        )
+        object.__setattr__(
+            self,
+            "_replacement_templates",
+            MappingProxyType(
+                {
+                    codeblock_type: _replacement_template(codeblock_type)
+                    for codeblock_type in codeblock_types
+                }
+            ),
+        )
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"TriggerTable is immutable (cannot set '{name}').")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"TriggerTable is immutable (cannot delete '{name}').")
+
+    def __reduce__(self):
+        # Rebuild from the types: the matcher is recompiled on unpickling
+        return (
+            TriggerTable,
+            (list(self.codeblock_types), list(self.mask_types), self.cell_exclude_str),
+        )
+
+    def get_replacement_str(
+        self, codeblock_type: CodeBlockType, indentation_str: str = ""
+    ) -> str:
+        """
+        Returns the replacement string of a codeblock type indented by the
+        specified indentation. Equivalent to CodeBlockType.get_replacement_str.
+
+        Args:
+            codeblock_type (CodeBlockType): The codeblock type.
+            indentation_str (str): The string to use for indentation.
+
+        Returns:
+            str: The indented replacement string.
+        """
+        template = self._replacement_templates.get(codeblock_type)
+
+        # Types without a template (or unknown types) build the string themselves
+        if template is None:
+            return codeblock_type.get_replacement_str(indentation_str)
+
+        indented_lines, last_line = template
+        if not indented_lines:
+            return last_line
+
+        return "".join(f"{indentation_str}{line}\n" for line in indented_lines) + (
+            last_line
+        )
+
+
+def _fingerprint(
+    codeblock_types: Tuple[CodeBlockType, ...],
+    mask_types: Tuple[MaskType, ...],
+    cell_exclude_str: Optional[str],
+) -> str:
+    """
+    Hashes everything that affects the output of a conversion: the class and
+    strings of every type (in order) and the cell exclusion string. Tables with
+    the same fingerprint convert any text the same way.
+
+    Args:
+        codeblock_types (Tuple[CodeBlockType, ...]): The codeblock types.
+        mask_types (Tuple[MaskType, ...]): The mask types.
+        cell_exclude_str (Optional[str]): The cell exclusion string.
+
+    Returns:
+        str: The hex digest of the configuration.
+    """
+    parts = [repr(cell_exclude_str)]
+    for codeblock_type in codeblock_types:
+        parts.append(
+            repr(
+                (
+                    type(codeblock_type).__module__,
+                    type(codeblock_type).__qualname__,
+                    codeblock_type.start_trigger_str,
+                    codeblock_type.end_trigger_str,
+                    codeblock_type.replacement_str,
+                )
+            )
+        )
+    for mask_type in mask_types:
+        parts.append(
+            repr(
+                (
+                    type(mask_type).__module__,
+                    type(mask_type).__qualname__,
+                    mask_type.trigger_str,
+                    mask_type.start_char,
+                    mask_type.mask_str,
+                )
+            )
+        )
+
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+
+def _replacement_template(codeblock_type: CodeBlockType) -> Tuple[tuple, str]:
+    """
+    Splits the replacement string of a codeblock type into the lines that are
+    indented and the last line (which is not), as done by
+    CodeBlockType.get_replacement_str.
+
+    Args:
+        codeblock_type (CodeBlockType): The codeblock type.
+
+    Returns:
+        Tuple[tuple, str]: The lines to indent and the last line, or None if the
+            replacement string is not in the supported format (it must be empty
+            or start with a newline).
+    """
+    replacement_str = codeblock_type.replacement_str
+    if replacement_str == "":
+        return (), ""
+    if replacement_str[0] != "\n":
+        return None
+
+    replacement_lines = replacement_str[1:].split("\n")
+    return tuple(replacement_lines[:-1]), replacement_lines[-1]
+
+
+class ConversionContext:
+    """
+    The state of a single conversion (a file, or a notebook cell). A new context
+    is created for every conversion, so converters hold no per-file state and
+    can be used by several threads at once.
+    """
+
+    __slots__ = ("table", "codeblock_manager", "mask_manager")
+
+    def __init__(self, table: TriggerTable):
+        """
+        Creates a new ConversionContext.
+
+        Args:
+            table (TriggerTable): The trigger table of the conversion.
+        """
+        self.table = table
+
+        # Create the state machines with the types of the table
+        self.codeblock_manager = CodeBlockManager()
+        for codeblock_type in table.codeblock_types:
+            self.codeblock_manager.add_codeblock_type(codeblock_type)
+
+        self.mask_manager = MaskManager()
+        for mask_type in table.mask_types:
+            self.mask_manager.add_mask_type(mask_type)
+
+    def get_replacement_str(self) -> str:
+        """
+        Returns the replacement string of the active codeblock, indented like
+        the line that opened it.
+
+        Raises:
+            ValueError: If no codeblock is active.
+
+        Returns:
+            str: The replacement string of the active codeblock.
+        """
+        if self.codeblock_manager.active_block_type is None:
+            raise ValueError("No codeblock type is currently active.")
+
+        return self.table.get_replacement_str(
+            self.codeblock_manager.active_block_type,
+            self.codeblock_manager.block_indentation_str,
+        )
@@ -7,7 +7,11 @@ folder into student versions.
 
 from __future__ import annotations
 
+import argparse
+import json
 import os
+from pact.convert.utils.file_jobs import jobs_from_argument
+from pact.convert.utils.staged_output import wait_for_removals
 from pact.convert_assignment import PrimeConverter
 
 ASSIGNMENTS_PATH = os.path.join(
@@ -17,23 +21,62 @@ ASSIGNMENTS_PATH = os.path.join(
 
 if __name__ == "__main__":
 
+    # Create an argument parser
+    parser = argparse.ArgumentParser(
+        description="Convert all assignments in the assignments folder."
+    )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=jobs_from_argument,
+        default=1,
+        metavar="N",
+        help="The number of files to convert in parallel (0 for one per CPU).",
+    )
+    parser.add_argument(
+        "--clean",
+        action="store_true",
+        help="Convert every file, instead of only the files changed since the "
+        "previous conversion.",
+    )
+    parser.add_argument(
+        "--plan",
+        action="store_true",
+        help="Print what the conversion would do as JSON, without writing anything.",
+    )
+    args = parser.parse_args()
+
+    # Create a new PrimeConverter
+    converter = PrimeConverter(jobs=args.jobs)
+
+    # Print the plan of every conversion instead of converting
+    if args.plan:
+        plans = []
+        if os.path.isdir(ASSIGNMENTS_PATH):
+            for assignment_name in sorted(os.listdir(ASSIGNMENTS_PATH)):
+                assignment_path = os.path.join(ASSIGNMENTS_PATH, assignment_name)
+                if os.path.isdir(assignment_path):
+                    plans.append(converter.plan(assignment_path, clean=args.clean))
+        print(json.dumps({"assignments": plans}, indent=2))
+        raise SystemExit(0)
+
     print("Converting all assignments...")
 
     # Create the assignments folder if it does not exist
     os.makedirs(ASSIGNMENTS_PATH, exist_ok=True)
 
-    # Create a new PrimeConverter
-    converter = PrimeConverter()
-
     # Convert each directory in the assignments folder
-    for assignment_name in os.listdir(ASSIGNMENTS_PATH):
+    for assignment_name in sorted(os.listdir(ASSIGNMENTS_PATH)):
 
         # Get the source path of the assignment directory
         assignment_path = os.path.join(ASSIGNMENTS_PATH, assignment_name)
 
         # If the assignment is a directory, convert it
         if os.path.isdir(assignment_path):
-            converter.convert(assignment_path)
+            converter.convert(assignment_path, clean=args.clean)
             print(f"- Converted {assignment_name}")
 
+    # Wait until the previous student versions are removed
+    wait_for_removals()
+
     print("- All assignments converted.")
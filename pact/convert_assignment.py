@@ -8,6 +8,9 @@ the files.
 from __future__ import annotations
 
 import argparse
+import json
+from pact.convert.utils.file_jobs import jobs_from_argument
+from pact.convert.utils.staged_output import wait_for_removals
 from pact.convert.utils.prime_converter import PrimeConverter
 
 if __name__ == "__main__":
@@ -23,12 +26,42 @@ if __name__ == "__main__":
         type=str,
         help="The path to the solution version of the assignment file to convert.",
     )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=jobs_from_argument,
+        default=1,
+        metavar="N",
+        help="The number of files to convert in parallel (0 for one per CPU).",
+    )
+    parser.add_argument(
+        "--clean",
+        action="store_true",
+        help="Convert every file, instead of only the files changed since the "
+        "previous conversion.",
+    )
+    parser.add_argument(
+        "--plan",
+        action="store_true",
+        help="Print what the conversion would do as JSON, without writing anything.",
+    )
 
     # Load the arguments
     args = parser.parse_args()
 
     # Create prime converter
-    prime_converter = PrimeConverter()
+    prime_converter = PrimeConverter(jobs=args.jobs)
+
+    # Print the plan of the conversion instead of converting
+    if args.plan:
+        plan = prime_converter.plan(args.source_file_or_folder, clean=args.clean)
+        print(json.dumps(plan, indent=2))
+        raise SystemExit(0)
 
     # Convert the source file/folder
-    prime_converter.convert(source_file_or_folder=args.source_file_or_folder)
+    prime_converter.convert(
+        source_file_or_folder=args.source_file_or_folder, clean=args.clean
+    )
+
+    # Wait until the previous student version is removed
+    wait_for_removals()
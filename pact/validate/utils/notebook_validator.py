@@ -10,19 +10,127 @@ from __future__ import annotations
 import logging
 import os
 from dataclasses import dataclass, field
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 import nbformat
 from nbclient import NotebookClient
 from nbclient.exceptions import CellExecutionError
+from traitlets import Integer
 
+from pact.convert.utils.notebook_reader import read_notebook
 from pact.convert.utils.prime_converter import GENERATED_LOCATION_NAME
+from pact.convert.utils.staged_output import is_work_folder
 
 logger = logging.getLogger(__name__)
 
 DEFAULT_CELL_TIMEOUT_SEC = 300
 
 
+def _output_size(output) -> int:
+    """
+    Returns the approximate size of a cell output: the length of its text, or
+    of the values of its MIME bundle.
+
+    Args:
+        output (NotebookNode): The output.
+
+    Returns:
+        int: The size of the output.
+    """
+    output_type = output.get("output_type")
+    if output_type == "stream":
+        return len(output.get("text", ""))
+    if output_type == "error":
+        return sum(len(line) for line in output.get("traceback", ()))
+    return sum(
+        len(value) if isinstance(value, str) else len(str(value))
+        for value in output.get("data", {}).values()
+    )
+
+
+class _BoundedOutputClient(NotebookClient):
+    """
+    NotebookClient that keeps at most max_output_bytes of outputs per cell.
+    Outputs are trimmed as they arrive, keeping the most recent ones (the
+    tail, which holds the error context), so a cell printing a long log never
+    holds all of it in memory.
+    """
+
+    max_output_bytes = Integer(None, allow_none=True)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.output_bytes: Dict[int, int] = {}
+        self.trimmed_bytes: Dict[int, int] = {}
+
+    def output(self, outs, msg, display_id, cell_index):
+        out = super().output(outs, msg, display_id, cell_index)
+        if out is not None and self.max_output_bytes is not None:
+            self._trim_outputs(outs, cell_index)
+        return out
+
+    def _trim_outputs(self, outs: list, cell_index: int) -> None:
+        """
+        Drops the oldest outputs of a cell (cutting the head of a stream output
+        instead if that is enough) until they fit in max_output_bytes. The
+        last output is always kept.
+
+        Args:
+            outs (list): The outputs of the cell, the newest last.
+            cell_index (int): The index of the cell.
+        """
+        # A single output means the outputs were cleared before it was added
+        size = _output_size(outs[-1])
+        if len(outs) > 1:
+            size += self.output_bytes.get(cell_index, 0)
+
+        trimmed = 0
+        removed = 0
+        while size > self.max_output_bytes and removed < len(outs):
+            output = outs[removed]
+            output_size = _output_size(output)
+            excess = size - self.max_output_bytes
+
+            # Cut the head of a stream output rather than dropping all of it
+            if output.get("output_type") == "stream" and output_size > excess:
+                output["text"] = output["text"][excess:]
+                size -= excess
+                trimmed += excess
+                break
+
+            # The last output is always kept, even if it does not fit
+            if removed == len(outs) - 1:
+                break
+
+            size -= output_size
+            trimmed += output_size
+            removed += 1
+
+        if removed:
+            del outs[:removed]
+            self._shift_display_ids(cell_index, removed)
+
+        self.output_bytes[cell_index] = size
+        if trimmed:
+            self.trimmed_bytes[cell_index] = (
+                self.trimmed_bytes.get(cell_index, 0) + trimmed
+            )
+
+    def _shift_display_ids(self, cell_index: int, removed: int) -> None:
+        """
+        Updates the output indices recorded for display ids after the first
+        outputs of a cell were dropped.
+
+        Args:
+            cell_index (int): The index of the cell.
+            removed (int): The number of dropped outputs.
+        """
+        for cell_map in self._display_id_map.values():
+            indices = cell_map.get(cell_index)
+            if indices:
+                cell_map[cell_index] = [i - removed for i in indices if i >= removed]
+
+
 @dataclass
 class NotebookResult:
     """The result of executing a single notebook."""
@@ -57,6 +165,7 @@ class NotebookValidator:
         cell_timeout_sec: int = DEFAULT_CELL_TIMEOUT_SEC,
         kernel_name: str = "python3",
         include_student_versions: bool = False,
+        max_output_bytes: Optional[int] = None,
     ):
         """
         Args:
@@ -65,10 +174,17 @@ class NotebookValidator:
             include_student_versions: If True, also validate notebooks inside
                 STUDENT_VERSION/ directories. Defaults to False because those
                 notebooks intentionally contain unimplemented TODOs.
+            max_output_bytes: If set, the outputs kept in memory for each cell
+                are capped to about this many bytes, keeping only the most
+                recent ones. Defaults to None (no cap).
         """
+        if max_output_bytes is not None and max_output_bytes < 0:
+            raise ValueError(f"Invalid max_output_bytes: {max_output_bytes}")
+
         self.cell_timeout_sec = cell_timeout_sec
         self.kernel_name = kernel_name
         self.include_student_versions = include_student_versions
+        self.max_output_bytes = max_output_bytes
 
     def validate(self, path: str) -> ValidationReport:
         """
@@ -95,25 +211,70 @@ class NotebookValidator:
             if not self.include_student_versions:
                 # Don't descend into generated student-version trees
                 dirs[:] = [d for d in dirs if d != GENERATED_LOCATION_NAME]
-            # Skip checkpoints regardless
-            dirs[:] = [d for d in dirs if d != ".ipynb_checkpoints"]
+            # Skip checkpoints and conversions in progress regardless
+            dirs[:] = [
+                d
+                for d in dirs
+                if d != ".ipynb_checkpoints"
+                and not is_work_folder(d, GENERATED_LOCATION_NAME)
+            ]
             for name in files:
                 if name.endswith(".ipynb"):
                     notebooks.append(os.path.join(root, name))
         notebooks.sort()
         return notebooks
 
+    def _read_notebook(self, nb_path: str) -> nbformat.NotebookNode:
+        """
+        Reads a notebook without the outputs saved in it: they are replaced by
+        the execution anyway, and are dropped as each cell is parsed so large
+        saved outputs are never held in memory.
+
+        The parsed notebook goes through the same steps as nbformat.read: the
+        sources saved as lists of lines are rejoined, and schema errors are
+        logged without failing the notebook.
+
+        Raises:
+            nbformat.NBFormatError: If the nbformat version is not supported.
+        """
+        nb = read_notebook(nb_path, drop_code_outputs=True)
+        for cell in nb.get("cells", []):
+            if cell.get("cell_type") == "code":
+                cell["execution_count"] = None
+
+        # Build the notebook node like nbformat.reads does from the JSON
+        major, minor = nbformat.reader.get_version(nb)
+        if major not in nbformat.versions:
+            raise nbformat.NBFormatError(f"Unsupported nbformat version {major}")
+        nb = nbformat.versions[major].to_notebook_json(nb, minor=minor)
+        nb = nbformat.convert(nb, 4)
+        try:
+            nbformat.validate(nb)
+        except nbformat.ValidationError as exc:
+            logger.error("Notebook JSON of %s is invalid: %s", nb_path, exc)
+        return nb
+
     def _run_notebook(self, nb_path: str) -> NotebookResult:
         logger.info("Validating notebook: %s", nb_path)
         try:
-            nb = nbformat.read(nb_path, as_version=4)
-            client = NotebookClient(
+            nb = self._read_notebook(nb_path)
+            client = _BoundedOutputClient(
                 nb,
                 timeout=self.cell_timeout_sec,
                 kernel_name=self.kernel_name,
                 resources={"metadata": {"path": os.path.dirname(nb_path) or "."}},
+                max_output_bytes=self.max_output_bytes,
             )
-            client.execute()
+            try:
+                client.execute()
+            finally:
+                for cell_index, trimmed in sorted(client.trimmed_bytes.items()):
+                    logger.info(
+                        "Trimmed %d bytes of output of cell %d of %s",
+                        trimmed,
+                        cell_index,
+                        nb_path,
+                    )
         except CellExecutionError as exc:
             return NotebookResult(path=nb_path, ok=False, error=str(exc))
         except Exception as exc:
@@ -48,6 +48,15 @@ def main(argv: list[str] | None = None) -> int:
         action="store_true",
         help="Also validate notebooks inside STUDENT_VERSION/ directories.",
     )
+    parser.add_argument(
+        "--max-output-bytes",
+        type=int,
+        default=None,
+        help=(
+            "Keep at most about this many bytes of output per cell in memory, "
+            "dropping the oldest (default: no limit)."
+        ),
+    )
     args = parser.parse_args(argv)
 
     logging.basicConfig(level=logging.INFO, format="%(message)s")
@@ -56,6 +65,7 @@ def main(argv: list[str] | None = None) -> int:
         cell_timeout_sec=args.timeout,
         kernel_name=args.kernel,
         include_student_versions=args.include_student_versions,
+        max_output_bytes=args.max_output_bytes,
     )
     report = validator.validate(args.path)
 
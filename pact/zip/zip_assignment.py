@@ -8,6 +8,15 @@ from __future__ import annotations
 
 import os
 import zipfile
+from typing import Iterable, Tuple
+
+# Fixed sizes of the records of a zip file written by zip_assignment_dir
+# (stored, no extra fields below the zip64 limits)
+_LOCAL_HEADER_SIZE = 30
+_CENTRAL_HEADER_SIZE = 46
+_END_RECORD_SIZE = 22
+_ZIP64_LOCAL_EXTRA_SIZE = 20
+_ZIP64_END_RECORDS_SIZE = 56 + 20
 
 
 def zip_assignment_dir(dir_path: str, output_dir: str = None):
@@ -41,8 +50,39 @@ def zip_assignment_dir(dir_path: str, output_dir: str = None):
 
     # Create a zip file
     with zipfile.ZipFile(zip_path, "w") as zipf:
-        # Add all files in the directory to the zip file
-        for root, _, files in os.walk(dir_path):
-            for file in files:
+        # Add all files in the directory to the zip file (in name order, so the
+        # zip file does not depend on the order the files were written in)
+        for root, dirs, files in os.walk(dir_path):
+            dirs.sort()
+            for file in sorted(files):
                 file_path = os.path.join(root, file)
                 zipf.write(file_path, os.path.relpath(file_path, dir_path))
+
+
+def predicted_zip_size(members: Iterable[Tuple[str, int]]) -> int:
+    """
+    Returns the size of the zip file zip_assignment_dir would write for files
+    of given names and sizes (files are stored, not compressed). The size is
+    exact for archives below 4 GiB, and an estimate beyond.
+
+    Args:
+        members (Iterable[Tuple[str, int]]): The name of each file in the zip
+            file (relative, with "/" separators) and its size in bytes.
+
+    Returns:
+        int: The size of the zip file in bytes.
+    """
+    size = _END_RECORD_SIZE
+    count = 0
+    for name, file_size in members:
+        name_size = len(name.encode("utf-8"))
+        size += _LOCAL_HEADER_SIZE + _CENTRAL_HEADER_SIZE + 2 * name_size + file_size
+
+        # zipfile adds zip64 fields to files close to the zip64 limit
+        if file_size * 1.05 > zipfile.ZIP64_LIMIT:
+            size += 2 * _ZIP64_LOCAL_EXTRA_SIZE
+        count += 1
+
+    if size > zipfile.ZIP64_LIMIT or count >= zipfile.ZIP_FILECOUNT_LIMIT:
+        size += _ZIP64_END_RECORDS_SIZE
+    return size
@@ -18,14 +18,22 @@ TEMPLATE = os.path.join(os.path.dirname(__file__), "submission_file_template.py"
 REPLACE_STRING = "PATTERNS_TO_INCLUDE = []"
 
 
-def create_submission_file(output_directory: str, sub_list: List[str] = None):
+SUBMISSION_FILE_NAME = "create_submission_zip.py"
+"""
+SUBMISSION_FILE_NAME: The name of the submission file in the student version.
+"""
+
+
+def submission_file_contents(sub_list: List[str] = None) -> str:
     """
-    Creates a submission file for students to submit their assignments.
+    Returns the contents of the submission file.
 
     Args:
-        output_directory (str): The path to the directory to save the submission file in.
         sub_list (List[str], optional): A list of files to include in the submission.
             Defaults to None.
+
+    Returns:
+        str: The contents of the submission file.
     """
 
     # Read in the template file
@@ -36,6 +44,38 @@ def create_submission_file(output_directory: str, sub_list: List[str] = None):
     if sub_list:
         template = template.replace(REPLACE_STRING, f"PATTERNS_TO_INCLUDE = {sub_list}")
 
-    # Write the template to the output directory
-    with open(os.path.join(output_directory, "create_submission_zip.py"), "w") as file:
+    return template
+
+
+def create_submission_file(output_directory: str, sub_list: List[str] = None) -> bool:
+    """
+    Creates a submission file for students to submit their assignments.
+
+    Args:
+        output_directory (str): The path to the directory to save the submission file in.
+        sub_list (List[str], optional): A list of files to include in the submission.
+            Defaults to None.
+
+    Returns:
+        bool: True if the file was written, False if it already had this content.
+    """
+
+    template = submission_file_contents(sub_list)
+
+    # Keep the existing file (and its modification time) if it is up to date
+    submission_file_path = os.path.join(output_directory, SUBMISSION_FILE_NAME)
+    try:
+        with open(submission_file_path, "r") as file:
+            if file.read() == template:
+                return False
+    except OSError:
+        pass
+
+    # Write the template to the output directory (as a new file, since the
+    # existing one may be a link to a previous student version)
+    if os.path.exists(submission_file_path):
+        os.remove(submission_file_path)
+    with open(submission_file_path, "w") as file:
         file.write(template)
+
+    return True
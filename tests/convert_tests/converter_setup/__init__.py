@@ -2,6 +2,7 @@ import json
 import os
 from convert_tests.converter_setup.ex_codeblock import CODEBLOCK_TYPES
 from convert_tests.converter_setup.ex_masks import MASKTYPES
+from convert_tests.converter_setup.legacy_engine import LegacyConverter
 from convert_tests.converter_setup.fail_logging import (
     log_failed_test,
     failed_test_output_dir,
@@ -0,0 +1,99 @@
+"""
+legacy_engine.py
+
+A copy of the original line-by-line conversion engine. It is used as the
+reference in differential tests of the FileConverter conversion engine.
+"""
+
+import json
+from copy import deepcopy
+
+from pact.convert.utils.codeblock_infra import CodeBlockManager
+from pact.convert.utils.file_converter import IPYNB_CELL_EXCLUDE
+from pact.convert.utils.mask_infra import MaskManager
+
+
+class LegacyConverter:
+    """
+    Converts files one line at a time, as FileConverter originally did.
+    """
+
+    def __init__(self, codeblock_types, mask_types):
+        self.codeblock_manager = CodeBlockManager()
+        for codeblock_type in codeblock_types:
+            self.codeblock_manager.add_codeblock_type(codeblock_type)
+
+        self.mask_manager = MaskManager()
+        for mask_type in mask_types:
+            self.mask_manager.add_mask_type(mask_type)
+
+    def convert_file_contents(self, source_file_path):
+        """
+        Returns the contents the original engine wrote for the file.
+        """
+        if source_file_path.endswith(".ipynb"):
+            return self._convert_ipynb_file(source_file_path)
+
+        with open(source_file_path, "r") as file:
+            og_lines = file.readlines()
+
+        return "".join(self.convert_lines(og_lines))
+
+    def _convert_ipynb_file(self, file_path):
+        with open(file_path, "r") as file:
+            og_json = json.load(file)
+
+        for cell in og_json["cells"]:
+            if isinstance(cell["source"], str):
+                cell["source"] = cell["source"].splitlines(keepends=True)
+
+        cells_to_remove = [False] * len(og_json["cells"])
+        for cell_i, cell in enumerate(og_json["cells"]):
+            for line_of_text in cell["source"]:
+                if IPYNB_CELL_EXCLUDE in line_of_text:
+                    cells_to_remove[cell_i] = True
+                    break
+
+        new_json = deepcopy(og_json)
+        for remove_flag, cell in zip(cells_to_remove, og_json["cells"]):
+            if remove_flag:
+                new_json["cells"].remove(cell)
+
+        for cell in new_json["cells"]:
+            cell["source"] = self.convert_lines(cell["source"])
+            if cell.get("cell_type") == "code":
+                cell["outputs"] = []
+                cell["execution_count"] = None
+
+        return json.dumps(new_json)
+
+    def convert_lines(self, source_text_lines):
+        """
+        Converts lines of text exactly as the original engine did.
+        """
+        new_lines = []
+        inside_code_block = False
+        inside_mask = False
+        for line in source_text_lines:
+            self.codeblock_manager.update_state(line)
+            codeblock_active = self.codeblock_manager.is_codeblock_active()
+            self.mask_manager.update_state(line)
+            mask_active = self.mask_manager.is_mask_active()
+
+            if mask_active and codeblock_active:
+                raise ValueError("Both a mask and code block are active.")
+
+            if not inside_code_block and codeblock_active:
+                new_lines.append(self.codeblock_manager.get_replacement_str())
+            elif not inside_mask and mask_active:
+                new_lines.append(self.mask_manager.get_masked_str(line))
+            elif (not inside_code_block and not codeblock_active) and (
+                not inside_mask and not mask_active
+            ):
+                new_lines.append(line)
+
+            inside_code_block = codeblock_active
+            inside_mask = mask_active
+
+        self.codeblock_manager.end_of_file_check()
+        return new_lines
@@ -0,0 +1,147 @@
+"""
+Differential tests: the FileConverter conversion engine must produce exactly the
+same output (or the same error) as the original line-by-line engine.
+"""
+
+import json
+import os
+import sys
+import pytest
+
+PROJECT_REPO = os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+)
+sys.path.append(PROJECT_REPO)
+
+
+from convert_tests.converter_setup import (
+    LegacyConverter,
+    CODEBLOCK_TYPES,
+    MASKTYPES,
+)
+from convert_tests.mock_solution_files import (
+    MOCK_SOLUTION_FILES,
+)
+
+from pact.convert.utils.file_converter import FileConverter
+
+# Extra edge cases that are not covered by the mock solution files
+EDGE_CASE_FILES = {
+    "no_trailing_newline.py": "x = 1\n# KEY_ONLY_START\ny = 2\n# KEY_ONLY_END",
+    "mask_at_end_of_file.py": "a = 1\nb = compute()  # MASK_ASSIGNMENT\n    more()",
+    "mask_then_codeblock.py": (
+        "v = 1  # MASK_ASSIGNMENT\n  cont\n\n"
+        "    # STUDENT_CODE_START\n    body\n    # STUDENT_CODE_END\ntail\n"
+    ),
+    "back_to_back_blocks.py": (
+        "# KEY_ONLY_START\n# KEY_ONLY_END\n\t# STUDENT_CODE_START\n"
+        "\t# STUDENT_CODE_END\n# KEY_ONLY_START\nx\n# KEY_ONLY_END\n"
+    ),
+    "whitespace_lines.py": "a = 1 # MASK_ASSIGNMENT\n   \t\nb\n\n\n",
+    "empty.py": "",
+    "crlf.py": "x = 1\r\n# KEY_ONLY_START\r\nsecret\r\n# KEY_ONLY_END\r\ny = 2\r\n",
+    "invalid_end_without_start.py": "x\n# STUDENT_CODE_END\n",
+    "invalid_mask_in_block.py": "# KEY_ONLY_START\nx = 1 # MASK_ASSIGNMENT\n# KEY_ONLY_END\n",
+    "invalid_double_mask.py": "x = 1 # MASK_ASSIGNMENT\ny = 2 # MASK_ASSIGNMENT\n",
+    "cells.ipynb": json.dumps(
+        {
+            "cells": [
+                {
+                    "cell_type": "code",
+                    "metadata": {},
+                    "execution_count": 3,
+                    "outputs": [{"output_type": "stream", "text": ["hi"]}],
+                    "source": [
+                        "def f():\n",
+                        "    # STUDENT_CODE_START\n",
+                        "    return 1\n",
+                        "    # STUDENT_CODE_END\n",
+                        "x = f()  # MASK_ASSIGNMENT\n",
+                        "    + 1\n",
+                        "\n",
+                        "print(x)",
+                    ],
+                },
+                {
+                    "cell_type": "code",
+                    "metadata": {},
+                    "execution_count": 4,
+                    "outputs": [],
+                    "source": "y = 2\n# KEY_ONLY_START\nz = 3\n# KEY_ONLY_END\n",
+                },
+                {
+                    "cell_type": "markdown",
+                    "metadata": {},
+                    "source": ["# ANSWER_KEY_CELL\n", "answer"],
+                },
+                {
+                    "cell_type": "markdown",
+                    "metadata": {},
+                    "source": ["Unchanged text\n", "\n", "more"],
+                },
+            ],
+            "metadata": {},
+            "nbformat": 4,
+            "nbformat_minor": 5,
+        }
+    ),
+}
+
+
+def _run(convert):
+    """
+    Runs a conversion, returning ("ok", output) or ("error", exception details).
+    """
+    try:
+        return "ok", convert()
+    except Exception as e:
+        return "error", (type(e), str(e))
+
+
+def _assert_same_as_legacy(source_file_path, tmp_path, byte_engine):
+    """
+    Converts the file with both engines and compares the results.
+    """
+    legacy = LegacyConverter(CODEBLOCK_TYPES, MASKTYPES)
+    converter = FileConverter(
+        codeblock_types=CODEBLOCK_TYPES, mask_types=MASKTYPES, byte_engine=byte_engine
+    )
+
+    expected = _run(lambda: legacy.convert_file_contents(source_file_path))
+
+    def convert():
+        converter.convert_file(
+            source_file_path=source_file_path, destination_folder_path=tmp_path
+        )
+        converted_path = os.path.join(tmp_path, os.path.basename(source_file_path))
+        with open(converted_path, "r", newline="") as file:
+            return file.read()
+
+    assert _run(convert) == expected
+
+
+@pytest.mark.parametrize("byte_engine", [False, True])
+@pytest.mark.parametrize("file_name, file_path", MOCK_SOLUTION_FILES.items())
+def test_mock_files_match_legacy_engine(tmp_path, file_name, file_path, byte_engine):
+    """
+    Every mock solution file converts exactly as with the line-by-line engine.
+    """
+    _assert_same_as_legacy(file_path, tmp_path / "out", byte_engine)
+
+
+@pytest.mark.parametrize("byte_engine", [False, True])
+@pytest.mark.parametrize("file_name", EDGE_CASE_FILES)
+def test_edge_cases_match_legacy_engine(tmp_path, file_name, byte_engine):
+    """
+    Edge cases (missing trailing newlines, masks at the end of a file, notebook
+    cells, ...) convert exactly as with the line-by-line engine.
+    """
+    # The byte engine intentionally keeps \r\n line endings
+    if byte_engine and "\r" in EDGE_CASE_FILES[file_name]:
+        pytest.skip("The byte engine does not translate newlines.")
+
+    source_file_path = tmp_path / file_name
+    with open(source_file_path, "w", newline="") as file:
+        file.write(EDGE_CASE_FILES[file_name])
+
+    _assert_same_as_legacy(str(source_file_path), tmp_path / "out", byte_engine)
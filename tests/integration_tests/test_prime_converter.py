@@ -1,10 +1,15 @@
 """Integration tests for PrimeConverter."""
 from __future__ import annotations
 
+import base64
+import json
 import os
+import zipfile
 
 import pytest
 
+from pact.convert.utils.build_manifest import MANIFEST_FILE_NAME
+from pact.convert.utils.codeblock_infra import InvalidCodeBlockError
 from pact.convert.utils.prime_converter import (
     BLACK_LIST_FILE_NAME,
     DEFAULT_BLACK_LIST,
@@ -13,6 +18,7 @@ from pact.convert.utils.prime_converter import (
     SUB_LIST_FILE_NAME,
     PrimeConverter,
 )
+from pact.convert.utils.staged_output import wait_for_removals
 
 
 class TestPrimeConverterInit:
@@ -418,6 +424,134 @@ x = 1
         submission_file = output_dir / "create_submission_zip.py"
         assert not submission_file.exists()
 
+    def test_byte_engine_option(self, tmp_path):
+        """byte_engine option converts non-UTF-8 files on their raw bytes."""
+        assignment_dir = tmp_path / "assignment"
+        assignment_dir.mkdir()
+
+        (assignment_dir / "main.py").write_bytes(
+            "# né\n# KEY_ONLY_START\nsecret\n# KEY_ONLY_END\n".encode("latin-1")
+        )
+        (assignment_dir / OPTIONS_FILE_NAME).write_text("byte_engine\n")
+
+        converter = PrimeConverter()
+        converter.convert(str(assignment_dir))
+
+        output_dir = assignment_dir / GENERATED_LOCATION_NAME / assignment_dir.name
+        assert converter.file_converter.byte_engine is True
+        assert (output_dir / "main.py").read_bytes() == "# né\n".encode("latin-1")
+
+    def test_handler_option(self, tmp_path):
+        """handler options map extensions to file handlers."""
+        assignment_dir = tmp_path / "assignment"
+        assignment_dir.mkdir()
+
+        data = "id,note\n1,KEY_ONLY_START\n2,KEY_ONLY_END\n"
+        (assignment_dir / "data.csv").write_text(data)
+        (assignment_dir / "scratch.log").write_text("debug output\n")
+        (assignment_dir / OPTIONS_FILE_NAME).write_text(
+            "handler .csv copy\nhandler log skip\n"
+        )
+
+        converter = PrimeConverter()
+        converter.convert(str(assignment_dir))
+
+        output_dir = assignment_dir / GENERATED_LOCATION_NAME / assignment_dir.name
+        assert (output_dir / "data.csv").read_text() == data
+        assert not (output_dir / "scratch.log").exists()
+
+    def test_handler_option_typo(self, tmp_path):
+        """A handler option naming an unknown handler fails before converting."""
+        assignment_dir = tmp_path / "assignment"
+        assignment_dir.mkdir()
+        (assignment_dir / "data.csv").write_text("id\n1\n")
+        (assignment_dir / OPTIONS_FILE_NAME).write_text("handler .csv cpy\n")
+
+        with pytest.raises(ValueError, match="Invalid handler option"):
+            PrimeConverter().convert(str(assignment_dir))
+
+        assert not (assignment_dir / GENERATED_LOCATION_NAME).exists()
+
+    def test_scrub_option(self, tmp_path):
+        """scrub options remove notebook metadata from student versions."""
+        assignment_dir = tmp_path / "assignment"
+        assignment_dir.mkdir()
+
+        notebook = {
+            "cells": [{"cell_type": "markdown", "metadata": {}, "source": []}],
+            "metadata": {"widgets": {"state": {}}, "kernelspec": {}},
+            "nbformat": 4,
+            "nbformat_minor": 5,
+        }
+        (assignment_dir / "demo.ipynb").write_text(json.dumps(notebook))
+        (assignment_dir / OPTIONS_FILE_NAME).write_text("scrub widgets\n")
+
+        converter = PrimeConverter()
+        converter.convert(str(assignment_dir))
+
+        output_dir = assignment_dir / GENERATED_LOCATION_NAME / assignment_dir.name
+        converted = json.loads((output_dir / "demo.ipynb").read_text())
+        assert converted["metadata"] == {"kernelspec": {}}
+
+    def test_externalize_attachments_option(self, tmp_path):
+        """Images attached in several notebooks are stored once as assets."""
+        assignment_dir = tmp_path / "assignment"
+        (assignment_dir / "part2").mkdir(parents=True)
+
+        image = base64.b64encode(bytes(range(256)) * 64).decode()
+        notebook = {
+            "cells": [
+                {
+                    "cell_type": "markdown",
+                    "metadata": {},
+                    "attachments": {"diagram.png": {"image/png": image}},
+                    "source": ["![diagram](attachment:diagram.png)"],
+                }
+            ],
+            "metadata": {},
+            "nbformat": 4,
+            "nbformat_minor": 5,
+        }
+        (assignment_dir / "part1.ipynb").write_text(json.dumps(notebook))
+        (assignment_dir / "part2" / "part2.ipynb").write_text(json.dumps(notebook))
+        (assignment_dir / OPTIONS_FILE_NAME).write_text("externalize_attachments\n")
+
+        converter = PrimeConverter()
+        converter.convert(str(assignment_dir))
+
+        output_dir = assignment_dir / GENERATED_LOCATION_NAME / assignment_dir.name
+        (asset,) = (output_dir / "assets").iterdir()
+        part1 = json.loads((output_dir / "part1.ipynb").read_text())
+        part2 = json.loads((output_dir / "part2" / "part2.ipynb").read_text())
+        assert part1["cells"][0]["source"] == [f"![diagram](assets/{asset.name})"]
+        assert part2["cells"][0]["source"] == [f"![diagram](../assets/{asset.name})"]
+        assert "attachments" not in part1["cells"][0]
+
+    def test_cell_cache_option(self, tmp_path):
+        """The cell_cache option caches notebook cells in the given folder."""
+        assignment_dir = tmp_path / "assignment"
+        assignment_dir.mkdir()
+
+        notebook = {
+            "cells": [{"cell_type": "code", "metadata": {}, "source": ["x = 1\n"]}],
+            "metadata": {},
+            "nbformat": 4,
+            "nbformat_minor": 5,
+        }
+        (assignment_dir / "demo.ipynb").write_text(json.dumps(notebook))
+        (assignment_dir / OPTIONS_FILE_NAME).write_text(
+            f"cell_cache {tmp_path / 'cache'}\n"
+        )
+
+        converter = PrimeConverter()
+        converter.convert(str(assignment_dir))
+        converter.convert(str(assignment_dir))
+
+        assert len(list((tmp_path / "cache").iterdir())) == 1
+        output_dir = assignment_dir / GENERATED_LOCATION_NAME / assignment_dir.name
+        converted = json.loads((output_dir / "demo.ipynb").read_text())
+        assert converted["cells"][0]["source"] == ["x = 1\n"]
+
     def test_loads_sub_list(self, tmp_path):
         """Sub list is loaded and used."""
         assignment_dir = tmp_path / "assignment"
@@ -589,6 +723,44 @@ x = 1
         assert not (output_dir / ".DS_Store").exists()
         assert not (output_dir / "notes.md").exists()
 
+    def test_black_list_matches_relative_paths(self, tmp_path):
+        """Black list patterns only see the path inside the assignment."""
+        # The assignment lives in a folder matching a default pattern
+        assignment_dir = tmp_path / "build" / "assignment"
+        (assignment_dir / "data").mkdir(parents=True)
+        (assignment_dir / "sub" / "data").mkdir(parents=True)
+
+        (assignment_dir / "main.py").write_text("code")
+        (assignment_dir / "data" / "answers.csv").write_text("1")
+        (assignment_dir / "sub" / "data" / "input.csv").write_text("2")
+        (assignment_dir / BLACK_LIST_FILE_NAME).write_text("^data/\n")
+
+        converter = PrimeConverter()
+        converter.convert(str(assignment_dir))
+
+        output_dir = assignment_dir / GENERATED_LOCATION_NAME / assignment_dir.name
+        assert (output_dir / "main.py").exists()
+        assert (output_dir / "sub" / "data" / "input.csv").exists()
+        assert not (output_dir / "data").exists()
+
+    def test_black_list_leading_slash(self, tmp_path):
+        """Patterns written for full paths (e.g. "/tests/") still match."""
+        assignment_dir = tmp_path / "assignment"
+        (assignment_dir / "tests").mkdir(parents=True)
+
+        (assignment_dir / "main.py").write_text("code")
+        (assignment_dir / "tests" / "test_hidden.py").write_text("assert True")
+        (assignment_dir / "key.py").write_text("answer = 42")
+        (assignment_dir / BLACK_LIST_FILE_NAME).write_text("/tests/\n/key\\.py$\n")
+
+        converter = PrimeConverter()
+        converter.convert(str(assignment_dir))
+
+        output_dir = assignment_dir / GENERATED_LOCATION_NAME / assignment_dir.name
+        assert (output_dir / "main.py").exists()
+        assert not (output_dir / "tests").exists()
+        assert not (output_dir / "key.py").exists()
+
     def test_nested_directories(self, tmp_path):
         """Nested directory structure is preserved."""
         assignment_dir = tmp_path / "assignment"
@@ -605,9 +777,385 @@ x = 1
         output_dir = assignment_dir / GENERATED_LOCATION_NAME / assignment_dir.name
         assert (output_dir / "src" / "module.py").exists()
 
+    def test_jobs_output_matches_serial(self, tmp_path):
+        """Converting files in parallel gives the same files and zip."""
+        assignment_dir = tmp_path / "assignment"
+        for folder in ("a", "b", "c"):
+            (assignment_dir / folder).mkdir(parents=True)
+            for i in range(4):
+                (assignment_dir / folder / f"m{i}.py").write_text(
+                    "# STUDENT_CODE_START\nx = 1\n# STUDENT_CODE_END\n"
+                )
+                (assignment_dir / folder / f"d{i}.png").write_bytes(
+                    b"\x89PNG\r\n\x1a\n"
+                )
+
+        outputs = []
+        for jobs in (1, 2):
+            PrimeConverter(jobs=jobs).convert(str(assignment_dir))
+
+            generated = assignment_dir / GENERATED_LOCATION_NAME
+            files = {
+                os.path.relpath(os.path.join(root, name), generated): open(
+                    os.path.join(root, name), "rb"
+                ).read()
+                for root, _, names in os.walk(generated)
+                for name in names
+                if not name.endswith(".zip")
+            }
+            with zipfile.ZipFile(generated / "assignment.zip") as zip_file:
+                outputs.append((files, zip_file.namelist()))
+
+        assert outputs[0] == outputs[1]
+
+    @pytest.mark.parametrize("encoding", ["utf-16", "utf-16-be"])
+    def test_utf16_answer_key_not_shipped(self, tmp_path, encoding):
+        """UTF-16 solution files are never copied into the student version."""
+        assignment_dir = tmp_path / "assignment"
+        assignment_dir.mkdir()
+        (assignment_dir / "sol.py").write_bytes(
+            "# KEY_ONLY_START\nsecret=42\n# KEY_ONLY_END\n".encode(encoding)
+        )
+
+        PrimeConverter().convert(str(assignment_dir))
+
+        generated = assignment_dir / GENERATED_LOCATION_NAME
+        assert not (generated / assignment_dir.name / "sol.py").exists()
+        with zipfile.ZipFile(generated / "assignment.zip") as zip_file:
+            assert "sol.py" not in zip_file.namelist()
+
+
+class TestIncrementalConversion:
+    """Tests for conversions reusing the outputs of the previous one."""
+
+    @pytest.fixture
+    def assignment(self, tmp_path):
+        """An assignment with a few files in nested folders."""
+        assignment_dir = tmp_path / "assignment"
+        (assignment_dir / "src" / "deep").mkdir(parents=True)
+        (assignment_dir / "main.py").write_text(
+            "# STUDENT_CODE_START\nx = 1\n# STUDENT_CODE_END\n"
+        )
+        (assignment_dir / "src" / "util.py").write_text("def util():\n    pass\n")
+        (assignment_dir / "src" / "deep" / "data.txt").write_text("data\n")
+
+        # Sources written long before the conversion are never hashed again
+        for root, _, names in os.walk(assignment_dir):
+            for name in names:
+                os.utime(os.path.join(root, name), ns=(0, 10**9))
+        return assignment_dir
+
+    def convert(self, assignment_dir, **kwargs):
+        """Converts the assignment, returning the names of the converted files."""
+        converter = PrimeConverter()
+        converted = []
+        convert_file = converter.file_converter.convert_file
+
+        def counting_convert_file(source_file_path, *args, **kwargs):
+            converted.append(os.path.basename(source_file_path))
+            return convert_file(source_file_path, *args, **kwargs)
+
+        converter.file_converter.convert_file = counting_convert_file
+        converter.convert(str(assignment_dir), **kwargs)
+        return sorted(converted)
+
+    def output_times(self, assignment_dir):
+        """The modification time of each generated file (but the manifest)."""
+        generated = assignment_dir / GENERATED_LOCATION_NAME
+        return {
+            os.path.relpath(os.path.join(root, name), generated): os.stat(
+                os.path.join(root, name)
+            ).st_mtime_ns
+            for root, _, names in os.walk(generated)
+            for name in names
+            if name != MANIFEST_FILE_NAME
+        }
+
+    def test_noop_rebuild_keeps_outputs(self, assignment):
+        """A second conversion converts nothing and rewrites nothing."""
+        assert self.convert(assignment) == ["data.txt", "main.py", "util.py"]
+        times = self.output_times(assignment)
+
+        assert self.convert(assignment) == []
+        assert self.output_times(assignment) == times
+
+    def test_changed_file_is_converted(self, assignment):
+        """Only the changed file is converted again, and the zip is updated."""
+        self.convert(assignment)
+        times = self.output_times(assignment)
+
+        (assignment / "src" / "util.py").write_text("def util():\n    return 1\n")
+
+        assert self.convert(assignment) == ["util.py"]
+        new_times = self.output_times(assignment)
+        output = os.path.join(assignment.name, "src", "util.py")
+        assert new_times.pop(output) != times.pop(output)
+        assert new_times.pop("assignment.zip") != times.pop("assignment.zip")
+        assert new_times == times
+
+    def test_deleted_file_output_is_removed(self, assignment):
+        """Outputs of deleted sources (and their emptied folders) are removed."""
+        self.convert(assignment)
+        output_dir = assignment / GENERATED_LOCATION_NAME / assignment.name
+
+        os.remove(assignment / "src" / "deep" / "data.txt")
+        os.rmdir(assignment / "src" / "deep")
+
+        assert self.convert(assignment) == []
+        assert not (output_dir / "src" / "deep").exists()
+        assert (output_dir / "src" / "util.py").exists()
+        with zipfile.ZipFile(
+            assignment / GENERATED_LOCATION_NAME / "assignment.zip"
+        ) as zip_file:
+            assert "src/deep/data.txt" not in zip_file.namelist()
+
+    def test_configuration_change_converts_everything(self, assignment):
+        """A new configuration (or clean=True) converts every file again."""
+        self.convert(assignment)
+
+        (assignment / OPTIONS_FILE_NAME).write_text("scrub all\n")
+        assert self.convert(assignment) == ["data.txt", "main.py", "util.py"]
+
+        assert self.convert(assignment, clean=True) == [
+            "data.txt",
+            "main.py",
+            "util.py",
+        ]
+
+    def test_failed_conversion_keeps_previous_version(self, assignment):
+        """A failed conversion leaves the previous student version untouched."""
+        self.convert(assignment)
+        times = self.output_times(assignment)
+
+        (assignment / "src" / "util.py").write_text("# STUDENT_CODE_START\n")
+        with pytest.raises(InvalidCodeBlockError):
+            self.convert(assignment)
+        wait_for_removals()
+
+        assert self.output_times(assignment) == times
+        assert sorted(os.listdir(assignment)) == [
+            GENERATED_LOCATION_NAME,
+            "main.py",
+            "src",
+        ]
+
+        (assignment / "src" / "util.py").write_text("pass\n")
+        assert self.convert(assignment) == ["util.py"]
+
+
+class TestStagedOutput:
+    """Tests for generating the student version in a staging folder."""
+
+    @pytest.fixture
+    def simple_assignment(self, tmp_path):
+        """An assignment with a converted file and a copied file."""
+        assignment_dir = tmp_path / "test_assignment"
+        assignment_dir.mkdir()
+        (assignment_dir / "main.py").write_text(
+            "# STUDENT_CODE_START\nx = 1\n# STUDENT_CODE_END\n"
+        )
+        (assignment_dir / "utils.py").write_text("def helper():\n    return 42\n")
+        return assignment_dir
+
+    def test_previous_version_is_replaced(self, simple_assignment):
+        """The previous student version is swapped out and removed."""
+        converter = PrimeConverter()
+        converter.convert(str(simple_assignment))
+        generated = simple_assignment / GENERATED_LOCATION_NAME
+        stale_file = generated / simple_assignment.name / "stale.txt"
+        stale_file.write_text("stale")
+
+        converter.convert(str(simple_assignment), clean=True)
+        wait_for_removals()
+
+        assert not stale_file.exists()
+        assert (generated / f"{simple_assignment.name}.zip").exists()
+        assert [
+            name for name in os.listdir(simple_assignment) if name.startswith(".")
+        ] == []
+
+    def test_incremental_outputs_are_not_shared(self, simple_assignment):
+        """Outputs converted again do not change the previous student version."""
+        converter = PrimeConverter()
+        converter.convert(str(simple_assignment))
+        output = (
+            simple_assignment
+            / GENERATED_LOCATION_NAME
+            / simple_assignment.name
+            / "utils.py"
+        )
+        previous = os.open(output, os.O_RDONLY)
+        try:
+            before = os.pread(previous, 1 << 16, 0)
+            (simple_assignment / "utils.py").write_text("changed = True\n")
+            converter.convert(str(simple_assignment))
+
+            # The previous output (still open) kept its contents
+            assert os.pread(previous, 1 << 16, 0) == before
+        finally:
+            os.close(previous)
+        assert output.read_text() == "changed = True\n"
+
+    def test_leftovers_are_not_converted(self, simple_assignment):
+        """Folders left by interrupted conversions are ignored, then removed."""
+        leftover = simple_assignment / f".{GENERATED_LOCATION_NAME}.staging-1234"
+        (leftover / "nested").mkdir(parents=True)
+        (leftover / "nested" / "file.py").write_text("x = 1\n")
+
+        PrimeConverter().convert(str(simple_assignment))
+        wait_for_removals()
+
+        assert not leftover.exists()
+        with zipfile.ZipFile(
+            simple_assignment
+            / GENERATED_LOCATION_NAME
+            / f"{simple_assignment.name}.zip"
+        ) as zip_file:
+            assert not any("staging" in name for name in zip_file.namelist())
+
+
+class TestOutputCacheConversion:
+    """Tests for sharing converted files between assignments."""
+
+    def test_vendored_package_converted_once(self, tmp_path):
+        """Files shared by two assignments are converted for the first one only."""
+        cache_dir = tmp_path / "cache"
+        assignments = []
+        for name in ("variant_a", "variant_b"):
+            assignment_dir = tmp_path / name
+            (assignment_dir / "mingpt").mkdir(parents=True)
+            (assignment_dir / "mingpt" / "model.py").write_text(
+                "# STUDENT_CODE_START\nlayers = 12\n# STUDENT_CODE_END\n"
+            )
+            (assignment_dir / "main.py").write_text(
+                f"# STUDENT_CODE_START\nname = '{name}'\n# STUDENT_CODE_END\n"
+            )
+            (assignment_dir / OPTIONS_FILE_NAME).write_text(
+                f"output_cache {cache_dir}\n"
+            )
+            assignments.append(assignment_dir)
+
+        converter = PrimeConverter()
+        converted = []
+        convert_text_file = converter.file_converter._convert_text_file
+
+        def counting_convert(source_file_path, destination_file_path):
+            converted.append(os.path.relpath(source_file_path, tmp_path))
+            convert_text_file(source_file_path, destination_file_path)
+
+        converter.file_converter._convert_text_file = counting_convert
+        for assignment_dir in assignments:
+            converter.convert(str(assignment_dir))
+
+        assert sorted(converted) == [
+            os.path.join("variant_a", "main.py"),
+            os.path.join("variant_a", "mingpt", "model.py"),
+            os.path.join("variant_b", "main.py"),
+        ]
+        outputs = [
+            (
+                assignment_dir
+                / GENERATED_LOCATION_NAME
+                / assignment_dir.name
+                / "mingpt"
+                / "model.py"
+            ).read_text()
+            for assignment_dir in assignments
+        ]
+        assert outputs[0] == outputs[1]
+        assert "layers = 12" not in outputs[1]
+
+
+class TestPlan:
+    """Tests for planning a conversion without running it."""
+
+    @pytest.fixture
+    def assignment(self, tmp_path):
+        """An assignment with a black listed dataset."""
+        assignment_dir = tmp_path / "assignment"
+        (assignment_dir / "data").mkdir(parents=True)
+        (assignment_dir / "main.py").write_text(
+            "# STUDENT_CODE_START\nx = 1\n# STUDENT_CODE_END\n"
+        )
+        (assignment_dir / "README.md").write_text("# Assignment\n")
+        (assignment_dir / "data" / "train.csv").write_text("a,b\n" * 100)
+        (assignment_dir / BLACK_LIST_FILE_NAME).write_text("^data/\n")
+
+        for root, _, names in os.walk(assignment_dir):
+            for name in names:
+                os.utime(os.path.join(root, name), ns=(0, 10**9))
+        return assignment_dir
+
+    def actions(self, plan):
+        """The action of each path of a plan."""
+        return {
+            entry["path"]: entry["action"] for entry in plan["files"] + plan["excluded"]
+        }
+
+    def test_plan_writes_nothing(self, assignment):
+        """Planning lists every file without creating the student version."""
+        plan = PrimeConverter().plan(str(assignment))
+
+        assert not (assignment / GENERATED_LOCATION_NAME).exists()
+        assert plan["incremental"] is False
+        assert self.actions(plan) == {
+            "main.py": "convert",
+            "README.md": "copy",
+            "data": "exclude",
+            BLACK_LIST_FILE_NAME: "exclude",
+        }
+        assert plan["totals"]["regions"] == 1
+        assert plan["totals"]["bytes_read"] == sum(
+            (assignment / name).stat().st_size for name in ("main.py", "README.md")
+        )
+
+    def test_plan_matches_conversion(self, assignment):
+        """The planned sizes are those of the student version and its zip."""
+        plan = PrimeConverter().plan(str(assignment))
+        PrimeConverter().convert(str(assignment))
+
+        student_root = assignment / GENERATED_LOCATION_NAME / assignment.name
+        assert plan["totals"]["output_bytes"] == sum(
+            (student_root / name).stat().st_size for name in ("main.py", "README.md")
+        )
+        zip_path = assignment / GENERATED_LOCATION_NAME / f"{assignment.name}.zip"
+        assert plan["totals"]["zip_bytes"] == zip_path.stat().st_size
+
+    def test_plan_reuses_previous_conversion(self, assignment):
+        """After a conversion, unchanged files are reused and deleted ones removed."""
+        PrimeConverter().convert(str(assignment))
+        wait_for_removals()
+        (assignment / "README.md").unlink()
+        (assignment / "notes.txt").write_text("notes\n")
+
+        plan = PrimeConverter().plan(str(assignment))
+
+        assert plan["incremental"] is True
+        assert self.actions(plan) == {
+            "main.py": "reuse",
+            "notes.txt": "copy",
+            "README.md": "remove",
+            "data": "exclude",
+            BLACK_LIST_FILE_NAME: "exclude",
+        }
+        assert plan["totals"]["bytes_read"] == len("notes\n")
+
+        clean_plan = PrimeConverter().plan(str(assignment), clean=True)
+        assert "reuse" not in clean_plan["totals"]["actions"]
+
+    def test_plan_of_a_file(self, tmp_path):
+        """A single file has a plan, but no zip file."""
+        source = tmp_path / "main.py"
+        source.write_text("x = 1  # MASK_ASSIGNMENT\n")
+
+        plan = PrimeConverter().plan(str(source))
+
+        assert self.actions(plan) == {"main.py": "convert"}
+        assert plan["totals"]["zip_bytes"] is None
+
 
-class TestPrepareGenerationLocation:
-    """Tests for _prepare_generation_location method."""
+class TestGenerationLocation:
+    """Tests for _generation_location method."""
 
     def test_file_generation_location(self, tmp_path):
         """Generation location for file is in same directory."""
@@ -615,11 +1163,10 @@ class TestPrepareGenerationLocation:
         test_file.write_text("code")
 
         converter = PrimeConverter()
-        location = converter._prepare_generation_location(str(test_file))
+        location = converter._generation_location(str(test_file))
 
         expected = tmp_path / GENERATED_LOCATION_NAME
         assert location == str(expected)
-        assert expected.exists()
 
     def test_directory_generation_location(self, tmp_path):
         """Generation location for directory is inside directory."""
@@ -627,17 +1174,16 @@ class TestPrepareGenerationLocation:
         test_dir.mkdir()
 
         converter = PrimeConverter()
-        location = converter._prepare_generation_location(str(test_dir))
+        location = converter._generation_location(str(test_dir))
 
         expected = test_dir / GENERATED_LOCATION_NAME
         assert location == str(expected)
-        assert expected.exists()
 
     def test_nonexistent_path_raises(self, tmp_path):
         """Non-existent path raises ValueError."""
         converter = PrimeConverter()
 
         with pytest.raises(ValueError) as exc_info:
-            converter._prepare_generation_location(str(tmp_path / "nonexistent"))
+            converter._generation_location(str(tmp_path / "nonexistent"))
 
         assert "does not exist" in str(exc_info.value)
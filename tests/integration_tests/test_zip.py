@@ -6,8 +6,8 @@ import zipfile
 
 import pytest
 
-from pact.zip.zip_assignment import zip_assignment_dir
-from pact.zip.zip_submission import create_submission_file
+from pact.zip.zip_assignment import predicted_zip_size, zip_assignment_dir
+from pact.zip.zip_submission import create_submission_file, submission_file_contents
 
 
 class TestZipAssignmentDir:
@@ -112,6 +112,37 @@ class TestZipAssignmentDir:
         assert "print('hello')" in content
 
 
+class TestPredictedZipSize:
+    """Tests for predicted_zip_size function."""
+
+    def test_matches_written_zip(self, tmp_path):
+        """The predicted size is the size of the zip file written."""
+        dir_path = tmp_path / "assignment"
+        (dir_path / "data" / "nested").mkdir(parents=True)
+        (dir_path / "main.py").write_text("print('hello')\n")
+        (dir_path / "data" / "nested" / "résumé.txt").write_text("é" * 100)
+        (dir_path / "empty.txt").write_text("")
+        (dir_path / "blob.bin").write_bytes(os.urandom(70000))
+
+        zip_assignment_dir(str(dir_path))
+
+        members = [
+            ("main.py", 15),
+            ("data/nested/résumé.txt", 200),
+            ("empty.txt", 0),
+            ("blob.bin", 70000),
+        ]
+        zip_path = tmp_path / "assignment.zip"
+        assert predicted_zip_size(members) == zip_path.stat().st_size
+
+    def test_empty_zip(self, tmp_path):
+        """An empty zip file is only its end record."""
+        (tmp_path / "assignment").mkdir()
+        zip_assignment_dir(str(tmp_path / "assignment"))
+
+        assert predicted_zip_size([]) == (tmp_path / "assignment.zip").stat().st_size
+
+
 class TestCreateSubmissionFile:
     """Tests for create_submission_file function."""
 
@@ -195,3 +226,10 @@ class TestCreateSubmissionFile:
         new_content = submission_file.read_text()
         assert "old content" not in new_content
         assert "new.py" in new_content
+
+    def test_contents_match_file(self, tmp_path):
+        """submission_file_contents returns the contents of the file written."""
+        create_submission_file(str(tmp_path), sub_list=["main.py"])
+
+        submission_file = tmp_path / "create_submission_zip.py"
+        assert submission_file.read_text() == submission_file_contents(["main.py"])
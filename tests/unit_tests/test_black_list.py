@@ -0,0 +1,102 @@
+"""Unit tests for BlackListMatcher."""
+
+from __future__ import annotations
+
+import re
+
+import pytest
+
+from pact.convert.utils.black_list import BlackListMatcher
+from pact.convert.utils.prime_converter import DEFAULT_BLACK_LIST
+
+PATHS = [
+    "main.py",
+    "src/module.py",
+    "prevention.py",
+    "environment.yml",
+    "venv",
+    "venv/lib/site-packages/x.py",
+    "src/env",
+    "src/env/",
+    "envy/x.py",
+    "docs/build",
+    "docs/build/index.html",
+    "rebuild/x.py",
+    "Thumbs.db",
+    "img/Thumbs.db",
+    "img/Thumbs.dbx",
+    "MANIFEST",
+    "MANIFEST.in",
+    "notes/.DS_Store",
+    "nb/.ipynb_checkpoints/a-checkpoint.ipynb",
+    "pkg/__pycache__/m.cpython-311.pyc",
+    "pkg/ext.so",
+    "pkg/ext.so.1",
+    "pact.egg-info/PKG-INFO",
+    "pact.egg",
+    ".coverage",
+    ".coverage.host.12",
+    "coverage.xml",
+    "data/coverage.xml.bak",
+    ".dmypy.json",
+    "pip-log.txt",
+]
+
+
+def test_default_black_list_equivalent_to_re_search():
+    """The compiled default black list matches exactly what re.search does."""
+    matcher = BlackListMatcher(DEFAULT_BLACK_LIST)
+
+    for path in PATHS:
+        expected = any(re.search(pattern, path) for pattern in DEFAULT_BLACK_LIST)
+        assert matcher.matches(path) is expected, path
+
+
+def test_fast_paths():
+    """Literal name and component patterns become set lookups."""
+    matcher = BlackListMatcher(
+        [r"(^|/)Thumbs\.db$", r"(^|/)\.venv($|/)", r"\.py[cod]$"]
+    )
+
+    assert matcher.names == {"Thumbs.db"}
+    assert matcher.components == {".venv"}
+    assert matcher.regex.pattern == r"(?:\.py[cod]$)"
+
+
+@pytest.mark.parametrize(
+    "patterns, path, expected",
+    [
+        ([r"(a)\1", r"x"], "data/aa.txt", True),
+        ([r"(a)\1", r"x"], "data/ab.md", False),
+        ([r"(?i)secret", r"(?P<n>q)(?P=n)"], "SECRET.md", True),
+        ([r"(?i)secret", r"(?P<n>q)(?P=n)"], "qq.md", True),
+        ([r"hidden_.*", r"(?P<n>q)", r"(?P<n>z)"], "z", True),
+    ],
+)
+def test_patterns_that_cannot_be_combined(patterns, path, expected):
+    """Backreferences, group names and global flags are searched separately."""
+    assert BlackListMatcher(patterns).matches(path) is expected
+
+
+@pytest.mark.parametrize(
+    "patterns, path, expected",
+    [
+        (["/tests/"], "tests/test_a.py", True),
+        (["/tests/"], "src/tests/test_a.py", True),
+        (["/tests/"], "mytests/test_a.py", False),
+        (["/key\\.py$"], "key.py", True),
+        (["^data/"], "data/x.csv", True),
+        (["^data/"], "sub/data/x.csv", False),
+        ([r"(a)\1/", "/tests/"], "aa/x.py", True),
+        ([r"(?i)/SECRET/"], "secret/x.py", True),
+    ],
+)
+def test_leading_slash_patterns(patterns, path, expected):
+    """Patterns with a "/" also match after the root, as on full paths."""
+    assert BlackListMatcher(patterns).matches(path) is expected
+
+
+def test_invalid_pattern():
+    """Invalid patterns raise a ValueError."""
+    with pytest.raises(ValueError, match="Invalid black list pattern"):
+        BlackListMatcher(["*.pyc"])
@@ -0,0 +1,126 @@
+"""Unit tests for BuildManifest."""
+
+from __future__ import annotations
+
+import hashlib
+import os
+
+import pytest
+
+from pact.convert.utils.build_manifest import (
+    HASH_CHUNK_SIZE,
+    MANIFEST_FILE_NAME,
+    BuildManifest,
+    configuration_fingerprint,
+    file_hash,
+)
+from pact.convert.utils.trigger_table import TriggerTable
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    """An empty manifest in a generation location."""
+    (tmp_path / "out").mkdir()
+    return BuildManifest(str(tmp_path / "out" / MANIFEST_FILE_NAME), "fingerprint")
+
+
+@pytest.fixture
+def recorded(tmp_path, manifest):
+    """A manifest recording one converted file, written long before the build."""
+    source = tmp_path / "main.py"
+    source.write_text("x = 1\n")
+    output = tmp_path / "out" / "main.py"
+    output.write_text("x = ...\n")
+    os.utime(source, ns=(0, 10**9))
+
+    manifest.record("main.py", str(source), str(output))
+    return manifest, str(source), str(output)
+
+
+def test_unchanged_file_is_current(recorded):
+    """A file with the same size and time is current."""
+    manifest, source, output = recorded
+
+    assert manifest.files["main.py"]["racy"] is False
+    assert manifest.is_current("main.py", source, output)
+
+
+def test_changed_file_is_not_current(recorded):
+    """A file with new contents is converted again."""
+    manifest, source, output = recorded
+    with open(source, "w") as file:
+        file.write("x = 2\n")
+    os.utime(source, ns=(0, 10**9))
+
+    # Same size and time: only a racy entry would notice, so make it racy
+    assert manifest.is_current("main.py", source, output)
+    manifest.files["main.py"]["racy"] = True
+    assert not manifest.is_current("main.py", source, output)
+
+
+def test_touched_file_is_current(recorded):
+    """A file whose time changed but not its contents is current (by hash)."""
+    manifest, source, output = recorded
+    os.utime(source, ns=(0, 2 * 10**9))
+
+    assert manifest.is_current("main.py", source, output)
+    assert manifest.files["main.py"]["mtime_ns"] == 2 * 10**9
+
+
+def test_changed_output_is_not_current(recorded):
+    """A modified or removed output is written again."""
+    manifest, source, output = recorded
+
+    with open(output, "a") as file:
+        file.write("# edited\n")
+    assert not manifest.is_current("main.py", source, output)
+
+    os.remove(output)
+    assert not manifest.is_current("main.py", source, output)
+
+
+def test_recently_modified_file_is_racy(tmp_path, manifest):
+    """Files modified around the start of the conversion are hashed next time."""
+    source = tmp_path / "main.py"
+    source.write_text("x = 1\n")
+
+    manifest.record("main.py", str(source), str(tmp_path / "out" / "main.py"))
+
+    assert manifest.files["main.py"]["racy"] is True
+    assert manifest.files["main.py"]["output_size"] is None
+    assert manifest.is_current(
+        "main.py", str(source), str(tmp_path / "out" / "main.py")
+    )
+
+
+def test_save_and_load(recorded):
+    """A saved manifest is loaded back only with the same fingerprint."""
+    manifest, _, output = recorded
+    manifest.folders = ["assn"]
+    manifest.save()
+
+    loaded = BuildManifest.load(manifest.manifest_path, "fingerprint")
+    assert loaded.files == manifest.files
+    assert loaded.folders == ["assn"]
+    assert loaded.output_path("main.py") == output
+    assert BuildManifest.load(manifest.manifest_path, "other") is None
+
+
+def test_configuration_fingerprint(codeblock_types, mask_types):
+    """The fingerprint changes with the black list and the options."""
+    table = TriggerTable(codeblock_types, mask_types, "ANSWER_KEY_CELL")
+
+    fingerprint = configuration_fingerprint(table, ["a"], ["scrub all"])
+    assert fingerprint == configuration_fingerprint(table, ["a"], ["scrub all"])
+    assert fingerprint != configuration_fingerprint(table, ["a"], [])
+    assert fingerprint != configuration_fingerprint(table, [], ["a", "scrub all"])
+
+
+def test_file_hash_without_file_digest(tmp_path, monkeypatch):
+    """Hashing works on Pythons without hashlib.file_digest (before 3.11)."""
+    monkeypatch.delattr(hashlib, "file_digest", raising=False)
+    source = tmp_path / "data.bin"
+    data = os.urandom(HASH_CHUNK_SIZE) + b"tail"
+    source.write_bytes(data)
+
+    assert file_hash(str(source)) == hashlib.sha256(data).hexdigest()
@@ -0,0 +1,67 @@
+"""Unit tests for CellCache."""
+
+from __future__ import annotations
+
+import os
+
+import pytest
+
+from pact.convert.utils.cell_cache import (
+    CACHE_DIR_ENV,
+    CellCache,
+    cell_key,
+    default_cache_dir,
+)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    """A cache in a temporary folder."""
+    return CellCache(str(tmp_path / "cache"))
+
+
+def test_round_trip(cache):
+    """Saved entries are loaded back for the same fingerprint only."""
+    entries = {cell_key(["a\n"]): ["b\n"], cell_key(["x"]): None}
+    cache.save("notebook.ipynb", "abc", entries)
+
+    assert cache.load("notebook.ipynb", "abc") == entries
+    assert cache.load("notebook.ipynb", "other") == {}
+    assert cache.load("other.ipynb", "abc") == {}
+
+
+def test_unreadable_cache_file(cache):
+    """Corrupt cache files give no entries."""
+    cache.save("notebook.ipynb", "abc", {"key": ["line"]})
+    (cache_file,) = os.listdir(cache.cache_dir)
+    with open(os.path.join(cache.cache_dir, cache_file), "w") as file:
+        file.write("{not json")
+
+    assert cache.load("notebook.ipynb", "abc") == {}
+
+
+def test_cell_key_depends_on_lines():
+    """Sources with the same text but other lines have other keys."""
+    assert cell_key(["a\n", "b"]) != cell_key(["a\nb"])
+    assert cell_key(["a\n", "b"]) == cell_key(["a\n", "b"])
+
+
+def test_from_options(tmp_path, monkeypatch):
+    """The option enables the cache, in the default or a given folder."""
+    monkeypatch.setenv(CACHE_DIR_ENV, str(tmp_path))
+
+    assert CellCache.from_options(["scrub all"]) is None
+    assert CellCache.from_options(["cell_cache"]).cache_dir == os.path.join(
+        str(tmp_path), "cells"
+    )
+    assert CellCache.from_options(["cell_cache /tmp/my cache"]).cache_dir == (
+        "/tmp/my cache"
+    )
+
+
+def test_default_cache_dir(tmp_path, monkeypatch):
+    """The cache folder follows XDG_CACHE_HOME unless PACT_CACHE_DIR is set."""
+    monkeypatch.delenv(CACHE_DIR_ENV, raising=False)
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+
+    assert default_cache_dir() == os.path.join(str(tmp_path), "pact")
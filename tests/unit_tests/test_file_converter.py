@@ -1,7 +1,28 @@
 """Unit tests for FileConverter."""
 from __future__ import annotations
 
+import io
 import json
+import locale
+import os
+
+import pytest
+
+from pact.convert.utils import file_converter as file_converter_module
+from pact.convert.utils.cell_cache import CellCache
+from pact.convert.utils.codeblock_infra import CodeBlockType, InvalidCodeBlockError
+from pact.convert.utils.file_converter import (
+    PLAN_CONVERT,
+    PLAN_COPY,
+    PLAN_ERROR,
+    PLAN_SKIP,
+    PLAN_UNREADABLE,
+    FileConverter,
+    iter_line_chunks,
+    parallel_cells_from_options,
+)
+from pact.convert.utils.notebook_scrub import ScrubPolicy
+from pact.convert.utils.output_cache import OutputCache
 
 
 class TestConvertIpynbCellSourceShapes:
@@ -107,3 +128,678 @@ class TestConvertIpynbCellSourceShapes:
         assert len(converted["cells"]) == 1
         assert "secret_answer" not in all_source
         assert "keep_me = 1" in all_source
+
+
+class TestConvertIpynbCellFiltering:
+    """Excluded cells are dropped and outputs cleared in a single pass."""
+
+    def test_cells_kept_in_order(self, tmp_path, file_converter):
+        """Kept cells keep their order, metadata and cleared outputs."""
+        cells = []
+        for i in range(30):
+            source = [f"value_{i} = {i}\n"]
+            if i % 4 == 0:
+                source.insert(0, "# ANSWER_KEY_CELL\n")
+            cells.append(
+                {
+                    "cell_type": "code" if i % 2 else "markdown",
+                    "metadata": {"index": i},
+                    "execution_count": i,
+                    "outputs": [{"output_type": "stream", "text": [f"{i}\n"]}],
+                    "source": source,
+                }
+            )
+        nb_path = tmp_path / "notebook.ipynb"
+        nb_path.write_text(json.dumps({"cells": cells, "metadata": {}, "nbformat": 4}))
+
+        file_converter.convert_file(str(nb_path), str(tmp_path / "out"))
+
+        converted = json.loads((tmp_path / "out" / "notebook.ipynb").read_text())
+        kept = [i for i in range(30) if i % 4]
+        assert [cell["metadata"]["index"] for cell in converted["cells"]] == kept
+        for cell in converted["cells"]:
+            if cell["cell_type"] == "code":
+                assert cell["outputs"] == []
+                assert cell["execution_count"] is None
+            else:
+                assert cell["outputs"] != []
+
+    def test_identical_cells(self, tmp_path, file_converter):
+        """Identical cells are each kept."""
+        cell = {"cell_type": "markdown", "metadata": {}, "source": ["same\n"]}
+        nb_path = tmp_path / "notebook.ipynb"
+        nb_path.write_text(
+            json.dumps({"cells": [cell, cell, cell], "metadata": {}, "nbformat": 4})
+        )
+
+        file_converter.convert_file(str(nb_path), str(tmp_path / "out"))
+
+        converted = json.loads((tmp_path / "out" / "notebook.ipynb").read_text())
+        assert converted["cells"] == [cell, cell, cell]
+
+    def test_scrub_policy(self, tmp_path, file_converter):
+        """Attachments whose reference was removed by a codeblock are dropped."""
+        cell = {
+            "cell_type": "markdown",
+            "metadata": {"ExecuteTime": {"end_time": "x"}},
+            "attachments": {
+                "shown.png": {"image/png": "AAAA"},
+                "answer.png": {"image/png": "BBBB"},
+            },
+            "source": [
+                "![shown](attachment:shown.png)\n",
+                "# KEY_ONLY_START\n",
+                "![answer](attachment:answer.png)\n",
+                "# KEY_ONLY_END\n",
+            ],
+        }
+        notebook = {"cells": [cell], "metadata": {"widgets": {"state": {}}}}
+        nb_path = tmp_path / "notebook.ipynb"
+        nb_path.write_text(json.dumps(notebook))
+
+        file_converter.scrub_policy = ScrubPolicy.from_options(["scrub all"])
+        file_converter.convert_file(str(nb_path), str(tmp_path / "out"))
+
+        converted = json.loads((tmp_path / "out" / "notebook.ipynb").read_text())
+        assert converted["metadata"] == {}
+        assert converted["cells"][0]["metadata"] == {}
+        assert list(converted["cells"][0]["attachments"]) == ["shown.png"]
+
+
+class TestCellCache:
+    """Converted cells are cached on disk by source hash."""
+
+    @staticmethod
+    def write_notebook(nb_path, sources):
+        cells = [
+            {"cell_type": "code", "metadata": {}, "outputs": [], "source": source}
+            for source in sources
+        ]
+        nb_path.write_text(json.dumps({"cells": cells, "metadata": {}}))
+
+    def test_unchanged_cells_not_converted(
+        self, tmp_path, file_converter, monkeypatch
+    ):
+        """Only edited cells are converted again, with the same output."""
+        sources = [
+            f"x_{i} = {i}  # MASK_ASSIGNMENT\n\n# KEY_ONLY_START\nsecret\n"
+            "# KEY_ONLY_END\n"
+            for i in range(10)
+        ] + ["# ANSWER_KEY_CELL\nanswer\n"]
+        nb_path = tmp_path / "notebook.ipynb"
+        self.write_notebook(nb_path, sources)
+        expected = file_converter._convert_ipynb_file(str(nb_path))
+
+        file_converter.cell_cache = CellCache(str(tmp_path / "cache"))
+        converted = []
+        convert_cell_source = file_converter._convert_cell_source
+
+        def counting_convert(source_lines):
+            converted.append(source_lines)
+            return convert_cell_source(source_lines)
+
+        monkeypatch.setattr(file_converter, "_convert_cell_source", counting_convert)
+
+        assert file_converter._convert_ipynb_file(str(nb_path)) == expected
+        assert len(converted) == 11
+
+        converted.clear()
+        assert file_converter._convert_ipynb_file(str(nb_path)) == expected
+        assert converted == []
+
+        sources[3] = "edited = 3\n"
+        self.write_notebook(nb_path, sources)
+        file_converter._convert_ipynb_file(str(nb_path))
+        assert converted == [["edited = 3\n"]]
+
+    def test_other_configuration_not_reused(self, tmp_path, file_converter):
+        """Cached cells are only used with the same trigger configuration."""
+        nb_path = tmp_path / "notebook.ipynb"
+        self.write_notebook(nb_path, ["value = 1  # MASK_ASSIGNMENT\n"])
+        cache = CellCache(str(tmp_path / "cache"))
+
+        file_converter.cell_cache = cache
+        file_converter._convert_ipynb_file(str(nb_path))
+
+        other_converter = FileConverter(codeblock_types=[], mask_types=[])
+        other_converter.cell_cache = cache
+        converted = json.loads(other_converter._convert_ipynb_file(str(nb_path)))
+        assert converted["cells"][0]["source"] == ["value = 1  # MASK_ASSIGNMENT\n"]
+
+
+class TestOutputCache:
+    """Outputs of identical files are reused from the output cache."""
+
+    @pytest.fixture
+    def converted(self):
+        """The names of the text files converted by counted_converter."""
+        return []
+
+    @pytest.fixture
+    def counted_converter(self, tmp_path, file_converter, monkeypatch, converted):
+        """A converter with an output cache, recording the converted files."""
+        file_converter.output_cache = OutputCache(str(tmp_path / "cache"))
+        convert_text_file = file_converter._convert_text_file
+
+        def counting_convert(source_file_path, destination_file_path):
+            converted.append(os.path.basename(source_file_path))
+            convert_text_file(source_file_path, destination_file_path)
+
+        monkeypatch.setattr(file_converter, "_convert_text_file", counting_convert)
+        return file_converter
+
+    def test_identical_file_reused(self, tmp_path, counted_converter, converted):
+        """A file with the contents of a converted file is not converted."""
+        source = "x = 1  # MASK_ASSIGNMENT\n"
+        (tmp_path / "a.py").write_text(source)
+        (tmp_path / "b.py").write_text(source)
+
+        counted_converter.convert_file(str(tmp_path / "a.py"), str(tmp_path / "out"))
+        counted_converter.convert_file(str(tmp_path / "b.py"), str(tmp_path / "out"))
+
+        assert converted == ["a.py"]
+        assert (tmp_path / "out" / "b.py").read_text() == (
+            tmp_path / "out" / "a.py"
+        ).read_text()
+
+    def test_other_configuration_not_reused(
+        self, tmp_path, counted_converter, converted
+    ):
+        """Outputs are only reused with the same conversion settings."""
+        (tmp_path / "a.py").write_text("x = 1  # MASK_ASSIGNMENT\n")
+
+        counted_converter.convert_file(str(tmp_path / "a.py"), str(tmp_path / "out"))
+        counted_converter.byte_engine = True
+        counted_converter.convert_file(str(tmp_path / "a.py"), str(tmp_path / "out"))
+
+        assert converted == ["a.py", "a.py"]
+
+    def test_copied_files_not_cached(self, tmp_path, counted_converter):
+        """Files of the copy handler are not stored in the cache."""
+        counted_converter.handler_registry.register_extension(".csv", "copy")
+        (tmp_path / "data.csv").write_text("a,b\n")
+
+        counted_converter.convert_file(
+            str(tmp_path / "data.csv"), str(tmp_path / "out")
+        )
+
+        assert not os.path.exists(counted_converter.output_cache.cache_dir)
+
+    def test_text_files_without_triggers_not_cached(
+        self, tmp_path, counted_converter, converted
+    ):
+        """Text files without triggers are copied, not stored in the cache."""
+        (tmp_path / "data.txt").write_text("a,b\n")
+
+        counted_converter.convert_file(
+            str(tmp_path / "data.txt"), str(tmp_path / "out")
+        )
+
+        assert converted == []
+        assert (tmp_path / "out" / "data.txt").read_text() == "a,b\n"
+        assert not os.path.exists(counted_converter.output_cache.cache_dir)
+
+    def test_other_locale_encoding_not_reused(
+        self, tmp_path, counted_converter, converted, monkeypatch
+    ):
+        """Outputs of the text engine are only reused with the same encoding."""
+        (tmp_path / "a.py").write_text("x = 1  # MASK_ASSIGNMENT\n")
+
+        counted_converter.convert_file(str(tmp_path / "a.py"), str(tmp_path / "out"))
+        monkeypatch.setattr(
+            locale, "getpreferredencoding", lambda do_setlocale=True: "cp1252"
+        )
+        counted_converter.convert_file(str(tmp_path / "a.py"), str(tmp_path / "out"))
+
+        assert converted == ["a.py", "a.py"]
+
+
+class TestPlanFile:
+    """FileConverter.plan_file predicts a conversion without writing anything."""
+
+    TEXT = (
+        "import os\n"
+        "# STUDENT_CODE_START\n"
+        "secret = 'é'\n"
+        "# STUDENT_CODE_END\n"
+        "x = compute()  # MASK_ASSIGNMENT\n"
+    )
+
+    @pytest.mark.parametrize("byte_engine", [False, True])
+    def test_text_file(self, tmp_path, codeblock_types, mask_types, byte_engine):
+        """The planned size is the size of the converted file."""
+        converter = FileConverter(
+            codeblock_types=codeblock_types,
+            mask_types=mask_types,
+            byte_engine=byte_engine,
+        )
+        source = tmp_path / "main.py"
+        source.write_text(self.TEXT)
+
+        plan = converter.plan_file(str(source))
+        assert os.listdir(tmp_path) == ["main.py"]
+
+        converter.convert_file(str(source), str(tmp_path / "out"))
+        assert plan == {
+            "action": PLAN_CONVERT,
+            "handler": "text",
+            "bytes_read": source.stat().st_size,
+            "bytes_written": (tmp_path / "out" / "main.py").stat().st_size,
+            "regions": 2,
+        }
+
+    def test_notebook(self, tmp_path, file_converter):
+        """The planned size of a notebook is the size of the converted notebook."""
+        notebook = {
+            "cells": [
+                {
+                    "cell_type": "code",
+                    "metadata": {},
+                    "execution_count": 3,
+                    "outputs": [{"output_type": "stream", "text": "x" * 1000}],
+                    "source": ["x = 1  # MASK_ASSIGNMENT\n", "y = 2\n"],
+                },
+                {"cell_type": "markdown", "metadata": {}, "source": "Text"},
+            ],
+            "metadata": {},
+            "nbformat": 4,
+            "nbformat_minor": 5,
+        }
+        source = tmp_path / "nb.ipynb"
+        source.write_text(json.dumps(notebook))
+
+        plan = file_converter.plan_file(str(source))
+        file_converter.convert_file(str(source), str(tmp_path / "out"))
+
+        assert plan["action"] == PLAN_CONVERT
+        assert plan["regions"] == 1
+        assert plan["bytes_written"] == (tmp_path / "out" / "nb.ipynb").stat().st_size
+
+    def test_copied_and_skipped_files(self, tmp_path, file_converter):
+        """Files without triggers are copied, skipped files write nothing."""
+        file_converter.handler_registry.register_extension(".log", "skip")
+        (tmp_path / "notes.txt").write_text("no triggers\n")
+        (tmp_path / "run.log").write_text("log\n")
+
+        copied = file_converter.plan_file(str(tmp_path / "notes.txt"))
+        skipped = file_converter.plan_file(str(tmp_path / "run.log"))
+
+        assert (copied["action"], copied["bytes_written"]) == (PLAN_COPY, 12)
+        assert (skipped["action"], skipped["bytes_written"]) == (PLAN_SKIP, 0)
+
+    def test_failures(self, tmp_path, file_converter):
+        """Undecodable files and invalid triggers are reported, not raised."""
+        (tmp_path / "latin1.py").write_bytes(b"x = '\xe9'  # MASK_ASSIGNMENT\n")
+        (tmp_path / "open.py").write_text("# STUDENT_CODE_START\nx = 1\n")
+
+        unreadable = file_converter.plan_file(str(tmp_path / "latin1.py"))
+        invalid = file_converter.plan_file(str(tmp_path / "open.py"))
+
+        assert unreadable["action"] == PLAN_UNREADABLE
+        assert invalid["action"] == PLAN_ERROR
+        assert "error" in invalid
+
+
+class TestParallelCells:
+    """Cells of large notebooks can be converted in a worker pool."""
+
+    @staticmethod
+    def write_notebook(nb_path, sources):
+        cells = [
+            {"cell_type": "code", "metadata": {}, "outputs": [], "source": source}
+            for source in sources
+        ]
+        nb_path.write_text(json.dumps({"cells": cells, "metadata": {}}))
+
+    @pytest.fixture
+    def parallel_converter(self, codeblock_types, mask_types):
+        """A converter using two workers for any number of cells."""
+        converter = FileConverter(codeblock_types, mask_types)
+        converter.cell_workers = 2
+        converter.parallel_cell_threshold = 1
+        return converter
+
+    def test_same_output_in_cell_order(
+        self, tmp_path, file_converter, parallel_converter
+    ):
+        """The pool gives the same notebook as a serial conversion."""
+        sources = []
+        for i in range(40):
+            if i % 3 == 0:
+                sources.append(f"plain_{i} = {i}\n")
+            elif i % 3 == 1:
+                sources.append(f"# KEY_ONLY_START\nsecret_{i}\n# KEY_ONLY_END\n")
+            else:
+                sources.append(f"# ANSWER_KEY_CELL\nanswer_{i}\n")
+        nb_path = tmp_path / "notebook.ipynb"
+        self.write_notebook(nb_path, sources)
+
+        assert parallel_converter._convert_ipynb_file(
+            str(nb_path)
+        ) == file_converter._convert_ipynb_file(str(nb_path))
+
+    def test_same_error_with_cell_index(
+        self, tmp_path, file_converter, parallel_converter
+    ):
+        """Errors name the first failing cell, with or without the pool."""
+        sources = ["# KEY_ONLY_START\nok\n# KEY_ONLY_END\n"] * 20
+        sources[7] = "# KEY_ONLY_START\nnever closed\n"
+        sources[12] = "x = 1  # MASK_ASSIGNMENT\n# KEY_ONLY_START\n"
+        nb_path = tmp_path / "notebook.ipynb"
+        self.write_notebook(nb_path, sources)
+
+        errors = []
+        for converter in (file_converter, parallel_converter):
+            with pytest.raises(InvalidCodeBlockError) as exc_info:
+                converter._convert_ipynb_file(str(nb_path))
+            errors.append(exc_info.value)
+
+        assert str(errors[0]) == str(errors[1])
+        assert str(errors[0]).startswith("Cell 7: ")
+        assert errors[0].cell_index == errors[1].cell_index == 7
+
+    def test_value_error_with_cell_index(self, tmp_path, file_converter):
+        """Engine errors (ValueError) also name the failing cell."""
+        sources = ["a = 1\n", "x = 1  # MASK_ASSIGNMENT\n# KEY_ONLY_START\n"]
+        nb_path = tmp_path / "notebook.ipynb"
+        self.write_notebook(nb_path, sources)
+
+        with pytest.raises(ValueError, match="^Cell 1: "):
+            file_converter._convert_ipynb_file(str(nb_path))
+
+    @pytest.mark.parametrize(
+        "options, expected",
+        [
+            ([], (1, 1000)),
+            (["parallel_cells 50"], (None, 50)),
+            (["parallel_cells"], (None, 1000)),
+        ],
+    )
+    def test_options(self, monkeypatch, options, expected):
+        """The option enables one worker per CPU above a cell threshold."""
+        monkeypatch.setattr(os, "cpu_count", lambda: 6)
+        workers, threshold = expected
+
+        assert parallel_cells_from_options(options) == (workers or 6, threshold)
+
+    def test_invalid_option(self):
+        """Malformed options raise ValueError."""
+        with pytest.raises(ValueError):
+            parallel_cells_from_options(["parallel_cells many"])
+
+
+class TestTriggerFreePassThrough:
+    """Files without any trigger are copied without being converted."""
+
+    def test_trigger_free_file_copied_byte_for_byte(self, tmp_path, file_converter):
+        """Trigger-free files are copied exactly, including line endings."""
+        content = b"col_a,col_b\r\n1,2\r\n3,4"
+        source = tmp_path / "data.csv"
+        source.write_bytes(content)
+
+        out_dir = tmp_path / "out"
+        file_converter.convert_file(str(source), str(out_dir))
+
+        assert (out_dir / "data.csv").read_bytes() == content
+
+    def test_trigger_free_file_not_decoded(
+        self, tmp_path, file_converter, monkeypatch
+    ):
+        """The conversion engine is never run on trigger-free files."""
+
+        def fail(*args, **kwargs):
+            raise AssertionError("Trigger-free file was converted")
+
+        monkeypatch.setattr(file_converter, "_convert_text", fail)
+        source = tmp_path / "helpers.py"
+        source.write_text("def helper():\n    return 1\n")
+
+        out_dir = tmp_path / "out"
+        file_converter.convert_file(str(source), str(out_dir))
+
+        assert (out_dir / "helpers.py").read_text() == "def helper():\n    return 1\n"
+
+    def test_empty_file_copied(self, tmp_path, file_converter):
+        """Empty files are copied."""
+        source = tmp_path / "__init__.py"
+        source.write_bytes(b"")
+
+        out_dir = tmp_path / "out"
+        file_converter.convert_file(str(source), str(out_dir))
+
+        assert (out_dir / "__init__.py").read_bytes() == b""
+
+    def test_binary_file_with_trigger_bytes_copied(self, tmp_path, file_converter):
+        """Binary files are copied even if their bytes contain a trigger."""
+        content = b"\x80\x04\x95\xff KEY_ONLY_START \xfe\x00"
+        source = tmp_path / "checkpoint.bin"
+        source.write_bytes(content)
+
+        out_dir = tmp_path / "out"
+        file_converter.convert_file(str(source), str(out_dir))
+
+        assert (out_dir / "checkpoint.bin").read_bytes() == content
+
+    def test_file_with_trigger_still_converted(self, tmp_path, file_converter):
+        """Files containing a trigger go through the conversion engine."""
+        source = tmp_path / "main.py"
+        source.write_text("x = 1\n# KEY_ONLY_START\nsecret = 2\n# KEY_ONLY_END\n")
+
+        out_dir = tmp_path / "out"
+        file_converter.convert_file(str(source), str(out_dir))
+
+        assert (out_dir / "main.py").read_text() == "x = 1\n"
+
+    @pytest.mark.parametrize("byte_engine", [False, True])
+    @pytest.mark.parametrize("encoding", ["utf-16", "utf-16-be", "utf-32"])
+    def test_wide_encoding_never_copied(
+        self, tmp_path, codeblock_types, mask_types, byte_engine, encoding
+    ):
+        """UTF-16/32 files hide their triggers from the raw check: never copy them."""
+        converter = FileConverter(
+            codeblock_types=codeblock_types,
+            mask_types=mask_types,
+            byte_engine=byte_engine,
+        )
+        source = tmp_path / "sol.py"
+        source.write_bytes(
+            "# KEY_ONLY_START\nsecret = 42\n# KEY_ONLY_END\n".encode(encoding)
+        )
+
+        out_dir = tmp_path / "out"
+        converter.convert_file(str(source), str(out_dir))
+
+        output = out_dir / "sol.py"
+        assert not output.exists() or "secret" not in output.read_bytes().decode(
+            encoding, errors="ignore"
+        )
+
+
+class TestFileHandlers:
+    """Files are dispatched to handlers by the handler registry."""
+
+    def test_custom_handler(self, tmp_path, file_converter):
+        """Custom handlers are called for the extensions mapped to them."""
+        calls = []
+        file_converter.register_handler(
+            "record", lambda source, destination: calls.append((source, destination))
+        )
+        file_converter.handler_registry.register_extension(".dat", "record")
+        source = tmp_path / "values.dat"
+        source.write_text("KEY_ONLY_START\n")
+
+        file_converter.convert_file(str(source), str(tmp_path / "out"))
+
+        assert calls == [(str(source), str(tmp_path / "out" / "values.dat"))]
+
+    def test_copy_handler_skips_scanning(self, tmp_path, file_converter, monkeypatch):
+        """Files mapped to the copy handler are never searched for triggers."""
+
+        def fail(*args, **kwargs):
+            raise AssertionError("Copied file was scanned")
+
+        monkeypatch.setattr(
+            file_converter.trigger_table.matcher, "file_has_triggers", fail
+        )
+        file_converter.handler_registry.register_extension(".csv", "copy")
+        source = tmp_path / "data.csv"
+        source.write_text("a,KEY_ONLY_START\n")
+
+        file_converter.convert_file(str(source), str(tmp_path / "out"))
+
+        assert (tmp_path / "out" / "data.csv").read_text() == "a,KEY_ONLY_START\n"
+
+    def test_unknown_handler(self, tmp_path, file_converter):
+        """Extensions mapped to an unknown handler raise an error."""
+        file_converter.handler_registry.register_extension(".csv", "missing")
+        source = tmp_path / "data.csv"
+        source.write_text("a,b\n")
+
+        with pytest.raises(ValueError, match="Unknown file handler"):
+            file_converter.convert_file(str(source), str(tmp_path / "out"))
+
+
+class TestByteEngine:
+    """Tests for converting text files on their raw bytes."""
+
+    @pytest.fixture
+    def byte_converter(self, codeblock_types, mask_types):
+        """A FileConverter with the byte engine enabled."""
+        return FileConverter(
+            codeblock_types=codeblock_types, mask_types=mask_types, byte_engine=True
+        )
+
+    def test_converts_non_utf8_file(self, tmp_path, byte_converter, file_converter):
+        """Files in other encodings are converted instead of skipped."""
+        source = tmp_path / "legacy.py"
+        source.write_bytes(
+            "# café\nx = 1\n# KEY_ONLY_START\nsecret\n# KEY_ONLY_END\n".encode("cp1252")
+        )
+
+        # The text engine cannot decode the file and skips it
+        file_converter.convert_file(str(source), str(tmp_path / "text"))
+        assert not (tmp_path / "text" / "legacy.py").exists()
+
+        byte_converter.convert_file(str(source), str(tmp_path / "bytes"))
+        assert (tmp_path / "bytes" / "legacy.py").read_bytes() == (
+            "# café\nx = 1\n".encode("cp1252")
+        )
+
+    def test_keeps_line_endings(self, tmp_path, byte_converter):
+        """Original \\r\\n line endings are kept around converted regions."""
+        source = tmp_path / "main.py"
+        source.write_bytes(
+            b"a = 1\r\n# KEY_ONLY_START\r\nsecret\r\n# KEY_ONLY_END\r\nb\r\n"
+        )
+
+        byte_converter.convert_file(str(source), str(tmp_path / "out"))
+
+        assert (tmp_path / "out" / "main.py").read_bytes() == b"a = 1\r\nb\r\n"
+
+    def test_indentation_and_masks(self, tmp_path, byte_converter):
+        """Indentation and mask slicing work on the raw bytes."""
+        source = tmp_path / "main.py"
+        source.write_bytes(
+            "def f():\n"
+            "    # STUDENT_CODE_START\n"
+            "    return 'é'\n"
+            "    # STUDENT_CODE_END\n"
+            "y = 'ü'  # MASK_ASSIGNMENT\n".encode()
+        )
+
+        byte_converter.convert_file(str(source), str(tmp_path / "out"))
+
+        assert (tmp_path / "out" / "main.py").read_text() == (
+            "def f():\n"
+            "    # TODO: Implement\n"
+            "    pass\n"
+            "y = None # TODO: Implement\n\n"
+        )
+
+    def test_non_ascii_triggers_fall_back(self, tmp_path, mask_types):
+        """The text engine is used if any trigger string is not ASCII."""
+        converter = FileConverter(
+            codeblock_types=[CodeBlockType("Bloc", "DÉBUT", "FIN", "")],
+            mask_types=mask_types,
+            byte_engine=True,
+        )
+        source = tmp_path / "main.py"
+        source.write_text("x = 1\n# DÉBUT\nsecret\n# FIN\n", encoding="utf-8")
+
+        converter.convert_file(str(source), str(tmp_path / "out"))
+
+        assert converter.byte_engine is False
+        assert (tmp_path / "out" / "main.py").read_text() == "x = 1\n"
+
+
+class TestStreamingConversion:
+    """Text files are converted chunk by chunk."""
+
+    CONTENT = (
+        "import os\n"
+        "def f():\n"
+        "    # STUDENT_CODE_START\n"
+        + "    secret()\n" * 20
+        + "    # STUDENT_CODE_END\n"
+        "x = compute(  # MASK_ASSIGNMENT\n" + "    arg,\n" * 10 + ")\n"
+        "\n"
+        "# KEY_ONLY_START\n" + "hidden = 1\n" * 15 + "# KEY_ONLY_END\n"
+        "tail = 2"
+    )
+
+    @pytest.mark.parametrize("chunk_size", [1, 3, 16, 1000])
+    def test_iter_line_chunks(self, chunk_size):
+        """Chunks end with complete lines and join back into the file."""
+        chunks = list(iter_line_chunks(io.StringIO(self.CONTENT), chunk_size))
+
+        assert "".join(chunks) == self.CONTENT
+        assert all(chunk.endswith("\n") for chunk in chunks[:-1])
+
+    def test_iter_line_chunks_bytes(self):
+        """Binary files are chunked on newline bytes."""
+        content = self.CONTENT.encode()
+        chunks = list(iter_line_chunks(io.BytesIO(content), 5))
+
+        assert b"".join(chunks) == content
+        assert all(chunk.endswith(b"\n") for chunk in chunks[:-1])
+
+    @pytest.mark.parametrize("byte_engine", [False, True])
+    @pytest.mark.parametrize("chunk_size", [1, 7, 64])
+    def test_small_chunks_match_whole_file(
+        self,
+        tmp_path,
+        monkeypatch,
+        codeblock_types,
+        mask_types,
+        chunk_size,
+        byte_engine,
+    ):
+        """Codeblocks and masks spanning chunks convert as in a single chunk."""
+        converter = FileConverter(
+            codeblock_types=codeblock_types,
+            mask_types=mask_types,
+            byte_engine=byte_engine,
+        )
+        source = tmp_path / "main.py"
+        source.write_text(self.CONTENT)
+
+        converter.convert_file(str(source), str(tmp_path / "whole"))
+        monkeypatch.setattr(file_converter_module, "STREAM_CHUNK_SIZE", chunk_size)
+        converter.convert_file(str(source), str(tmp_path / "chunked"))
+
+        assert (tmp_path / "chunked" / "main.py").read_bytes() == (
+            tmp_path / "whole" / "main.py"
+        ).read_bytes()
+
+    def test_unclosed_codeblock_removes_output(
+        self, tmp_path, monkeypatch, file_converter
+    ):
+        """A conversion error leaves no partial output file behind."""
+        monkeypatch.setattr(file_converter_module, "STREAM_CHUNK_SIZE", 4)
+        source = tmp_path / "main.py"
+        source.write_text("a = 1\n" * 10 + "# STUDENT_CODE_START\nb\n")
+
+        with pytest.raises(InvalidCodeBlockError):
+            file_converter.convert_file(str(source), str(tmp_path / "out"))
+
+        assert not (tmp_path / "out" / "main.py").exists()
@@ -0,0 +1,181 @@
+"""Unit tests for file copy helpers."""
+
+from __future__ import annotations
+
+import os
+import re
+
+import pytest
+
+from pact.convert.utils import file_copy
+from pact.convert.utils.file_copy import (
+    CLONE_COPY,
+    CLONE_LINK,
+    CLONE_REFLINK,
+    clone_file,
+    copy_file,
+    file_contains_pattern,
+)
+
+
+class TestCopyFile:
+    """Tests for copy_file."""
+
+    def test_copies_contents(self, tmp_path):
+        """The destination has exactly the source bytes."""
+        content = os.urandom(300_000)
+        source = tmp_path / "model.pt"
+        source.write_bytes(content)
+
+        copy_file(str(source), str(tmp_path / "copy.pt"))
+
+        assert (tmp_path / "copy.pt").read_bytes() == content
+
+    def test_overwrites_destination(self, tmp_path):
+        """An existing, longer destination file is replaced."""
+        source = tmp_path / "a.txt"
+        source.write_bytes(b"short")
+        destination = tmp_path / "b.txt"
+        destination.write_bytes(b"a much longer previous version")
+
+        copy_file(str(source), str(destination))
+
+        assert destination.read_bytes() == b"short"
+
+    @pytest.mark.parametrize(
+        "missing", [["copy_file_range"], ["copy_file_range", "sendfile"]]
+    )
+    def test_falls_back_without_kernel_copy(self, tmp_path, monkeypatch, missing):
+        """Files are still copied when kernel-side copies fail."""
+
+        def unsupported(*args, **kwargs):
+            raise OSError("unsupported")
+
+        for name in missing:
+            monkeypatch.setattr(file_copy.os, name, unsupported, raising=False)
+
+        source = tmp_path / "data.bin"
+        source.write_bytes(b"\x00\x01" * 1000)
+
+        copy_file(str(source), str(tmp_path / "copy.bin"))
+
+        assert (tmp_path / "copy.bin").read_bytes() == b"\x00\x01" * 1000
+
+    @pytest.mark.parametrize("first_copy", [0, 10])
+    def test_falls_back_after_short_kernel_copy(
+        self, tmp_path, monkeypatch, first_copy
+    ):
+        """Kernel copies stopping before the end never leave a truncated file."""
+
+        copy_file_range_calls = []
+
+        def short_copy_file_range(source_fd, destination_fd, count):
+            # Copy first_copy bytes on the first call, then nothing
+            copy_file_range_calls.append(count)
+            if len(copy_file_range_calls) > 1 or not first_copy:
+                return 0
+            return os.write(destination_fd, os.read(source_fd, first_copy))
+
+        # The first sendfile copies nothing (shutil.copyfile may use it too)
+        sendfile = os.sendfile
+        sendfile_calls = []
+
+        def empty_sendfile(destination_fd, source_fd, offset, count):
+            sendfile_calls.append(offset)
+            if len(sendfile_calls) == 1:
+                return 0
+            return sendfile(destination_fd, source_fd, offset, count)
+
+        monkeypatch.setattr(
+            file_copy.os, "copy_file_range", short_copy_file_range, raising=False
+        )
+        monkeypatch.setattr(file_copy.os, "sendfile", empty_sendfile, raising=False)
+
+        source = tmp_path / "data.bin"
+        source.write_bytes(b"0123456789" * 100)
+
+        copy_file(str(source), str(tmp_path / "copy.bin"))
+
+        assert (tmp_path / "copy.bin").read_bytes() == b"0123456789" * 100
+
+    @pytest.mark.skipif(
+        not os.path.exists("/proc/self/status"), reason="needs a proc filesystem"
+    )
+    def test_copies_files_reporting_no_size(self, tmp_path):
+        """Files whose reported size is 0 but which have contents are copied."""
+        copy_file("/proc/self/status", str(tmp_path / "status"))
+
+        assert (tmp_path / "status").read_bytes().startswith(b"Name:")
+
+
+class TestCloneFile:
+    """Tests for clone_file."""
+
+    def test_clones_contents(self, tmp_path):
+        """The new file has the source bytes, however it was created."""
+        source = tmp_path / "a.txt"
+        source.write_bytes(b"contents")
+
+        method = clone_file(str(source), str(tmp_path / "b.txt"))
+
+        assert method in (CLONE_REFLINK, CLONE_LINK, CLONE_COPY)
+        assert (tmp_path / "b.txt").read_bytes() == b"contents"
+
+    def test_links_without_reflinks(self, tmp_path, monkeypatch):
+        """Without reflinks, the file is hard linked."""
+        monkeypatch.setattr(file_copy, "fcntl", None)
+        source = tmp_path / "a.txt"
+        source.write_bytes(b"contents")
+
+        assert clone_file(str(source), str(tmp_path / "b.txt")) == CLONE_LINK
+        assert os.stat(tmp_path / "b.txt").st_ino == os.stat(source).st_ino
+
+    def test_copies_without_links(self, tmp_path, monkeypatch):
+        """Without reflinks and hard links, the file is copied."""
+
+        def unsupported(*args, **kwargs):
+            raise OSError("unsupported")
+
+        monkeypatch.setattr(file_copy, "fcntl", None)
+        monkeypatch.setattr(file_copy.os, "link", unsupported)
+        source = tmp_path / "a.txt"
+        source.write_bytes(b"contents")
+
+        assert clone_file(str(source), str(tmp_path / "b.txt")) == CLONE_COPY
+        assert (tmp_path / "b.txt").read_bytes() == b"contents"
+
+    @pytest.mark.parametrize("reflinks", [True, False])
+    def test_existing_destination_raises(self, tmp_path, monkeypatch, reflinks):
+        """An existing destination is never overwritten."""
+        if not reflinks:
+            monkeypatch.setattr(file_copy, "fcntl", None)
+        source = tmp_path / "a.txt"
+        source.write_bytes(b"new")
+        destination = tmp_path / "b.txt"
+        destination.write_bytes(b"old")
+
+        with pytest.raises(FileExistsError):
+            clone_file(str(source), str(destination))
+        assert destination.read_bytes() == b"old"
+
+
+class TestFileContainsPattern:
+    """Tests for file_contains_pattern."""
+
+    def test_pattern_found(self, tmp_path):
+        """A matching file is detected."""
+        source = tmp_path / "main.py"
+        source.write_bytes(b"x = 1\n# KEY_ONLY_START\n")
+        assert file_contains_pattern(str(source), re.compile(b"KEY_ONLY_START"))
+
+    def test_pattern_not_found(self, tmp_path):
+        """A file without a match is not detected."""
+        source = tmp_path / "main.py"
+        source.write_bytes(b"x = 1\n")
+        assert not file_contains_pattern(str(source), re.compile(b"KEY_ONLY_START"))
+
+    def test_empty_file(self, tmp_path):
+        """Empty files never match."""
+        source = tmp_path / "empty.py"
+        source.write_bytes(b"")
+        assert not file_contains_pattern(str(source), re.compile(b"KEY_ONLY_START"))
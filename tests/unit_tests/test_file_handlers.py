@@ -0,0 +1,111 @@
+"""Unit tests for FileHandlerRegistry."""
+
+from __future__ import annotations
+
+import pytest
+
+from pact.convert.utils.file_handlers import (
+    COPY_HANDLER,
+    NOTEBOOK_HANDLER,
+    SKIP_HANDLER,
+    TEXT_HANDLER,
+    FileHandlerRegistry,
+)
+
+
+@pytest.fixture
+def registry():
+    """A registry with the built-in mappings."""
+    return FileHandlerRegistry()
+
+
+@pytest.mark.parametrize(
+    "file_name, content, handler_name",
+    [
+        ("main.py", b"x = 1\n", TEXT_HANDLER),
+        ("notes", b"plain text", TEXT_HANDLER),
+        ("analysis.ipynb", b"{}", NOTEBOOK_HANDLER),
+        ("Analysis.IPYNB", b"{}", NOTEBOOK_HANDLER),
+        ("model.pt", b"KEY_ONLY_START", COPY_HANDLER),
+        ("logo.PNG", b"", COPY_HANDLER),
+        ("checkpoint", b"PK\x03\x04data", COPY_HANDLER),
+        ("blob.dat", b"abc\x00def", COPY_HANDLER),
+    ],
+)
+def test_builtin_mappings(tmp_path, registry, file_name, content, handler_name):
+    """Files are mapped by extension, then by their first bytes."""
+    file_path = tmp_path / file_name
+    file_path.write_bytes(content)
+
+    assert registry.resolve(str(file_path)) == handler_name
+
+
+def test_register_extension(tmp_path, registry):
+    """Registered extensions override the built-in mappings."""
+    registry.register_extension("CSV", COPY_HANDLER)
+    registry.register_extension(".png", SKIP_HANDLER)
+
+    for file_name in ["data.csv", "logo.png"]:
+        (tmp_path / file_name).write_text("")
+
+    assert registry.resolve(str(tmp_path / "data.csv")) == COPY_HANDLER
+    assert registry.resolve(str(tmp_path / "logo.png")) == SKIP_HANDLER
+
+
+def test_register_magic(tmp_path, registry):
+    """Registered magic bytes map files with unknown extensions."""
+    registry.register_magic(b"#!custom", "custom")
+    file_path = tmp_path / "script"
+    file_path.write_bytes(b"#!custom\nbody\n")
+
+    assert registry.resolve(str(file_path)) == "custom"
+
+
+def test_register_empty_magic(registry):
+    """Empty magic bytes are rejected."""
+    with pytest.raises(ValueError):
+        registry.register_magic(b"", COPY_HANDLER)
+
+
+def test_from_options(tmp_path):
+    """handler options are applied, other options are ignored."""
+    registry = FileHandlerRegistry.from_options(
+        ["no_submission_file", "handler .csv copy", "", "handler .log skip"]
+    )
+    (tmp_path / "data.csv").write_text("")
+    (tmp_path / "run.log").write_text("")
+
+    assert registry.resolve(str(tmp_path / "data.csv")) == COPY_HANDLER
+    assert registry.resolve(str(tmp_path / "run.log")) == SKIP_HANDLER
+
+
+def test_from_options_malformed():
+    """Malformed handler options raise an error."""
+    with pytest.raises(ValueError):
+        FileHandlerRegistry.from_options(["handler .csv"])
+
+
+@pytest.mark.parametrize("option", ["handler .csv cpy", "handler .csv custom"])
+def test_from_options_unknown_handler(option):
+    """Handler options naming an unknown handler raise an error."""
+    with pytest.raises(ValueError, match="Invalid handler option"):
+        FileHandlerRegistry.from_options([option])
+
+
+def test_from_options_custom_handler(tmp_path):
+    """Options can map extensions to the given (e.g. custom) handlers."""
+    registry = FileHandlerRegistry.from_options(
+        ["handler .csv custom"], handler_names=[TEXT_HANDLER, "custom"]
+    )
+    (tmp_path / "data.csv").write_text("")
+
+    assert registry.resolve(str(tmp_path / "data.csv")) == "custom"
+
+
+def test_register_magic_before_binary_detection(tmp_path, registry):
+    """Registered magic bytes take priority over the binary file detection."""
+    registry.register_magic(b"PK\x03\x04", TEXT_HANDLER)
+    file_path = tmp_path / "archive"
+    file_path.write_bytes(b"PK\x03\x04data")
+
+    assert registry.resolve(str(file_path)) == TEXT_HANDLER
@@ -0,0 +1,134 @@
+"""Unit tests for convert_files."""
+
+from __future__ import annotations
+
+import json
+import multiprocessing
+import os
+
+import pytest
+
+from pact.convert.utils import file_jobs
+from pact.convert.utils.codeblock_infra import InvalidCodeBlockError
+from pact.convert.utils.file_jobs import convert_files, jobs_from_argument
+from pact.convert.utils.tree_walker import WorkItem
+
+SOLUTION = "def f():\n    # STUDENT_CODE_START\n    return 42\n    # STUDENT_CODE_END\n"
+
+
+def make_notebook(source):
+    """A notebook with one code cell."""
+    return json.dumps(
+        {
+            "cells": [
+                {
+                    "cell_type": "code",
+                    "metadata": {},
+                    "execution_count": 1,
+                    "outputs": [],
+                    "source": source,
+                }
+            ],
+            "metadata": {},
+            "nbformat": 4,
+            "nbformat_minor": 5,
+        }
+    )
+
+
+@pytest.fixture
+def work(tmp_path):
+    """Text, notebook and binary files to convert into an existing folder."""
+    source = tmp_path / "source"
+    source.mkdir()
+    destination = tmp_path / "destination"
+    destination.mkdir()
+
+    for i in range(6):
+        (source / f"main{i}.py").write_text(SOLUTION)
+        (source / f"notes{i}.txt").write_text("no triggers\n")
+        (source / f"image{i}.png").write_bytes(b"\x89PNG\r\n\x1a\n" + bytes([i]) * 64)
+    (source / "lab.ipynb").write_text(make_notebook(SOLUTION))
+
+    return [
+        WorkItem(str(source / name), str(destination))
+        for name in sorted(os.listdir(source))
+    ]
+
+
+def read_tree(folder):
+    """The contents of each file of a folder, by name."""
+    return {name: (folder / name).read_bytes() for name in os.listdir(folder)}
+
+
+@pytest.mark.parametrize("jobs", [1, 3])
+def test_parallel_output_matches_serial(tmp_path, file_converter, work, jobs):
+    """Files are converted the same way whatever the number of jobs."""
+    convert_files(file_converter, work, jobs=jobs)
+    converted = read_tree(tmp_path / "destination")
+
+    assert len(converted) == len(work)
+    assert b"STUDENT_CODE_START" not in converted["main0.py"]
+    assert b"return 42" not in converted["lab.ipynb"]
+    assert converted["image5.png"] == (tmp_path / "source" / "image5.png").read_bytes()
+
+    if jobs > 1:
+        for item in work:
+            os.remove(
+                os.path.join(
+                    item.destination_folder, os.path.basename(item.source_path)
+                )
+            )
+        convert_files(file_converter, work, jobs=1)
+        assert read_tree(tmp_path / "destination") == converted
+
+
+@pytest.mark.parametrize("jobs", [1, 3])
+def test_error_carries_path(tmp_path, file_converter, work, jobs):
+    """The first failing file (in work list order) is reported with its path."""
+    for name in ("main1.py", "main4.py"):
+        (tmp_path / "source" / name).write_text("# STUDENT_CODE_START\n")
+
+    with pytest.raises(InvalidCodeBlockError) as exc_info:
+        convert_files(file_converter, work, jobs=jobs)
+
+    failing_path = str(tmp_path / "source" / "main1.py")
+    assert str(exc_info.value).startswith(f"{failing_path}: ")
+    assert exc_info.value.source_path == failing_path
+
+
+def test_notebook_error_keeps_cell_index(tmp_path, file_converter, work):
+    """Errors of notebook cells keep the index of the cell."""
+    (tmp_path / "source" / "lab.ipynb").write_text(
+        make_notebook("# STUDENT_CODE_START\n")
+    )
+
+    with pytest.raises(InvalidCodeBlockError) as exc_info:
+        convert_files(file_converter, work, jobs=2)
+
+    assert "lab.ipynb: Cell 0: " in str(exc_info.value)
+    assert exc_info.value.cell_index == 0
+
+
+def test_workers_started_before_threads(file_converter, work, monkeypatch):
+    """The worker processes are forked before the copy threads start."""
+    workers_at_thread_start = []
+
+    class RecordingThreadPoolExecutor(file_jobs.ThreadPoolExecutor):
+        def __init__(self, *args, **kwargs):
+            workers_at_thread_start.append(len(multiprocessing.active_children()))
+            super().__init__(*args, **kwargs)
+
+    monkeypatch.setattr(file_jobs, "ThreadPoolExecutor", RecordingThreadPoolExecutor)
+    convert_files(file_converter, work, jobs=2)
+
+    assert len(workers_at_thread_start) == 1
+    assert workers_at_thread_start[0] > 0
+
+
+def test_jobs_from_argument():
+    """--jobs takes a number of jobs, or 0 for one per CPU."""
+    assert jobs_from_argument("4") == 4
+    assert jobs_from_argument("0") == (os.cpu_count() or 1)
+    with pytest.raises(ValueError, match="Invalid number of jobs"):
+        jobs_from_argument("-1")
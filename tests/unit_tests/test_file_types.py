@@ -0,0 +1,73 @@
+"""Unit tests for binary file classification."""
+
+from __future__ import annotations
+
+import pytest
+
+from pact.convert.utils.file_types import SNIFF_SIZE, is_binary_file
+
+
+@pytest.mark.parametrize(
+    "file_name", ["model.pt", "weights.NPZ", "data.parquet", "lib.so", "logo.png"]
+)
+def test_binary_extensions(tmp_path, file_name):
+    """Files with a binary extension are binary whatever their contents."""
+    file_path = tmp_path / file_name
+    file_path.write_text("# KEY_ONLY_START\n")
+
+    assert is_binary_file(str(file_path)) is True
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        b"\x89PNG\r\n\x1a\nrest",
+        b"PK\x03\x04checkpoint",
+        b"\x7fELF\x02\x01",
+        b"\x80\x04\x95pickled",
+        b"\x93NUMPY\x01\x00",
+    ],
+)
+def test_magic_numbers(tmp_path, content):
+    """Files starting with a known magic number are binary."""
+    file_path = tmp_path / "unknown"
+    file_path.write_bytes(content)
+
+    assert is_binary_file(str(file_path)) is True
+
+
+def test_nul_byte_in_prefix(tmp_path):
+    """A NUL byte in the first bytes marks a file as binary."""
+    file_path = tmp_path / "data.dat"
+    file_path.write_bytes(b"header\x00\x01\x02")
+
+    assert is_binary_file(str(file_path)) is True
+
+
+def test_nul_byte_after_prefix(tmp_path):
+    """Only the first SNIFF_SIZE bytes are sniffed."""
+    file_path = tmp_path / "log.txt"
+    file_path.write_bytes(b"a" * SNIFF_SIZE + b"\x00")
+
+    assert is_binary_file(str(file_path)) is False
+
+
+@pytest.mark.parametrize(
+    "content",
+    [b"", b"print('hello')\n", "café = 1\n".encode(), "café".encode("cp1252")],
+)
+def test_text_files(tmp_path, content):
+    """Text files in any encoding are not binary."""
+    file_path = tmp_path / "main.py"
+    file_path.write_bytes(content)
+
+    assert is_binary_file(str(file_path)) is False
+
+
+@pytest.mark.parametrize("encoding", ["utf-16", "utf-16-le", "utf-16-be", "utf-32"])
+def test_utf16_text_files(tmp_path, encoding):
+    """UTF-16 (and UTF-32 with a byte order mark) text is not binary."""
+    file_path = tmp_path / "sol.py"
+    file_path.write_bytes("# KEY_ONLY_START\nsecret = 42\n".encode(encoding))
+
+    assert is_binary_file(str(file_path)) is False
@@ -0,0 +1,69 @@
+"""Unit tests for the JSON backend."""
+
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from pact.convert.utils import json_backend
+from pact.convert.utils.json_backend import dumps, loads
+
+
+@pytest.fixture(params=["orjson", "json"])
+def backend(request, monkeypatch):
+    """Parse with orjson (if installed) and with the json module."""
+    if request.param == "json":
+        monkeypatch.setattr(json_backend, "orjson", None)
+    elif json_backend.orjson is None:
+        pytest.skip("orjson is not installed")
+    return request.param
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        '{"b": 1, "a": [1.5, -2e-3, 10, true, null]}',
+        '{"a": 1, "b": 2, "a": 3}',
+        '{"x": NaN, "y": Infinity, "z": -Infinity}',
+        '{"big": 123456789012345678901234567890}',
+        '{"s": "\\ud800 lone surrogate"}',
+        '{"f": 1e400, "g": -0, "h": 0.1}',
+        '"Título ✓ 🐍"',
+        "  [] \n",
+    ],
+)
+def test_same_as_json_loads(backend, content):
+    """Every backend parses documents exactly as json.loads."""
+    result = loads(content.encode("utf-8"))
+    expected = json.loads(content)
+
+    assert repr(result) == repr(expected)
+    assert json.dumps(result) == json.dumps(expected)
+
+
+@pytest.mark.parametrize(
+    "content", [b"", b"{", b'{"a" 1}', b"[] extra", b"\xef\xbb\xbf{}"]
+)
+def test_invalid_json(backend, content):
+    """Invalid documents raise the same error as json.loads."""
+    with pytest.raises(json.JSONDecodeError):
+        loads(content)
+
+
+def test_invalid_utf8(backend):
+    """Documents that are not UTF-8 raise UnicodeDecodeError."""
+    with pytest.raises(UnicodeDecodeError):
+        loads(b'{"a": "\xff"}')
+
+
+@pytest.mark.parametrize(
+    "obj",
+    [
+        {"a": [1, 2.5, None, True], "b": "Título ✓"},
+        {"s": "\ud800 lone surrogate", "big": 123456789012345678901234567890},
+    ],
+)
+def test_dumps_round_trip(backend, obj):
+    """Documents written by dumps are read back as the same object."""
+    assert loads(dumps(obj)) == obj
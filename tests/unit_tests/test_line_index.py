@@ -0,0 +1,63 @@
+"""Unit tests for LineIndex."""
+
+from __future__ import annotations
+
+import pytest
+
+from pact.convert.utils.line_index import LineIndex
+
+TEXT = "first\n\nthird line\nlast"
+
+
+@pytest.fixture(params=[False, True], ids=["python", "numpy"])
+def line_index(request):
+    """A LineIndex of TEXT, with and without NumPy."""
+    if request.param:
+        pytest.importorskip("numpy")
+    return LineIndex(TEXT, use_numpy=request.param)
+
+
+def test_line_bounds(line_index):
+    """Offsets are mapped to the start and end of their line."""
+    offsets = [0, 5, 6, 7, 12, len(TEXT) - 1]
+
+    starts, ends = line_index.line_bounds(offsets)
+
+    assert [TEXT[start:end] for start, end in zip(starts, ends)] == [
+        "first\n",
+        "first\n",
+        "\n",
+        "third line\n",
+        "third line\n",
+        "last",
+    ]
+
+
+def test_no_offsets(line_index):
+    """Mapping no offsets returns empty bounds."""
+    assert line_index.line_bounds([]) == ([], [])
+
+
+def test_small_text_not_vectorized():
+    """Small buffers are not indexed with NumPy by default."""
+    assert LineIndex(TEXT).is_vectorized is False
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "a\n€ b\n",
+        "naïve “quote”\n\n你好，世界\n🙂 x\nend",
+        "\ud800 lone\nsurrogate\n",
+    ],
+)
+def test_wide_characters_vectorized(text):
+    """Text with characters above U+00FF is indexed with NumPy too."""
+    pytest.importorskip("numpy")
+    line_index = LineIndex(text, use_numpy=True)
+    offsets = list(range(len(text)))
+
+    assert line_index.is_vectorized is True
+    assert line_index.line_bounds(offsets) == LineIndex(
+        text, use_numpy=False
+    ).line_bounds(offsets)
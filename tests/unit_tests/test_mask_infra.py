@@ -1,6 +1,8 @@
 """Unit tests for MaskManager and MaskType."""
 from __future__ import annotations
 
+import pickle
+
 import pytest
 
 from pact.convert.utils.mask_infra import (
@@ -235,3 +237,12 @@ class TestInvalidMaskError:
         s = str(err)
         assert "Test error" in s
         assert "5" in s
+
+    def test_pickle_round_trip(self):
+        """Pickled errors (e.g. from worker processes) keep their message."""
+        err = InvalidMaskError("Test error", error_code=5)
+        err.cell_index = 3
+        restored = pickle.loads(pickle.dumps(err))
+        assert str(restored) == str(err)
+        assert restored.error_code == 5
+        assert restored.cell_index == 3
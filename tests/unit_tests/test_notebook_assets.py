@@ -0,0 +1,82 @@
+"""Unit tests for AssetStore."""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+
+import pytest
+
+from pact.convert.utils.notebook_assets import ATTACHMENT_MIN_SIZE, AssetStore
+
+IMAGE = b"\x89PNG" + bytes(range(256)) * 8
+
+
+def make_cell(name="diagram.png", image=IMAGE):
+    """A markdown cell showing one attachment."""
+    return {
+        "cell_type": "markdown",
+        "metadata": {},
+        "attachments": {name: {"image/png": base64.b64encode(image).decode()}},
+        "source": ["Intro\n", f"![diagram](attachment:{name})\n"],
+    }
+
+
+@pytest.fixture
+def store(tmp_path):
+    """A store externalizing attachments of 1 KiB or more."""
+    return AssetStore(str(tmp_path / "student" / "assets"), min_size=1024)
+
+
+def test_attachment_externalized(tmp_path, store):
+    """Large attachments become files and references point to them."""
+    cell = make_cell()
+
+    store.externalize_cell(cell, str(tmp_path / "student" / "week1"))
+
+    file_name = hashlib.sha256(IMAGE).hexdigest() + ".png"
+    assert (tmp_path / "student" / "assets" / file_name).read_bytes() == IMAGE
+    assert cell["source"] == ["Intro\n", f"![diagram](../assets/{file_name})\n"]
+    assert "attachments" not in cell
+
+
+def test_identical_images_stored_once(tmp_path, store):
+    """Cells attaching the same image share one asset file."""
+    cells = [make_cell("a.png"), make_cell("b b.png")]
+    cells[1]["source"] = ["![other](attachment:b%20b.png)\n"]
+
+    for cell in cells:
+        store.externalize_cell(cell, str(tmp_path / "student"))
+
+    assert len(list((tmp_path / "student" / "assets").iterdir())) == 1
+    assert cells[0]["source"][1] == cells[1]["source"][0].replace("other", "diagram")
+
+
+@pytest.mark.parametrize(
+    "cell",
+    [
+        make_cell(image=b"small"),
+        {**make_cell(), "source": ["No reference\n"]},
+        {**make_cell(), "attachments": {"x.svg": {"image/svg+xml": "<svg/>"}}},
+    ],
+)
+def test_attachment_kept_inline(tmp_path, store, cell):
+    """Small, unreferenced and non-image attachments stay in the cell."""
+    attachments = dict(cell["attachments"])
+
+    store.externalize_cell(cell, str(tmp_path / "student"))
+
+    assert cell["attachments"] == attachments
+    assert not (tmp_path / "student" / "assets").exists()
+
+
+def test_from_options(tmp_path):
+    """The option enables the store, with an optional minimum size."""
+    assert AssetStore.from_options(["scrub all"], str(tmp_path)) is None
+    store = AssetStore.from_options(["externalize_attachments"], str(tmp_path))
+    assert store.min_size == ATTACHMENT_MIN_SIZE
+    store = AssetStore.from_options(["externalize_attachments 10"], str(tmp_path))
+    assert store.min_size == 10
+
+    with pytest.raises(ValueError):
+        AssetStore.from_options(["externalize_attachments big"], str(tmp_path))
@@ -0,0 +1,127 @@
+"""Unit tests for read_notebook."""
+
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from pact.convert.utils import json_backend, notebook_reader
+from pact.convert.utils.notebook_reader import read_notebook
+
+NOTEBOOK = {
+    "cells": [
+        {
+            "cell_type": "markdown",
+            "metadata": {"tags": ["intro"]},
+            "source": ["# Título ✓\n", "Some text with \"quotes\" and \\\\ slashes"],
+        },
+        {
+            "cell_type": "code",
+            "execution_count": 3,
+            "metadata": {"collapsed": False, "scores": [1.5, -2e-3, 10]},
+            "outputs": [
+                {"output_type": "stream", "name": "stdout", "text": ["ü\n"] * 50},
+                {"output_type": "display_data", "data": {"image/png": "iVBOR" * 200}},
+            ],
+            "source": "x = {'a': [1, 2]}  # MASK_ASSIGNMENT\n",
+        },
+        {"cell_type": "raw", "metadata": {}, "outputs": ["kept"], "source": []},
+    ],
+    "metadata": {"kernelspec": {"name": "python3"}, "emoji": "🐍" * 20},
+    "nbformat": 4,
+    "nbformat_minor": 5,
+}
+
+
+@pytest.fixture(autouse=True, params=["streamed", "json", "orjson"])
+def read_mode(request, monkeypatch):
+    """Parse cell by cell, and at once with each JSON backend."""
+    if request.param == "streamed":
+        monkeypatch.setattr(notebook_reader, "STREAMING_MIN_SIZE", 0)
+    elif request.param == "json":
+        monkeypatch.setattr(json_backend, "orjson", None)
+    elif json_backend.orjson is None:
+        pytest.skip("orjson is not installed")
+    return request.param
+
+
+@pytest.fixture(params=[None, 1, 7])
+def window_size(request, monkeypatch):
+    """Parse with the default window and with tiny windows (many retries)."""
+    if request.param is not None:
+        monkeypatch.setattr(notebook_reader, "INITIAL_WINDOW_SIZE", request.param)
+    return request.param
+
+
+@pytest.mark.parametrize("indent", [None, 1, 4])
+def test_same_as_json_load(tmp_path, window_size, indent):
+    """Notebooks are read exactly as with json.load, whatever the layout."""
+    file_path = tmp_path / "notebook.ipynb"
+    file_path.write_text(json.dumps(NOTEBOOK, indent=indent, ensure_ascii=False))
+
+    assert read_notebook(str(file_path)) == NOTEBOOK
+
+
+def test_key_order_kept(tmp_path, window_size):
+    """Keys keep their order, so the notebook serializes the same way."""
+    file_path = tmp_path / "notebook.ipynb"
+    file_path.write_text(json.dumps(NOTEBOOK))
+
+    assert json.dumps(read_notebook(str(file_path))) == json.dumps(NOTEBOOK)
+
+
+def test_drop_code_outputs(tmp_path, window_size):
+    """Only the outputs of code cells are dropped."""
+    file_path = tmp_path / "notebook.ipynb"
+    file_path.write_text(json.dumps(NOTEBOOK))
+
+    notebook = read_notebook(str(file_path), drop_code_outputs=True)
+
+    assert notebook["cells"][1]["outputs"] == []
+    assert notebook["cells"][2]["outputs"] == ["kept"]
+    assert notebook["cells"][1]["source"] == NOTEBOOK["cells"][1]["source"]
+
+
+@pytest.mark.parametrize(
+    "content",
+    ['{"cells": [], "nbformat": 4}', "{}", '{"cells": []}  \n', '{"cells": 1}'],
+)
+def test_small_documents(tmp_path, content):
+    """Empty objects and cell lists are read as with json.load."""
+    file_path = tmp_path / "notebook.ipynb"
+    file_path.write_text(content)
+
+    assert read_notebook(str(file_path)) == json.loads(content)
+
+
+@pytest.mark.parametrize(
+    "content", ["", "{", '{"cells": [}', '{"cells": []} extra', '{"a" 1}']
+)
+def test_invalid_json(tmp_path, content):
+    """Invalid notebooks raise the same error as json.load."""
+    file_path = tmp_path / "notebook.ipynb"
+    file_path.write_text(content)
+
+    with pytest.raises(json.JSONDecodeError):
+        read_notebook(str(file_path))
+
+
+def test_top_level_array(tmp_path):
+    """Documents that are not objects fall back to json.load."""
+    file_path = tmp_path / "notebook.ipynb"
+    file_path.write_text("[1, 2]")
+
+    assert read_notebook(str(file_path)) == [1, 2]
+
+
+def test_backend_logged(tmp_path, read_mode, caplog):
+    """The backend parsing a notebook is logged, whether it is streamed or not."""
+    file_path = tmp_path / "notebook.ipynb"
+    file_path.write_text(json.dumps(NOTEBOOK))
+
+    with caplog.at_level("DEBUG", logger=notebook_reader.__name__):
+        read_notebook(str(file_path))
+
+    expected = "one cell at a time" if read_mode == "streamed" else "at once"
+    assert f"Parsing {file_path} {expected} with the" in caplog.text
@@ -0,0 +1,77 @@
+"""Unit tests for ScrubPolicy."""
+
+from __future__ import annotations
+
+import pytest
+
+from pact.convert.utils.notebook_scrub import VOLATILE_CELL_METADATA, ScrubPolicy
+
+
+def make_cell():
+    """A markdown cell with volatile metadata and two attachments."""
+    return {
+        "cell_type": "markdown",
+        "metadata": {"tags": ["intro"], "execution": {"iopub.status.busy": "x"}},
+        "attachments": {
+            "used image.png": {"image/png": "AAAA"},
+            "unused.png": {"image/png": "BBBB"},
+        },
+        "source": ["![plot](attachment:used%20image.png)\n"],
+    }
+
+
+def test_default_policy_keeps_everything():
+    """Nothing is removed by default."""
+    policy = ScrubPolicy.from_options(["no_submission_file"])
+    cell = make_cell()
+    notebook = {"metadata": {"widgets": {}}, "cells": [cell]}
+
+    policy.scrub_cell(cell)
+    policy.scrub_notebook(notebook)
+
+    assert not policy.enabled
+    assert cell == make_cell()
+    assert "widgets" in notebook["metadata"]
+
+
+def test_scrub_all():
+    """ "scrub all" removes widgets, volatile metadata and unused attachments."""
+    policy = ScrubPolicy.from_options(["scrub all"])
+    cell = make_cell()
+    notebook = {"metadata": {"widgets": {}, "kernelspec": {}}, "cells": [cell]}
+
+    policy.scrub_cell(cell)
+    policy.scrub_notebook(notebook)
+
+    assert notebook["metadata"] == {"kernelspec": {}}
+    assert cell["metadata"] == {"tags": ["intro"]}
+    assert list(cell["attachments"]) == ["used image.png"]
+
+
+def test_cell_metadata_keys():
+    """Keys given after cell_metadata replace the volatile keys."""
+    policy = ScrubPolicy.from_options(["scrub cell_metadata tags", "scrub widgets"])
+
+    assert policy.cell_metadata_keys == ("tags",)
+    assert policy.widgets and not policy.attachments
+
+    policy = ScrubPolicy.from_options(["scrub cell_metadata", "scrub all"])
+    assert policy.cell_metadata_keys == VOLATILE_CELL_METADATA
+
+
+def test_unreferenced_attachments_removed():
+    """Attachments key is removed once no attachment is referenced."""
+    policy = ScrubPolicy(attachments=True)
+    cell = make_cell()
+    cell["source"] = ["No more images\n"]
+
+    policy.scrub_cell(cell)
+
+    assert "attachments" not in cell
+
+
+@pytest.mark.parametrize("option", ["scrub", "scrub outputs", "scrub widgets metadata"])
+def test_invalid_options(option):
+    """Malformed scrub options raise ValueError."""
+    with pytest.raises(ValueError):
+        ScrubPolicy.from_options([option])
@@ -4,14 +4,18 @@ from __future__ import annotations
 import json
 import os
 
+import nbformat
 import pytest
 
 from pact.convert.utils.prime_converter import GENERATED_LOCATION_NAME
 from pact.validate.utils.notebook_validator import NotebookValidator
 
 
-def _write_notebook(path, code_cells: list[str]) -> None:
-    """Write a minimal valid notebook with the given code cell sources."""
+def _write_notebook(path, code_cells: list) -> None:
+    """
+    Write a minimal valid notebook with the given code cell sources (strings,
+    or lists of lines as Jupyter saves them).
+    """
     nb = {
         "cells": [
             {
@@ -60,6 +64,13 @@ class TestNotebookValidatorSingleFile:
         assert report.results[0].ok is True
         assert report.results[0].error is None
 
+    def test_sources_saved_as_lines(self, tmp_path):
+        path = tmp_path / "lines.ipynb"
+        _write_notebook(str(path), [["x = 1\n", "assert x == 1\n"]])
+
+        report = NotebookValidator().validate(str(path))
+        assert report.ok is True, report.results[0].error
+
     def test_failing_notebook_reports_failure(self, failing_notebook):
         report = NotebookValidator().validate(failing_notebook)
         assert report.ok is False
@@ -157,3 +168,86 @@ class TestValidateNotebooksCli:
         from pact.validate_notebooks import main
 
         assert main([failing_notebook]) == 1
+
+
+class TestNotebookValidatorOutputs:
+    def test_saved_outputs_are_cleared(self, tmp_path):
+        path = tmp_path / "saved.ipynb"
+        _write_notebook(str(path), ["x = 1\n"])
+        with open(path) as f:
+            nb = json.load(f)
+        nb["cells"][0]["outputs"] = [
+            {"output_type": "stream", "name": "stdout", "text": "x" * 100000}
+        ]
+        nb["cells"][0]["execution_count"] = 7
+        with open(path, "w") as f:
+            json.dump(nb, f)
+
+        validator = NotebookValidator()
+        cleared = validator._read_notebook(str(path))
+        assert cleared.cells[0].outputs == []
+        assert cleared.cells[0].execution_count is None
+        assert validator.validate(str(path)).ok is True
+
+    def test_schema_errors_are_logged(self, tmp_path, caplog):
+        path = tmp_path / "hand_edited.ipynb"
+        _write_notebook(str(path), ["x = 1\n"])
+        with open(path) as f:
+            nb = json.load(f)
+        nb["cells"][0]["extra"] = True
+        with open(path, "w") as f:
+            json.dump(nb, f)
+
+        with caplog.at_level("ERROR"):
+            report = NotebookValidator().validate(str(path))
+        assert report.ok is True
+        assert "Notebook JSON of" in caplog.text
+        assert "is invalid" in caplog.text
+
+    def test_max_output_bytes_keeps_tail(self):
+        from pact.validate.utils.notebook_validator import _BoundedOutputClient
+
+        client = _BoundedOutputClient(nbformat.v4.new_notebook(), max_output_bytes=10)
+        outs = []
+        for i in range(5):
+            outs.append(
+                nbformat.v4.new_output("stream", name="stdout", text=f"line{i}\n")
+            )
+            client._trim_outputs(outs, 0)
+
+        assert "".join(out.text for out in outs) == "ne3\nline4\n"
+        assert client.trimmed_bytes[0] == 20
+
+    def test_max_output_bytes_shifts_display_ids(self):
+        from pact.validate.utils.notebook_validator import _BoundedOutputClient
+
+        client = _BoundedOutputClient(nbformat.v4.new_notebook(), max_output_bytes=6)
+        client._display_id_map["d"] = {0: [0, 2]}
+        client.output_bytes[0] = 6
+        outs = [
+            nbformat.v4.new_output("display_data", data={"text/plain": "abc"}),
+            nbformat.v4.new_output("stream", name="stdout", text="abc"),
+            nbformat.v4.new_output("display_data", data={"text/plain": "abc"}),
+        ]
+        client._trim_outputs(outs, 0)
+
+        assert len(outs) == 2
+        assert client._display_id_map["d"] == {0: [1]}
+
+    def test_max_output_bytes_keeps_error(self, tmp_path):
+        path = tmp_path / "noisy.ipynb"
+        _write_notebook(
+            str(path),
+            [
+                "for i in range(2000):\n    print('x' * 100)\n"
+                "raise RuntimeError('boom')\n"
+            ],
+        )
+
+        report = NotebookValidator(max_output_bytes=1000).validate(str(path))
+        assert report.ok is False
+        assert "boom" in report.failures[0].error
+
+    def test_negative_max_output_bytes_raises(self):
+        with pytest.raises(ValueError, match="max_output_bytes"):
+            NotebookValidator(max_output_bytes=-1)
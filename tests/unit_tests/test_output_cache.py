@@ -0,0 +1,125 @@
+"""Unit tests for output_cache.py."""
+
+from __future__ import annotations
+
+import os
+
+import pytest
+
+from pact.convert.utils.cell_cache import CACHE_DIR_ENV
+from pact.convert.utils.output_cache import OUTPUT_CACHE_MAX_BYTES, OutputCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    """An output cache in a temporary folder."""
+    return OutputCache(str(tmp_path / "cache"))
+
+
+def write(path, contents):
+    """Writes a file, returning its path as a string."""
+    path.write_bytes(contents)
+    return str(path)
+
+
+def test_round_trip(tmp_path, cache):
+    """A stored output is fetched back for the same contents and fingerprint."""
+    source = write(tmp_path / "source.py", b"x = 1  # MASK_ASSIGNMENT\n")
+    output = write(tmp_path / "output.py", b"x = ...\n")
+    key = cache.key(source, "config")
+
+    assert cache.fetch(key, str(tmp_path / "fetched.py")) is False
+    cache.store(key, output)
+    assert cache.fetch(key, str(tmp_path / "fetched.py")) is True
+    assert (tmp_path / "fetched.py").read_bytes() == b"x = ...\n"
+
+
+def test_key_depends_on_contents_and_fingerprint(tmp_path, cache):
+    """Keys only depend on the contents (not the path) and the fingerprint."""
+    first = write(tmp_path / "a.py", b"same")
+    second = write(tmp_path / "b.py", b"same")
+    other = write(tmp_path / "c.py", b"other")
+
+    assert cache.key(first, "config") == cache.key(second, "config")
+    assert cache.key(first, "config") != cache.key(other, "config")
+    assert cache.key(first, "config") != cache.key(first, "other config")
+
+
+def test_fetch_replaces_destination(tmp_path, cache):
+    """An existing destination file is replaced by the cached output."""
+    key = cache.key(write(tmp_path / "source.py", b"source"), "config")
+    cache.store(key, write(tmp_path / "output.py", b"output"))
+    destination = write(tmp_path / "fetched.py", b"previous output")
+
+    assert cache.fetch(key, destination) is True
+    assert (tmp_path / "fetched.py").read_bytes() == b"output"
+
+
+def test_changed_entry_is_not_used(tmp_path, cache):
+    """An entry changed after it was stored (e.g. through a link) is removed."""
+    key = cache.key(write(tmp_path / "source.py", b"source"), "config")
+    cache.store(key, write(tmp_path / "output.py", b"output"))
+    entry_path = os.path.join(cache.cache_dir, key[:2], key)
+
+    with open(entry_path, "ab") as file:
+        file.write(b" edited")
+
+    assert cache.fetch(key, str(tmp_path / "fetched.py")) is False
+    assert not os.path.exists(entry_path)
+
+
+def test_evict_least_recently_used(tmp_path):
+    """Eviction removes the entries used the longest time ago first."""
+    cache = OutputCache(str(tmp_path / "cache"), max_bytes=250)
+    keys = []
+    for index in range(3):
+        key = cache.key(write(tmp_path / f"{index}.py", bytes([index])), "config")
+        cache.store(key, write(tmp_path / f"{index}.out", b"x" * 100))
+        metadata_path = os.path.join(cache.cache_dir, key[:2], f"{key}.json")
+        os.utime(metadata_path, ns=(0, (index + 1) * 10**9))
+        keys.append(key)
+
+    # Using the oldest entry makes the second one the least recently used
+    assert cache.fetch(keys[0], str(tmp_path / "fetched.py")) is True
+
+    cache.evict()
+
+    assert cache.fetch(keys[0], str(tmp_path / "fetched.py")) is True
+    assert cache.fetch(keys[1], str(tmp_path / "fetched.py")) is False
+    assert cache.fetch(keys[2], str(tmp_path / "fetched.py")) is True
+
+
+def test_evict_removes_outputs_without_metadata(tmp_path, cache):
+    """Outputs left without metadata by interrupted writes are removed."""
+    key = cache.key(write(tmp_path / "source.py", b"source"), "config")
+    cache.store(key, write(tmp_path / "output.py", b"output"))
+    os.remove(os.path.join(cache.cache_dir, key[:2], f"{key}.json"))
+
+    cache.evict()
+
+    assert not os.path.exists(os.path.join(cache.cache_dir, key[:2], key))
+
+
+def test_from_options(tmp_path, monkeypatch):
+    """The options enable the cache, in the default or a given folder."""
+    monkeypatch.setenv(CACHE_DIR_ENV, str(tmp_path))
+
+    assert OutputCache.from_options(["cell_cache"]) is None
+    assert OutputCache.from_options(["output_cache_size 100"]) is None
+
+    cache = OutputCache.from_options(["output_cache"])
+    assert cache.cache_dir == os.path.join(str(tmp_path), "outputs")
+    assert cache.max_bytes == OUTPUT_CACHE_MAX_BYTES
+
+    cache = OutputCache.from_options(
+        ["output_cache /tmp/my cache", "output_cache_size 100"]
+    )
+    assert cache.cache_dir == "/tmp/my cache"
+    assert cache.max_bytes == 100
+
+
+@pytest.mark.parametrize("option", ["output_cache_size", "output_cache_size 1G"])
+def test_from_options_invalid_size(option):
+    """Malformed size options raise ValueError."""
+    with pytest.raises(ValueError, match="Invalid output_cache_size option"):
+        OutputCache.from_options(["output_cache", option])
@@ -0,0 +1,119 @@
+"""Unit tests for staged_output.py."""
+
+from __future__ import annotations
+
+import os
+
+import pytest
+
+from pact.convert.utils import staged_output
+from pact.convert.utils.staged_output import (
+    create_staging_location,
+    is_work_folder,
+    remove_leftovers,
+    swap_into_place,
+    wait_for_removals,
+)
+
+
+@pytest.fixture
+def generated(tmp_path):
+    """A previous student version with a nested file."""
+    location = tmp_path / "STUDENT_VERSION"
+    (location / "assn").mkdir(parents=True)
+    (location / "assn" / "main.py").write_text("x = 1\n")
+    os.utime(location / "assn" / "main.py", ns=(0, 10**9))
+    return location
+
+
+def test_is_work_folder():
+    """Only staging folders and replaced versions of the location match."""
+    assert is_work_folder(".STUDENT_VERSION.staging-ab12", "STUDENT_VERSION")
+    assert is_work_folder(".STUDENT_VERSION.old-ab12", "STUDENT_VERSION")
+    assert not is_work_folder("STUDENT_VERSION", "STUDENT_VERSION")
+    assert not is_work_folder(".STUDENT_VERSION.txt", "STUDENT_VERSION")
+    assert not is_work_folder(".OTHER.staging-ab12", "STUDENT_VERSION")
+
+
+def test_create_staging_location(generated):
+    """A staging folder is empty unless the existing files are linked."""
+    empty = create_staging_location(str(generated))
+    assert os.path.dirname(empty) == str(generated.parent)
+    assert is_work_folder(os.path.basename(empty), generated.name)
+    assert os.listdir(empty) == []
+
+    linked = create_staging_location(str(generated), link_existing=True)
+    source_stat = os.stat(generated / "assn" / "main.py")
+    linked_stat = os.stat(os.path.join(linked, "assn", "main.py"))
+    assert linked_stat.st_ino == source_stat.st_ino
+    assert linked_stat.st_mtime_ns == 10**9
+
+
+def test_create_staging_location_copies_without_links(generated, monkeypatch):
+    """Files are copied (with their times) if they cannot be linked."""
+
+    def no_link(source_path, destination_path):
+        raise OSError("links not supported")
+
+    monkeypatch.setattr(staged_output.os, "link", no_link)
+    staging = create_staging_location(str(generated), link_existing=True)
+
+    copied_stat = os.stat(os.path.join(staging, "assn", "main.py"))
+    assert copied_stat.st_ino != os.stat(generated / "assn" / "main.py").st_ino
+    assert copied_stat.st_mtime_ns == 10**9
+
+
+def test_swap_into_place(generated):
+    """The staging folder replaces the location, the old one is moved away."""
+    staging = create_staging_location(str(generated))
+    open(os.path.join(staging, "new.txt"), "w").close()
+
+    previous = swap_into_place(staging, str(generated))
+
+    assert os.listdir(generated) == ["new.txt"]
+    assert not os.path.exists(staging)
+    assert is_work_folder(os.path.basename(previous), generated.name)
+    assert os.path.exists(os.path.join(previous, "assn", "main.py"))
+
+
+def test_swap_into_place_without_previous_version(tmp_path):
+    """Without a previous version, nothing is moved away."""
+    location = tmp_path / "STUDENT_VERSION"
+    staging = create_staging_location(str(location))
+
+    assert swap_into_place(staging, str(location)) is None
+    assert location.is_dir()
+
+
+def test_swap_into_place_restores_previous_version(generated, monkeypatch):
+    """If the staging folder cannot be moved, the previous version is restored."""
+    staging = create_staging_location(str(generated))
+    rename = os.rename
+
+    def failing_rename(source, destination):
+        if source == staging:
+            raise OSError("rename failed")
+        rename(source, destination)
+
+    monkeypatch.setattr(staged_output.os, "rename", failing_rename)
+    with pytest.raises(OSError):
+        swap_into_place(staging, str(generated))
+
+    assert (generated / "assn" / "main.py").exists()
+    assert sorted(os.listdir(generated.parent)) == sorted(
+        [generated.name, os.path.basename(staging)]
+    )
+
+
+def test_remove_leftovers(generated):
+    """Work folders next to the location are removed, nothing else."""
+    staging = create_staging_location(str(generated), link_existing=True)
+    other = generated.parent / ".hidden"
+    other.mkdir()
+
+    remove_leftovers(str(generated))
+    wait_for_removals()
+
+    assert not os.path.exists(staging)
+    assert other.exists()
+    assert (generated / "assn" / "main.py").exists()
@@ -0,0 +1,97 @@
+"""Unit tests for walk_tree."""
+
+from __future__ import annotations
+
+import os
+
+import pytest
+
+from pact.convert.utils.tree_walker import WorkItem, walk_tree
+
+
+@pytest.fixture
+def source(tmp_path):
+    """An assignment folder with nested folders and an empty folder."""
+    root = tmp_path / "assn"
+    (root / "b" / "deep").mkdir(parents=True)
+    (root / "a").mkdir()
+    (root / "empty").mkdir()
+    (root / "z.py").write_text("z\n")
+    (root / "a" / "x.py").write_text("x\n")
+    (root / "b" / "y.py").write_text("y\n")
+    (root / "b" / "deep" / "w.py").write_text("w\n")
+    return str(root)
+
+
+def test_work_list(tmp_path, source):
+    """Folders are listed depth first in name order, each with its files."""
+    out = str(tmp_path / "out")
+
+    work = walk_tree(source, out, lambda path, is_folder: True)
+
+    assert work.folders == [
+        os.path.join(out, "assn"),
+        os.path.join(out, "assn", "a"),
+        os.path.join(out, "assn", "b"),
+        os.path.join(out, "assn", "b", "deep"),
+    ]
+    assert work.files == [
+        WorkItem(os.path.join(source, "z.py"), os.path.join(out, "assn")),
+        WorkItem(os.path.join(source, "a", "x.py"), os.path.join(out, "assn", "a")),
+        WorkItem(os.path.join(source, "b", "y.py"), os.path.join(out, "assn", "b")),
+        WorkItem(
+            os.path.join(source, "b", "deep", "w.py"),
+            os.path.join(out, "assn", "b", "deep"),
+        ),
+    ]
+
+
+def test_excluded_folders_not_visited(tmp_path, source):
+    """Excluded folders are pruned, but their parent folder is still listed."""
+    visited = []
+
+    def include(path, is_folder):
+        visited.append(path)
+        return os.path.basename(path) != "b"
+
+    work = walk_tree(source, str(tmp_path / "out"), include)
+
+    assert os.path.join(source, "b", "y.py") not in visited
+    assert [os.path.basename(item.source_path) for item in work.files] == [
+        "z.py",
+        "x.py",
+    ]
+    assert len(work.folders) == 2
+
+
+def test_single_file(tmp_path, source):
+    """A file is converted into the generation location itself."""
+    path = os.path.join(source, "z.py")
+
+    work = walk_tree(path, str(tmp_path), lambda path, is_folder: True)
+
+    assert work.folders == []
+    assert work.files == [WorkItem(path, str(tmp_path))]
+
+
+def test_excluded_root(tmp_path, source):
+    """Nothing is listed if the source itself is excluded."""
+    work = walk_tree(source, str(tmp_path), lambda path, is_folder: False)
+
+    assert work.folders == [] and work.files == []
+
+
+def test_missing_source(tmp_path):
+    """A missing source raises a ValueError."""
+    with pytest.raises(ValueError, match="does not exist"):
+        walk_tree(
+            str(tmp_path / "missing"), str(tmp_path), lambda path, is_folder: True
+        )
+
+
+def test_broken_symlink(tmp_path, source):
+    """Entries that are neither files nor folders raise a ValueError."""
+    os.symlink(str(tmp_path / "missing"), os.path.join(source, "link"))
+
+    with pytest.raises(ValueError, match="link"):
+        walk_tree(source, str(tmp_path / "out"), lambda path, is_folder: True)
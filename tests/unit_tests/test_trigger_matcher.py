@@ -0,0 +1,262 @@
+"""Unit tests for TriggerMatcher."""
+
+from __future__ import annotations
+
+import pytest
+
+from pact.convert.utils.codeblock_infra import CodeBlockType, InvalidCodeBlockError
+from pact.convert.utils import trigger_matcher
+from pact.convert.utils.line_index import LineIndex
+from pact.convert.utils.mask_infra import InvalidMaskError, MaskType
+from pact.convert.utils.trigger_matcher import (
+    CELL_EXCLUDE_TRIGGER,
+    CODEBLOCK_TRIGGER,
+    MASK_TRIGGER,
+    TriggerHit,
+    TriggerMatcher,
+    count_regions,
+)
+
+
+@pytest.fixture
+def matcher(codeblock_types, mask_types):
+    """A TriggerMatcher with the test codeblock and mask types."""
+    return TriggerMatcher(
+        codeblock_types=codeblock_types,
+        mask_types=mask_types,
+        cell_exclude_str="ANSWER_KEY_CELL",
+    )
+
+
+class TestTriggerMatcherFind:
+    """Tests for TriggerMatcher.find."""
+
+    def test_no_trigger(self, matcher):
+        """Lines without triggers report no hits."""
+        assert matcher.find("x = 1\n") == []
+
+    def test_codeblock_start(self, matcher, student_code_block):
+        """A codeblock start trigger is reported with its type and label."""
+        assert matcher.find("    # STUDENT_CODE_START\n") == [
+            TriggerHit(CODEBLOCK_TRIGGER, student_code_block, "start")
+        ]
+
+    def test_codeblock_end(self, matcher, key_only_block):
+        """A codeblock end trigger is reported with its type and label."""
+        assert matcher.find("# KEY_ONLY_END\n") == [
+            TriggerHit(CODEBLOCK_TRIGGER, key_only_block, "end")
+        ]
+
+    def test_mask(self, matcher, assignment_mask):
+        """A mask trigger is reported with its mask type."""
+        assert matcher.find("x = 1  # MASK_ASSIGNMENT\n") == [
+            TriggerHit(MASK_TRIGGER, assignment_mask, MASK_TRIGGER)
+        ]
+
+    def test_cell_exclude(self, matcher):
+        """The cell exclusion string is reported."""
+        hits = matcher.find("# ANSWER_KEY_CELL\n")
+        assert [hit.kind for hit in hits] == [CELL_EXCLUDE_TRIGGER]
+
+    def test_all_triggers_in_one_scan(self, matcher):
+        """Every trigger on a line is reported, in registration order."""
+        hits = matcher.find("MASK_ASSIGNMENT KEY_ONLY_END STUDENT_CODE_START")
+        assert [(hit.kind, hit.label) for hit in hits] == [
+            (CODEBLOCK_TRIGGER, "start"),
+            (CODEBLOCK_TRIGGER, "end"),
+            (MASK_TRIGGER, MASK_TRIGGER),
+        ]
+
+    def test_repeated_trigger_reported_once(self, matcher):
+        """A trigger appearing twice on a line is only reported once."""
+        assert len(matcher.find("STUDENT_CODE_START STUDENT_CODE_START")) == 1
+
+    def test_trigger_inside_longer_trigger(self):
+        """A trigger contained in a longer trigger is reported as well."""
+        short = CodeBlockType("Short", "BLOCK", "BLOCK_STOP")
+        long = CodeBlockType("Long", "BLOCK_LONG", "LONG_STOP")
+        matcher = TriggerMatcher([short, long], [])
+
+        hits = matcher.find("# BLOCK_LONG\n")
+
+        assert (short, "start") in [(hit.trigger_type, hit.label) for hit in hits]
+        assert (long, "start") in [(hit.trigger_type, hit.label) for hit in hits]
+
+    def test_overlapping_triggers(self):
+        """Triggers overlapping each other on a line are both reported."""
+        first = MaskType("First", "AB_C", "=", "= None")
+        second = MaskType("Second", "B_CD", "=", "= None")
+        matcher = TriggerMatcher([], [first, second])
+
+        hits = matcher.find("x = AB_CD\n")
+
+        assert [hit.trigger_type for hit in hits] == [first, second]
+
+    def test_empty_trigger_raises(self):
+        """Empty trigger strings are rejected."""
+        with pytest.raises(ValueError):
+            TriggerMatcher([], [MaskType("Empty", "", "=", "= None")])
+
+    def test_no_types(self):
+        """A matcher without any trigger types reports no hits."""
+        assert TriggerMatcher([], []).find("STUDENT_CODE_START") == []
+
+
+class TestManagersWithHits:
+    """Managers keep their error semantics when given precomputed hits."""
+
+    def test_codeblock_manager_multiple_triggers(self, matcher, codeblock_manager):
+        """Multiple codeblock triggers found by the matcher raise an error."""
+        line = "# STUDENT_CODE_START # KEY_ONLY_START\n"
+        with pytest.raises(InvalidCodeBlockError) as exc_info:
+            codeblock_manager.update_state(line, matcher.find(line))
+        assert "multiple codeblock triggers" in str(exc_info.value)
+
+    def test_mask_manager_multiple_triggers(self, mask_manager):
+        """Multiple mask triggers found by the matcher raise an error."""
+        first = MaskType("First", "MASK_A", "=", "= None")
+        second = MaskType("Second", "MASK_B", "=", "= None")
+        matcher = TriggerMatcher([], [first, second])
+        line = "x = 1 # MASK_A MASK_B\n"
+
+        with pytest.raises(InvalidMaskError) as exc_info:
+            mask_manager.update_state(line, matcher.find(line))
+        assert "Multiple mask triggers" in str(exc_info.value)
+
+    def test_managers_ignore_other_kinds(
+        self, matcher, codeblock_manager, mask_manager
+    ):
+        """Each manager only reacts to hits of its own kind."""
+        line = "x = 1  # MASK_ASSIGNMENT\n"
+        hits = matcher.find(line)
+
+        codeblock_manager.update_state(line, hits)
+        mask_manager.update_state(line, hits)
+
+        assert codeblock_manager.is_codeblock_active() is False
+        assert mask_manager.is_mask_active() is True
+
+
+class TestTriggerMatcherHasTriggers:
+    """Tests for TriggerMatcher.has_triggers."""
+
+    def test_has_triggers(self, matcher):
+        """Texts containing any trigger are detected."""
+        assert matcher.has_triggers("a = 1\n# KEY_ONLY_START\n") is True
+        assert matcher.has_triggers("a = 1\nb = 2\n") is False
+
+    def test_no_triggers_registered(self):
+        """A matcher without triggers finds none."""
+        matcher = TriggerMatcher(codeblock_types=[], mask_types=[])
+
+        assert matcher.has_triggers("# KEY_ONLY_START") is False
+
+
+class TestTriggerMatcherFileHasTriggers:
+    """Tests for TriggerMatcher.file_has_triggers."""
+
+    @pytest.mark.parametrize(
+        "content, expected",
+        [
+            (b"a = 1\n# KEY_ONLY_START\n", True),
+            (b"a = 1\nb = 2\n", False),
+            (b"", False),
+            # Wide encodings must be decoded, even without a visible trigger
+            ("a = 1\n".encode("utf-16"), True),
+            ("a = 1\n".encode("utf-16-be"), True),
+            (b"\xff\xfe", True),
+            (b"a = 1\x00\n", True),
+        ],
+    )
+    def test_file_has_triggers(self, tmp_path, matcher, content, expected):
+        """Triggers, UTF-16 byte order marks and NUL bytes are reported."""
+        path = tmp_path / "file.py"
+        path.write_bytes(content)
+
+        assert matcher.file_has_triggers(str(path)) is expected
+
+
+class TestCountRegions:
+    """Tests for count_regions."""
+
+    @pytest.mark.parametrize(
+        "text, expected",
+        [
+            ("no triggers here\n", 0),
+            ("# STUDENT_CODE_START\nx\n# STUDENT_CODE_END\n", 1),
+            ("x = 1 # MASK_ASSIGNMENT\ny = 2 # MASK_ASSIGNMENT\n", 2),
+            (
+                "# KEY_ONLY_START\nx = 1 # MASK_ASSIGNMENT\n# KEY_ONLY_END\n"
+                "# STUDENT_CODE_START\n# STUDENT_CODE_END\n",
+                3,
+            ),
+            ("# ANSWER_KEY_CELL\n", 1),
+        ],
+    )
+    def test_count_regions(self, matcher, text, expected):
+        """Codeblocks count once (by their start), masks and excluded cells each."""
+        assert count_regions(matcher.scan(text)) == expected
+
+
+class TestTriggerMatcherBulkScan:
+    """Tests for the NumPy bulk scan of large buffers."""
+
+    @pytest.fixture(autouse=True)
+    def _require_numpy(self):
+        pytest.importorskip("numpy")
+
+    @pytest.mark.parametrize(
+        "text",
+        [
+            "a\n# STUDENT_CODE_START\nb\nc\n# STUDENT_CODE_END\nd",
+            "# KEY_ONLY_START\n" + "secret\n" * 500 + "# KEY_ONLY_END\n",
+            "# KEY_ONLY_START\nx\n# KEY_ONLY_END STUDENT_CODE_START\n",
+            "MASK_ASSIGNMENT KEY_ONLY_END STUDENT_CODE_START\n\n\n# KEY_ONLY_END",
+            "\n\n# ANSWER_KEY_CELL\nx = 1 # MASK_ASSIGNMENT\n",
+            "s = “é” # MASK_ASSIGNMENT\n# 你好 🙂\n# STUDENT_CODE_START\n",
+        ],
+    )
+    def test_bulk_scan_matches_scan(self, matcher, text):
+        """The bulk scan reports the same lines as the sequential scan."""
+        assert matcher._bulk_scan_safe
+        bulk = matcher._scan_bulk(text, LineIndex(text, use_numpy=True))
+        assert bulk == matcher.scan(text)
+
+    @pytest.mark.parametrize(
+        "text",
+        [
+            "x = 1  # MASK_ASSIGNMENT\n" + "y\n" * 10,
+            "s = “naïve”  # MASK_ASSIGNMENT\n" + "# 你好 🙂\n" * 10,
+        ],
+    )
+    def test_large_buffer_uses_bulk_scan(self, matcher, monkeypatch, text):
+        """Buffers above the size threshold are scanned in bulk (any text)."""
+        expected = matcher.scan(text)
+
+        monkeypatch.setattr(trigger_matcher, "NUMPY_MIN_BUFFER_SIZE", 1)
+        calls = []
+        original = matcher._scan_bulk
+        monkeypatch.setattr(
+            matcher, "_scan_bulk", lambda *args: calls.append(1) or original(*args)
+        )
+
+        assert matcher.scan(text) == expected
+        assert calls == [1]
+
+    def test_overlapping_triggers_disable_bulk_scan(self):
+        """Triggers that can overlap each other are always scanned sequentially."""
+        first = MaskType("First", "AB_C", "=", "= None")
+        second = MaskType("Second", "B_CD", "=", "= None")
+        assert TriggerMatcher([], [first, second])._bulk_scan_safe is False
+
+    def test_contained_triggers_keep_bulk_scan(self):
+        """A trigger inside a longer trigger is still reported by the bulk scan."""
+        short = CodeBlockType("Short", "BLOCK", "BLOCK_STOP")
+        long = CodeBlockType("Long", "BLOCK_LONG", "END_LONG")
+        matcher = TriggerMatcher([short, long], [])
+        text = "x\n# BLOCK_LONG\n"
+
+        assert matcher._bulk_scan_safe
+        assert matcher._scan_bulk(text, LineIndex(text, use_numpy=True)) == (
+            matcher.scan(text)
+        )
@@ -0,0 +1,150 @@
+"""Unit tests for TriggerTable and ConversionContext."""
+
+from __future__ import annotations
+
+import json
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from pact.convert.utils.codeblock_infra import CodeBlockType
+from pact.convert.utils.file_converter import FileConverter
+from pact.convert.utils.trigger_table import ConversionContext, TriggerTable
+
+
+@pytest.fixture
+def trigger_table(codeblock_types, mask_types):
+    """A TriggerTable with the test codeblock and mask types."""
+    return TriggerTable(codeblock_types, mask_types, cell_exclude_str="ANSWER_KEY_CELL")
+
+
+class TestTriggerTable:
+    """Tests for TriggerTable."""
+
+    def test_immutable(self, trigger_table):
+        """Attributes of the table cannot be set or deleted."""
+        with pytest.raises(AttributeError):
+            trigger_table.ascii_only = False
+        with pytest.raises(AttributeError):
+            del trigger_table.matcher
+        with pytest.raises(AttributeError):
+            trigger_table.new_attribute = 1
+
+    def test_pickle_round_trip(self, trigger_table):
+        """A pickled table matches the same triggers as the original."""
+        restored = pickle.loads(pickle.dumps(trigger_table))
+        line = "x = 1  # MASK_ASSIGNMENT STUDENT_CODE_START\n"
+
+        assert [hit.kind for hit in restored.matcher.find(line)] == [
+            hit.kind for hit in trigger_table.matcher.find(line)
+        ]
+        assert restored.cell_exclude_str == "ANSWER_KEY_CELL"
+        assert [t.name for t in restored.codeblock_types] == [
+            t.name for t in trigger_table.codeblock_types
+        ]
+
+    @pytest.mark.parametrize(
+        "replacement_str",
+        ["", "\n", "\npass", "\n# TODO\npass\n", "\nfirst\n\nthird\n\n"],
+    )
+    @pytest.mark.parametrize("indentation_str", ["", "    ", "\t\t"])
+    def test_replacement_matches_codeblock_type(
+        self, replacement_str, indentation_str
+    ):
+        """Precomputed replacements equal CodeBlockType.get_replacement_str."""
+        codeblock_type = CodeBlockType("Block", "START", "END", replacement_str)
+        table = TriggerTable([codeblock_type], [])
+
+        assert table.get_replacement_str(
+            codeblock_type, indentation_str
+        ) == codeblock_type.get_replacement_str(indentation_str)
+
+    def test_ascii_only(self, trigger_table, key_only_block):
+        """Non-ASCII replacement strings are detected."""
+        wide_block = CodeBlockType("Wide", "WIDE_START", "WIDE_END", "\n# → TODO\n")
+
+        assert trigger_table.ascii_only is True
+        assert TriggerTable([key_only_block, wide_block], []).ascii_only is False
+
+    def test_fingerprint(self, trigger_table, codeblock_types, mask_types):
+        """Tables with the same configuration have the same fingerprint."""
+        other_block = CodeBlockType("Other", "OTHER_START", "OTHER_END", "\npass")
+
+        assert trigger_table.fingerprint == (
+            pickle.loads(pickle.dumps(trigger_table)).fingerprint
+        )
+        assert trigger_table.fingerprint != TriggerTable(
+            codeblock_types, mask_types, cell_exclude_str="OTHER_CELL"
+        ).fingerprint
+        assert trigger_table.fingerprint != TriggerTable(
+            codeblock_types + [other_block], mask_types, "ANSWER_KEY_CELL"
+        ).fingerprint
+
+
+class TestConversionContext:
+    """Tests for ConversionContext and converters sharing a table."""
+
+    def test_contexts_are_independent(self, trigger_table):
+        """State changes in one context do not affect another."""
+        first = ConversionContext(trigger_table)
+        second = ConversionContext(trigger_table)
+
+        first.codeblock_manager.update_state("    # STUDENT_CODE_START\n")
+
+        assert first.codeblock_manager.is_codeblock_active() is True
+        assert second.codeblock_manager.is_codeblock_active() is False
+        assert first.get_replacement_str() == "    # TODO: Implement\n    pass\n"
+
+    def test_converters_share_table(self, trigger_table):
+        """Converters built from one table use it as is."""
+        converter = FileConverter(trigger_table=trigger_table)
+        assert converter.trigger_table is trigger_table
+        assert converter.trigger_matcher is trigger_table.matcher
+
+    def test_converter_is_reentrant(self, file_converter):
+        """One converter converts many texts concurrently."""
+        texts = [
+            f"a{i}\n    # STUDENT_CODE_START\n    x\n    # STUDENT_CODE_END\n"
+            f"b = {i}  # MASK_ASSIGNMENT\n\nc\n"
+            for i in range(50)
+        ]
+        expected = ["".join(file_converter._convert_text(text)) for text in texts]
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = executor.map(
+                lambda text: "".join(file_converter._convert_text(text)), texts
+            )
+
+        assert list(results) == expected
+
+    def test_mask_does_not_leak_into_next_cell(self, file_converter, tmp_path):
+        """A mask still active at the end of a cell ends with the cell."""
+        notebook = {
+            "cells": [
+                {
+                    "cell_type": "code",
+                    "metadata": {},
+                    "execution_count": 1,
+                    "outputs": [],
+                    "source": ["x = compute()  # MASK_ASSIGNMENT"],
+                },
+                {
+                    "cell_type": "code",
+                    "metadata": {},
+                    "execution_count": 2,
+                    "outputs": [],
+                    "source": ["print(x)\n", "y = 1"],
+                },
+            ],
+            "metadata": {},
+            "nbformat": 4,
+            "nbformat_minor": 5,
+        }
+        source_file_path = tmp_path / "leak.ipynb"
+        source_file_path.write_text(json.dumps(notebook))
+
+        file_converter.convert_file(str(source_file_path), str(tmp_path / "out"))
+
+        converted = json.loads((tmp_path / "out" / "leak.ipynb").read_text())
+        assert converted["cells"][1]["source"] == ["print(x)\n", "y = 1"]